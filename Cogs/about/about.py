@@ -4,9 +4,7 @@ import discord
 from discord.ext import commands
 from discord import app_commands
 import discord.ui as ui
-import yaml
 import logging
-from main import BOT_ADMIN
 from nltemplates import *
 import re
 import datetime
@@ -19,12 +17,9 @@ COG_INTRO = {
     "description": "關於專案（不能移除）",
     "author": "SamHacker",
     "countributors": ["SamHacker"],
+    "config_sections": ["version"],
 }
 
-# 讀取設定檔
-with open("cfg.yml", "r", encoding="utf-8") as file:
-    cfg = yaml.safe_load(file)
-
 class About(commands.Cog):
     @app_commands.command(name='關於')
     async def about(self, interaction: discord.Interaction):
@@ -39,7 +34,7 @@ class About(commands.Cog):
         )
         embed.add_field(
             name = "版本",
-            value = cfg["version"]
+            value = interaction.client.config["version"]
         )
         embed.add_field(
             name = "授權條款",
@@ -4,9 +4,7 @@ import discord
 from discord.ext import commands
 from discord import app_commands
 import discord.ui as ui
-import yaml
 import logging
-from main import BOT_ADMIN
 from nltemplates import *
 import re
 import datetime
@@ -18,12 +16,9 @@ COG_INTRO = {
     "description": "用於公告設定的擴充功能",
     "author": "SamHacker",
     "countributors": ["SamHacker"],
+    "config_sections": ["admin_id", "annou_channel_id", "update_format", "fix_format"],
 }
 
-# 讀取設定檔
-with open("cfg.yml", "r", encoding="utf-8") as file:
-    cfg = yaml.safe_load(file)
-
 class UpdateModal(discord.ui.Modal, title = "發送更新公告"):
     # 導言
     intro = ui.TextInput(
@@ -45,7 +40,7 @@ class UpdateModal(discord.ui.Modal, title = "發送更新公告"):
     )
 
     async def on_submit(self, ctx: discord.Interaction):
-        if ctx.user.id not in BOT_ADMIN:
+        if ctx.user.id not in ctx.client.config["admin_id"]:
             await ctx.response.send_message("你沒有權限使用此機器人", ephemeral = True)
             return
         if self.content.value == "":
@@ -63,7 +58,7 @@ class UpdateModal(discord.ui.Modal, title = "發送更新公告"):
             content = self.content.value.split("\n"),
             starter = ctx.user.id
         )
-        await ctx.channel.guild.get_channel(cfg["annou_channel_id"]).send(upd.text)
+        await ctx.channel.guild.get_channel(ctx.client.config["annou_channel_id"]).send(upd.text)
         await ctx.response.send_message("公告已發布", ephemeral = True)
 
 class FixModal(discord.ui.Modal, title = "發送修復公告"):
@@ -114,7 +109,7 @@ class FixModal(discord.ui.Modal, title = "發送修復公告"):
     )
 
     async def on_submit(self, ctx: discord.Interaction):
-        if ctx.user.id not in BOT_ADMIN:
+        if ctx.user.id not in ctx.client.config["admin_id"]:
             await ctx.response.send_message("你沒有權限使用此機器人", ephemeral = True)
             return
         if self.content.value == "":
@@ -160,7 +155,7 @@ class FixModal(discord.ui.Modal, title = "發送修復公告"):
             starter = ctx.user.id
         )
 
-        await ctx.channel.guild.get_channel(cfg["annou_channel_id"]).send(upd.text)
+        await ctx.channel.guild.get_channel(ctx.client.config["annou_channel_id"]).send(upd.text)
         await ctx.response.send_message("公告已發布", ephemeral = True)
 
 class Annou(commands.Cog):
@@ -180,7 +175,7 @@ class Annou(commands.Cog):
     async def update_annou(self, ctx: discord.Interaction):
         logging.info('發布更新公告')
         logging.info(f'請求發起人：{ctx.user}')
-        if ctx.user.id not in BOT_ADMIN:
+        if ctx.user.id not in self.bot.config["admin_id"]:
             await ctx.response.send_message('你沒有權限使用此機器人', ephemeral=True)
             return
         await ctx.response.send_modal(UpdateModal())
@@ -192,7 +187,7 @@ class Annou(commands.Cog):
     async def fix_annou(self, ctx: discord.Interaction):
         logging.info('發布修復公告')
         logging.info(f'請求發起人：{ctx.user}')
-        if ctx.user.id not in BOT_ADMIN:
+        if ctx.user.id not in self.bot.config["admin_id"]:
             await ctx.response.send_message('你沒有權限使用此機器人', ephemeral=True)
             return
         await ctx.response.send_modal(FixModal())
@@ -6,9 +6,7 @@ import discord
 from discord.ext import commands
 from discord import app_commands
 import discord.ui as ui
-import yaml
 import logging
-from main import BOT_ADMIN
 from nltemplates import *
 import re
 import datetime
@@ -20,12 +18,9 @@ COG_INTRO = {
     "description": "用以改變維修狀態",
     "author": "SamHacker",
     "countributors": ["SamHacker"],
+    "config_sections": ["admin_id"],
 }
 
-# 讀取設定檔
-with open("cfg.yml", "r", encoding="utf-8") as file:
-    cfg = yaml.safe_load(file)
-
 class AnnouStat(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
@@ -46,7 +41,7 @@ class AnnouStat(commands.Cog):
             await interaction.response.send_message('此訊息不是由機器人發送')
             return
         # 檢查使用者是否為機器人管理員
-        if interaction.user.id not in BOT_ADMIN:
+        if interaction.user.id not in self.bot.config["admin_id"]:
             await interaction.response.send_message('你沒有權限使用此機器人')
             return
         # 將選取的訊息分片成陣列
@@ -75,7 +70,7 @@ class AnnouStat(commands.Cog):
             await interaction.response.send_message('此訊息不是由機器人發送')
             return
         # 檢查使用者是否為機器人管理員
-        if interaction.user.id not in BOT_ADMIN:
+        if interaction.user.id not in self.bot.config["admin_id"]:
             await interaction.response.send_message('你沒有權限使用此機器人')
             return
         # 將選取的訊息分片成陣列
@@ -104,7 +99,7 @@ class AnnouStat(commands.Cog):
             await interaction.response.send_message('此訊息不是由機器人發送')
             return
         # 檢查使用者是否為機器人管理員
-        if interaction.user.id not in BOT_ADMIN:
+        if interaction.user.id not in self.bot.config["admin_id"]:
             await interaction.response.send_message('你沒有權限使用此機器人')
             return
         # 將選取的訊息分片成陣列
@@ -133,7 +128,7 @@ class AnnouStat(commands.Cog):
             await interaction.response.send_message('此訊息不是由機器人發送')
             return
         # 檢查使用者是否為機器人管理員
-        if interaction.user.id not in BOT_ADMIN:
+        if interaction.user.id not in self.bot.config["admin_id"]:
             await interaction.response.send_message('你沒有權限使用此機器人')
             return
         # 將選取的訊息分片成陣列
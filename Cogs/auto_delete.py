@@ -6,66 +6,86 @@ from discord import app_commands
 import logging
 import yaml
 
+from plugins.delete_queue import DeleteQueue
+from plugins.templates import compile_template
+
 logger = logging.getLogger(__name__)
 
+# 私訊內容可以使用的佔位符
+PLACEHOLDERS = ("member", "member_name", "guild", "message")
+DEFAULT_DM_CONTENT = "您在 {guild} 發送的訊息已被自動刪除。"
+
 COG_INTRO = {
     "name": "自動刪除",
     "description": "自動刪除指定頻道的多餘訊息（非本機器人與白名單的訊息）",
     "author": "SamHacker",
     "countributors": ["SamHacker"],
+    "config_sections": ["auto_delete"],
+    "enabled_by": "auto_delete.enable",
+    "intents": {"guild_messages": True, "message_content": "auto_delete.dm"},
 }
 
 class Remove_Message(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.config = self.bot.config
+        self.config = self.bot.config.get('auto_delete', {})
+        # 私訊內容在載入時解析並檢查佔位符，無效時使用預設內容
+        self.dm_content = compile_template(
+            self.config.get('dm_content', DEFAULT_DM_CONTENT), PLACEHOLDERS,
+            fallback=DEFAULT_DM_CONTENT, name="auto_delete.dm_content"
+        )
+        # 批量刪除：同一頻道短時間內的訊息合併成一次請求
+        bulk = self.config.get('bulk', {})
+        self.delete_queue = DeleteQueue(self.bot, "auto_delete", window=bulk.get('window', 1)) if bulk.get('enabled', True) else None
         logger.info("Remove Message cog 已經載入")
 
-    # 事件
-    @commands.Cog.listener()
-    async def on_message(self, message: discord.Message):
-        # 從 self.config 中取得 'auto_delete' 區塊的設定
-        # 使用 .get() 方法可以安全地取得設定，如果鍵不存在則回傳 None 或指定的預設值
-        auto_delete_settings = self.config.get('auto_delete')
-
-        if not auto_delete_settings:
-            # 如果 cfg.yml 中沒有 'auto_delete' 區塊，則不執行任何操作
-            # 您也可以在此處記錄一個警告
-            # logger.warning("設定檔中缺少 'auto_delete' 區塊，自動刪除功能可能無法正常運作。")
+    async def cog_load(self):
+        # 頻道與白名單交給訊息分派器以集合比對，只有指定頻道中非白名單的訊息會送到這裡
+        if not self.config.get('enabled', False):
             return
+        self.bot.message_router.subscribe(
+            "auto_delete",
+            self.handle_message,
+            channels = self.config.get('channel_id', []),
+            ignore_users = self.config.get('whitelist', []),
+            include_self = True
+        )
 
-        # 檢查功能是否啟用、是否在指定頻道、且訊息發送者不在白名單中
-        if auto_delete_settings.get('enabled', False) and \
-           message.channel.id in auto_delete_settings.get('channel_id', []) and \
-           message.author.id not in auto_delete_settings.get('whitelist', []):
+    async def cog_unload(self):
+        self.bot.message_router.unsubscribe("auto_delete")
+        if self.delete_queue is not None:
+            await self.delete_queue.close()
 
-            # 如果設定要私訊通知，且訊息不是由機器人自己發出的
-            if auto_delete_settings.get('dm', False) and message.author != self.bot.user:
-                dm_content_template = auto_delete_settings.get('dm_content', "您在 {guild} 發送的訊息已被自動刪除。")
-                try:
-                    msg = dm_content_template.format(
-                        member=message.author.mention,
-                        member_name=message.author.name,
-                        guild=message.guild.name,
-                        message=message.content
-                    )
-                    await message.author.send(msg)
-                    logger.info(f"已私訊 {message.author.name} 關於在 {message.guild.name} 的訊息被自動刪除。")
-                except discord.Forbidden:
-                    logger.warning(f"無法私訊 {message.author.name} (ID: {message.author.id})，可能對方關閉了私訊。")
-                except KeyError as e:
-                    logger.error(f"私訊內容模板格式錯誤，缺少鍵：{e}。模板：'{dm_content_template}'")
-                except Exception as e:
-                    logger.error(f"私訊 {message.author.name} 時發生未預期錯誤: {e}")
+    # 事件
+    async def handle_message(self, message: discord.Message):
+        # 如果設定要私訊通知，且訊息不是由機器人自己發出的
+        if self.config.get('dm', False) and message.author != self.bot.user:
             try:
-                await message.delete()
-                logger.info(f"已自動刪除 {message.author.name} 在 {message.guild.name} 的頻道 {message.channel.name} 中的訊息。")
+                msg = self.dm_content.render({
+                    "member": lambda: message.author.mention,
+                    "member_name": lambda: message.author.name,
+                    "guild": lambda: message.guild.name,
+                    "message": lambda: message.content
+                })
+                await message.author.send(msg)
+                logger.info(f"已私訊 {message.author.name} 關於在 {message.guild.name} 的訊息被自動刪除。")
             except discord.Forbidden:
-                logger.error(f"無法刪除訊息於頻道 {message.channel.name} (ID: {message.channel.id})。機器人可能缺乏 '管理訊息' 權限。")
-            except discord.NotFound:
-                logger.warning(f"嘗試刪除訊息 (ID: {message.id}) 時未找到該訊息，可能已被手動刪除。")
+                logger.warning(f"無法私訊 {message.author.name} (ID: {message.author.id})，可能對方關閉了私訊。")
             except Exception as e:
-                logger.error(f"刪除訊息時發生未預期錯誤: {e}")
+                logger.error(f"私訊 {message.author.name} 時發生未預期錯誤: {e}")
+        if self.delete_queue is not None:
+            self.delete_queue.put(message)
+            logger.debug(f"已將 {message.author.name} 在 {message.guild.name} 的頻道 {message.channel.name} 中的訊息排入刪除佇列。")
+            return
+        try:
+            await message.delete()
+            logger.info(f"已自動刪除 {message.author.name} 在 {message.guild.name} 的頻道 {message.channel.name} 中的訊息。")
+        except discord.Forbidden:
+            logger.error(f"無法刪除訊息於頻道 {message.channel.name} (ID: {message.channel.id})。機器人可能缺乏 '管理訊息' 權限。")
+        except discord.NotFound:
+            logger.warning(f"嘗試刪除訊息 (ID: {message.id}) 時未找到該訊息，可能已被手動刪除。")
+        except Exception as e:
+            logger.error(f"刪除訊息時發生未預期錯誤: {e}")
 
 async def setup(bot):
     if not bot.config.get("auto_delete", {}).get("enable", False):
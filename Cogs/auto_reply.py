@@ -3,9 +3,15 @@
 import discord
 from discord.ext import commands
 from discord import app_commands
+import asyncio
 import logging
 import yaml
-import re
+
+from plugins import metrics
+from plugins.regex_guard import RegexGuard
+from plugins.rule_matcher import RuleMatcher
+from plugins.templates import compile_template
+from plugins.token_bucket import TokenBuckets
 
 # with open('cfg.yml', "r", encoding="utf-8") as file:
 #     config = yaml.safe_load(file)["auto_reply"]
@@ -14,30 +20,157 @@ import re
 
 logger = logging.getLogger(__name__)
 
+# 回覆內容可以使用的佔位符
+PLACEHOLDERS = (
+    "message", "author", "author_mention", "author_id", "channel", "channel_mention", "channel_id", "guild", "guild_id"
+)
+
 COG_INTRO = {
     "name": "自動回覆",
     "description": "自動回覆指定關鍵字的訊息",
     "author": "SamHacker",
     "countributors": ["SamHacker"],
+    "config_sections": ["auto_reply"],
+    "enabled_by": "auto_reply.enable",
+    "intents": {"guild_messages": True, "message_content": True},
 }
 
+class ReplyThrottle:
+    """
+    自動回覆的限流：依規則、頻道與使用者分開的權杖桶都還有權杖時才回覆，
+    同一條規則在同一個頻道 collapse_window 秒內重複觸發只回覆一次。
+
+    Attributes
+    ----------
+    buckets : dict
+        範圍（rule、channel、user）-> TokenBuckets
+    rule_buckets : dict
+        規則順序 -> 規則自己設定的 TokenBuckets，取代 rule 範圍的設定
+    collapse : TokenBuckets | None
+        合併重複觸發用的權杖桶
+    """
+    SCOPES = ("rule", "channel", "user")
+
+    def __init__(self, config: dict, rules: list):
+        max_keys = config.get("max_keys", 10000)
+        self.buckets = {}
+        for scope in self.SCOPES:
+            bucket = config.get(scope) or {}
+            if bucket.get("capacity") and bucket.get("per"):
+                self.buckets[scope] = TokenBuckets(bucket["capacity"], bucket["per"], max_keys)
+        self.rule_buckets = {}
+        for rule in rules:
+            bucket = rule.config.get("throttle") or {}
+            if bucket.get("capacity") and bucket.get("per"):
+                self.rule_buckets[rule.index] = TokenBuckets(bucket["capacity"], bucket["per"], 1)
+        window = config.get("collapse_window", 0)
+        self.collapse = TokenBuckets(1, window, max_keys) if window else None
+
+    def check(self, rule, message: discord.Message):
+        """
+        檢查是否可以回覆，可以時消耗權杖
+
+        Returns
+        -------
+        str | None
+            被哪個範圍限制（collapse、rule、channel、user），可以回覆時為 None
+        """
+        checks = []
+        if self.collapse is not None:
+            checks.append(("collapse", self.collapse, (rule.index, message.channel.id)))
+        rule_bucket = self.rule_buckets.get(rule.index, self.buckets.get("rule"))
+        if rule_bucket is not None:
+            checks.append(("rule", rule_bucket, rule.index))
+        if "channel" in self.buckets:
+            checks.append(("channel", self.buckets["channel"], message.channel.id))
+        if "user" in self.buckets:
+            checks.append(("user", self.buckets["user"], message.author.id))
+        # 全部都有權杖才消耗，避免被其中一個範圍擋下時白白用掉其他範圍的權杖
+        for scope, bucket, key in checks:
+            if bucket.available(key) < 1:
+                return scope
+        for _, bucket, key in checks:
+            bucket.take(key)
+        return None
+
 class Auto_Reply(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         self.config = self.bot.config.get("auto_reply", {})
         self.ignore = self.config.get("ignore_rules", {})
         self.rules = self.config.get("rules", [])
+        guard = self.config.get("regex_guard", {})
+        self.guard = None
+        if guard.get("enabled", True):
+            self.guard = RegexGuard(
+                budget = guard.get("budget_ms", 50) / 1000,
+                isolate = guard.get("isolate", "risky"),
+                workers = guard.get("workers", 1),
+                strikes = guard.get("strikes", 3),
+                strike_window = guard.get("strike_window", 600),
+                on_quarantine = self._on_quarantine if guard.get("alert_admins", True) else None
+            )
+        # 規則在載入時編譯一次，每則訊息只需要掃描一次內容
+        self.matcher = RuleMatcher(self.rules, self.guard)
+        self.throttle = ReplyThrottle(self.config.get("throttle", {}), self.matcher.rules)
+        # 回覆內容在載入時解析並檢查佔位符，無效時原樣傳送
+        self.responses = {
+            rule.index: compile_template(
+                str(rule.response), PLACEHOLDERS,
+                fallback = str(rule.response).replace("{", "{{").replace("}", "}}"),
+                name = f"自動回覆規則 {rule.index + 1} 的回覆內容"
+            )
+            for rule in self.matcher.rules
+        }
+        self._alerts = set()
         logger.info("Auto Reply cog 已經載入")
 
-    def _format_response(self, rule_response, message):
+    async def cog_load(self):
+        # 忽略規則交給訊息分派器以集合比對，被忽略的訊息不會送到這裡
+        self.bot.message_router.subscribe(
+            "auto_reply",
+            self.handle_message,
+            ignore_channels = self.ignore.get('ignore_channels', []),
+            ignore_users = self.ignore.get('ignore_users', []),
+            ignore_roles = self.ignore.get('ignore_roles', []),
+            include_bots = not self.ignore.get('ignore_bots', True),
+            include_self = not self.ignore.get('ignore_self', True)
+        )
+
+    async def cog_unload(self):
+        self.bot.message_router.unsubscribe("auto_reply")
+        if self.guard is not None:
+            await self.guard.close()
+
+    def _on_quarantine(self, rule, reason: str):
+        task = asyncio.create_task(self._alert_admins(rule, reason), name=f"auto-reply-alert:{rule.index}")
+        self._alerts.add(task)
+        task.add_done_callback(self._alerts.discard)
+
+    async def _alert_admins(self, rule, reason: str):
+        # 私訊管理員，規則停用到重新載入齒輪為止
+        lines = [f"⚠️ 自動回覆規則 {rule.index + 1} 已停用", f"觸發字串：`{rule.trigger}`", f"原因：{reason}"]
+        if rule.risk:
+            lines.append(f"分析結果：{rule.risk}")
+        lines.append("請修改 cfg.yml 中的正規表示式後重新載入齒輪")
+        content = "\n".join(lines)
+        for admin_id in self.bot.config.get("admin_id", []):
+            try:
+                user = self.bot.get_user(admin_id) or await self.bot.fetch_user(admin_id)
+                await user.send(content)
+            except discord.HTTPException as e:
+                logger.warning(f"無法私訊管理員 {admin_id}：{e}")
+
+    def _format_response(self, template, message):
         """格式化自動回覆的訊息內容。
 
-        此方法會取用一個包含預留位置的回覆樣板字串 (`rule_response`)
+        此方法會取用載入時預先解析的回覆樣板 (`template`)
         以及觸發此回覆的 Discord 訊息物件 (`message`)，
-        並將樣板中的預留位置替換為從訊息物件中提取的實際資訊。
+        並將樣板中的預留位置替換為從訊息物件中提取的實際資訊，
+        只有樣板中用到的預留位置才會取值。
 
         Args:
-            rule_response (str): 回覆訊息的樣板字串，包含以下預留位置：
+            template (Template): 回覆訊息的樣板，可以使用以下預留位置：
                 - `{message}`: 觸發訊息的內容。
                 - `{author}`: 訊息發送者的名稱。
                 - `{author_mention}`: 提及訊息發送者 (例如 @使用者)。
@@ -52,67 +185,34 @@ class Auto_Reply(commands.Cog):
         Returns:
             str: 經過格式化處理，已將預留位置替換為實際內容的回覆字串。
         """
-        return rule_response.format(
-            message=message.content,  # 訊息內容
-            author=message.author.name,  # 訊息發送者
-            author_mention=message.author.mention,  # 訊息發送者
-            author_id=message.author.id,  # 訊息發送者ID
-            channel=message.channel.name,  # 訊息發送頻道
-            channel_mention=message.channel.mention,  # 訊息發送頻道
-            channel_id=message.channel.id,  # 訊息發送頻道ID
-            guild=message.guild.name,  # 訊息發送伺服器
-            guild_id=message.guild.id  # 訊息發送伺服器ID
-        )
+        return template.render({
+            "message": lambda: message.content,  # 訊息內容
+            "author": lambda: message.author.name,  # 訊息發送者
+            "author_mention": lambda: message.author.mention,  # 訊息發送者
+            "author_id": lambda: message.author.id,  # 訊息發送者ID
+            "channel": lambda: message.channel.name,  # 訊息發送頻道
+            "channel_mention": lambda: message.channel.mention,  # 訊息發送頻道
+            "channel_id": lambda: message.channel.id,  # 訊息發送頻道ID
+            "guild": lambda: message.guild.name,  # 訊息發送伺服器
+            "guild_id": lambda: message.guild.id  # 訊息發送伺服器ID
+        })
 
-    @commands.Cog.listener()
-    async def on_message(self, message: discord.Message):
-        # 檢查ignore_rules
-        # 是否為機器人發出
-        if message.author.bot and self.ignore['ignore_bots']:
-            return
-        # 是否是自己發出的
-        if message.author.id == self.bot.user.id and self.ignore['ignore_self']:
-            return
-        # 是否為指定頻道
-        if message.channel.id in self.ignore['ignore_channels']:
+    async def handle_message(self, message: discord.Message):
+        # 找出第一條符合的規則
+        rule = await self.matcher.match(message.content, message.channel.id)
+        if rule is None:
             return
-        # 是否為指定成員，或在指定身分組中
-        # 取得訊息發送者的所有身分組ID
-        roles = [role.id for role in message.author.roles]
-        if message.author.id in self.ignore['ignore_users'] or \
-        any(role in self.ignore['ignore_roles'] for role in roles):
+        logger.debug(f"符合規則 {rule.index + 1}：{rule.trigger}，是否啟用正規表示式匹配：{rule.regex is not None}")
+        scope = self.throttle.check(rule, message)
+        if scope is not None:
+            metrics.AUTO_REPLY_THROTTLED.inc(scope=scope)
+            logger.debug(f"自動回覆規則 {rule.index + 1} 在 {message.channel.name} 頻道被限流（{scope}），不回覆")
             return
-        
-        # 檢查rules
-        for rule in self.rules:
-            # 檢查是否符合規則
-            # 先檢查是否啟用正規表示式匹配
-            logger.debug(f"正在檢查規則：{rule}，是否啟用正規表示式匹配：{rule['match_regex']}")
-            if rule['match_regex']:
-                logger.debug(f"正在使用正規表示式匹配，匹配結果：{re.search(rule['trigger'], message.content)}")
-                if not re.search(rule['trigger'], message.content):
-                    continue
-                if rule['no_reply']:
-                    # 照ephemeral中的布林值指定是否為私人訊息
-                    m = await message.channel.send(self._format_response(rule['response'], message))
-                    logger.info(f"自動回覆: {message.author.name} 在 {message.guild.name} 的 {message.channel.name} 頻道中觸發了自動回覆")
-                    return
-                else:
-                    await message.reply(self._format_response(rule['response'], message))
-                    logger.info(f"自動回覆: {message.author.name} 在 {message.guild.name} 的 {message.channel.name} 頻道中觸發了自動回覆")
-                    return
-            else:
-                logger.debug(f"正在使用一般模式匹配，匹配結果：{re.search(rule['trigger'], message.content)}")
-                if not rule['trigger'] in message.content:
-                    continue
-                if rule['no_reply']:
-                    await message.channel.send(self._format_response(rule['response'], message))
-                    logger.info(f"自動回覆: {message.author.name} 在 {message.guild.name} 的 {message.channel.name} 頻道中觸發了自動回覆")
-                    return
-                else:
-                    await message.reply(self._format_response(rule['response'], message))
-                    logger.info(f"自動回覆: {message.author.name} 在 {message.guild.name} 的 {message.channel.name} 頻道中觸發了自動回覆")
-                    return
+        if rule.no_reply:
+            await message.channel.send(self._format_response(self.responses[rule.index], message))
+        else:
+            await message.reply(self._format_response(self.responses[rule.index], message))
+        logger.info(f"自動回覆: {message.author.name} 在 {message.guild.name} 的 {message.channel.name} 頻道中觸發了自動回覆")
 
 async def setup(bot):
     if not bot.config.get("auto_reply", {}).get("enable", False):
@@ -3,8 +3,21 @@
 import discord
 from discord.ext import commands
 from discord import app_commands
+import asyncio
+import json
 import logging
+import tempfile
+import time
 import yaml
+from collections import Counter
+from datetime import date, datetime, timedelta
+
+from plugins.attachment_archive import AttachmentArchive
+from plugins.audit_resolver import AuditLogResolver
+from plugins.audit_store import AuditStore
+from plugins.command_catalog import HelpPaginator
+from plugins.embed_batcher import EmbedBatcher
+from plugins.message_cache import MessageCache, MessageRecord
 
 # with open('cfg.yml', "r", encoding="utf-8") as file:
 #     config = yaml.safe_load(file)["dc_logging"]
@@ -16,93 +29,500 @@ COG_INTRO = {
     "description": "紀錄 Discord 群組的變更",
     "author": "SamHacker",
     "countributors": ["SamHacker"],
+    "config_sections": ["dc_logging", "admin_id"],
+    "enabled_by": "dc_logging.enable",
+    "intents": {
+        "guild_messages": ["dc_logging.log_events.msg_send", "dc_logging.log_events.msg_edit", "dc_logging.log_events.msg_delete"],
+        "message_content": ["dc_logging.log_events.msg_send", "dc_logging.log_events.msg_edit", "dc_logging.log_events.msg_delete"],
+        "members": [
+            "dc_logging.log_events.member_join", "dc_logging.log_events.member_leave", "dc_logging.log_events.member_muted", "dc_logging.log_events.member_unmuted",
+            "dc_logging.log_events.member_role_add", "dc_logging.log_events.member_role_remove",
+            "dc_logging.log_events.member_nick", "dc_logging.log_events.member_avatar"
+        ],
+        "moderation": ["dc_logging.log_events.member_banned", "dc_logging.log_events.member_unbanned", "dc_logging.audit_log.enabled"],
+        "voice_states": ["dc_logging.log_events.vc_join", "dc_logging.log_events.vc_leave", "dc_logging.log_events.vc_move"],
+    },
+}
+
+# 事件類型與 /log search 顯示的名稱
+EVENT_NAMES = {
+    "msg_send": "發送訊息",
+    "msg_edit": "編輯訊息",
+    "msg_delete": "刪除訊息",
+    "member_join": "加入伺服器",
+    "member_leave": "離開伺服器",
+    "member_banned": "禁止成員",
+    "member_unbanned": "解除禁止成員",
+    "member_update": "成員更新（身分組、禁言、暱稱、頭像）",
+    "vc_join": "加入語音頻道",
+    "vc_leave": "離開語音頻道",
+    "vc_move": "移動語音頻道",
 }
 
+def _field_value(text: str) -> str:
+    # 嵌入欄位的值不能是空的，也不能超過 1024 字
+    if not text:
+        return "（無文字內容）"
+    return text if len(text) <= 1024 else text[:1021] + "..."
+
+def _parse_time(value: str, end: bool = False) -> float:
+    # 接受 2024-01-31 或 2024-01-31 18:30，以機器人所在的時區解讀
+    # 查詢條件是「時間 < 結束時間」，只有日期的結束時間改為隔天午夜，才會包含當天整天
+    value = value.strip()
+    try:
+        day = date.fromisoformat(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+    if end:
+        day += timedelta(days = 1)
+    return datetime.combine(day, datetime.min.time()).timestamp()
+
+class AuditSearchPaginator(HelpPaginator):
+    """/log search 的結果，翻到下一頁時才查詢資料庫"""
+    def __init__(self, store: AuditStore, query: dict, first: dict, user_id: int):
+        self.store = store
+        self.query = query
+        self.next_before_id = first["next_before_id"]
+        super().__init__([self.page(first["results"], 1)], user_id)
+
+    def page(self, results: list, number: int) -> discord.Embed:
+        embed = discord.Embed(
+            title="紀錄搜尋",
+            description=f"第 {number} 頁" if results else "找不到符合條件的紀錄",
+            color=0xececff
+        )
+        for result in results:
+            value = f"<t:{int(result['time'])}:f>"
+            if result["user_id"]:
+                value += f"｜<@{result['user_id']}>"
+            if result["channel_id"]:
+                value += f"｜<#{result['channel_id']}>"
+            if result["content"]:
+                value += "\n" + result["content"][:200]
+            embed.add_field(name=f"#{result['id']} {EVENT_NAMES.get(result['type'], result['type'])}", value=value, inline=False)
+        return embed
+
+    def _refresh(self):
+        self.previous_page.disabled = self.index == 0
+        self.next_page.disabled = self.index >= len(self.pages) - 1 and self.next_before_id is None
+
+    async def _show(self, interaction: discord.Interaction, index: int):
+        if index == len(self.pages):
+            found = await self.store.search(**self.query, before_id=self.next_before_id)
+            self.next_before_id = found["next_before_id"]
+            self.pages.append(self.page(found["results"], index + 1))
+        await super()._show(interaction, index)
+
 class DcLogging(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
         self.config = bot.config["dc_logging"]
         self.log_events = self.config["log_events"]
+        # 紀錄頻道的訊息合併後批次發送
+        batch = self.config.get("batch", {})
+        self.log_queue = EmbedBatcher(
+            bot,
+            self.config.get("channel_id", 0),
+            "dc_logging",
+            max_embeds = batch.get("max_embeds", 10),
+            window = batch.get("window", 2),
+            max_queue = batch.get("max_queue", 500),
+            overflow = batch.get("overflow", "summarize")
+        )
+        # 稽核事件資料庫，未啟用時為 None
+        self.audit = None
+        # 管理操作的執行者查詢，未啟用時為 None
+        audit_log = self.config.get("audit_log", {})
+        self.resolver = AuditLogResolver(
+            window = audit_log.get("window", 1.5),
+            ttl = audit_log.get("ttl", 60)
+        ) if audit_log.get("enabled", False) else None
+        # 在背景記錄中的事件
+        self._background: set = set()
+        # 附件封存，未啟用時為 None
+        self.archive = None
+        self.bulk_delete = self.config.get("bulk_delete", {})
+        # 頻道 ID -> {"guild_id", "deleted": {訊息 ID: MessageRecord | None}, "last": 最後一次刪除的時間, "task"}
+        self._delete_bursts: dict = {}
+        # 訊息內容快取，讓刪除與編輯紀錄不受 discord.py 訊息快取大小的限制
+        cache = self.config.get("message_cache", {})
+        self.cache = MessageCache(
+            int(cache.get("max_mb", 8) * 1024 * 1024),
+            channel_max_bytes = int(cache.get("channel_max_mb", 1) * 1024 * 1024),
+            spill_path = cache.get("spill_path", ""),
+            spill_max_messages = cache.get("spill_max_messages", 100000)
+        ) if self.log_events.get("msg_edit", False) or self.log_events.get("msg_delete", False) else None
         logger.info("DcLogging cog 已經載入")
 
-    # 發送訊息事件
+    async def cog_load(self):
+        self.log_queue.start()
+        store = self.config.get("audit_store", {})
+        if store.get("enabled", False):
+            self.audit = AuditStore(
+                store.get("path", "databases/audit.db"),
+                retention_days = store.get("retention_days", 90),
+                batch_size = store.get("batch_size", 200),
+                flush_interval = store.get("flush_interval", 2)
+            )
+            await self.audit.start()
+        if self.cache is not None:
+            await self.cache.start()
+        archive = self.config.get("attachment_archive", {})
+        if archive.get("enabled", False):
+            self.archive = AttachmentArchive(
+                archive.get("path", "databases/attachments"),
+                max_file_bytes = int(archive.get("max_file_mb", 25) * 1024 * 1024),
+                max_total_bytes = int(archive.get("max_total_mb", 2048) * 1024 * 1024),
+                concurrency = archive.get("concurrency", 4)
+            )
+            await self.archive.start()
+        # 只有啟用訊息相關紀錄時才向訊息分派器訂閱（刪除與編輯紀錄需要快取訊息內容），機器人訊息的篩選也交給分派器
+        if self.config.get("enabled", False) == False or (self.log_events.get("msg_send", False) == False and self.cache is None):
+            return
+        self.bot.message_router.subscribe(
+            "dc_logging",
+            self.handle_message,
+            include_bots = self.config.get("enabled_for_bot", False)
+        )
+
+    async def cog_unload(self):
+        self.bot.message_router.unsubscribe("dc_logging")
+        # 送出還在查詢執行者、等待合併的刪除紀錄與佇列中剩下的紀錄
+        if self._background:
+            await asyncio.gather(*self._background, return_exceptions = True)
+        for channel_id, burst in list(self._delete_bursts.items()):
+            burst["task"].cancel()
+            if channel_id in self._delete_bursts:
+                await self._emit_delete_burst(channel_id)
+        await self.log_queue.close()
+        if self.audit is not None:
+            await self.audit.close()
+        if self.cache is not None:
+            await self.cache.close()
+        if self.archive is not None:
+            await self.archive.close()
+
+    async def _in_background(self, coro):
+        if self.resolver is None:
+            # 不查詢執行者時不需要等待，直接執行
+            await coro
+            return
+        task = asyncio.create_task(coro)
+        self._background.add(task)
+        task.add_done_callback(self._background_done)
+
+    def _background_done(self, task: asyncio.Task):
+        self._background.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"記錄事件時發生錯誤：{task.exception()}", exc_info=task.exception())
+
+    async def _executor(self, guild: discord.Guild, action: discord.AuditLogAction, target_id: int):
+        """查詢管理操作的執行者，未啟用或找不到時回傳 None"""
+        if self.resolver is None:
+            return None
+        return await self.resolver.resolve(guild, action, target_id)
+
     @commands.Cog.listener()
-    async def on_message(self, message: discord.Message):
+    async def on_audit_log_entry_create(self, entry: discord.AuditLogEntry):
+        if self.resolver is not None:
+            self.resolver.add_entry(entry)
+
+    def _attachments(self, urls) -> str:
+        """附件欄位的內容，已封存的附件附上封存檔案的路徑"""
+        lines = []
+        for url in urls:
+            entry = self.archive.lookup(url) if self.archive is not None else None
+            lines.append(url if entry is None else f"{url}\n已封存：`{entry['path']}`")
+        return _field_value("\n".join(lines))
+
+    def _attachments_extra(self, urls) -> dict:
+        extra = {"attachments": list(urls)}
+        if self.archive is not None:
+            archived = [entry["sha256"] for entry in map(self.archive.lookup, urls) if entry is not None]
+            if archived:
+                extra["archived"] = archived
+        return extra
+
+    async def post_log(self, embed: discord.Embed, event: str, guild: discord.Guild = None, **fields):
+        """發送紀錄到紀錄頻道，並寫入稽核事件資料庫（fields 參考 AuditStore.record）"""
+        await self.log_queue.put(embed)
+        if self.audit is not None and event is not None:
+            self.audit.record(event, guild_id = guild.id if guild else None, **fields)
+
+    log = app_commands.Group(
+        name = "log",
+        description = "群組紀錄（僅限機器人管理員）"
+    )
+
+    @log.command(
+        name = "search",
+        description = "搜尋群組紀錄"
+    )
+    @app_commands.describe(
+        user = "事件的成員",
+        channel = "事件的頻道",
+        event = "事件類型",
+        since = "開始時間，例如 2024-01-31 或 2024-01-31 18:30",
+        until = "結束時間（不含），格式同上；只有日期時包含當天整天",
+        text = "訊息內容包含的文字"
+    )
+    @app_commands.choices(event = [app_commands.Choice(name = name, value = key) for key, name in EVENT_NAMES.items()])
+    async def log_search(
+        self,
+        interaction: discord.Interaction,
+        user: discord.User = None,
+        channel: discord.abc.GuildChannel = None,
+        event: app_commands.Choice[str] = None,
+        since: str = None,
+        until: str = None,
+        text: str = None
+    ):
+        if interaction.user.id not in self.bot.config["admin_id"]:
+            await interaction.response.send_message("你沒有權限使用此機器人", ephemeral = True)
+            return
+        if self.audit is None:
+            await interaction.response.send_message("未啟用紀錄資料庫（可在 cfg.yml 的 dc_logging.audit_store 啟用）", ephemeral = True)
+            return
+        try:
+            query = {
+                "user_id": user.id if user else None,
+                "channel_id": channel.id if channel else None,
+                "type": event.value if event else None,
+                "since": _parse_time(since) if since else None,
+                "until": _parse_time(until, end = True) if until else None,
+                "text": text
+            }
+        except ValueError:
+            await interaction.response.send_message("時間格式錯誤，請使用 2024-01-31 或 2024-01-31 18:30", ephemeral = True)
+            return
+        found = await self.audit.search(**query)
+        view = AuditSearchPaginator(self.audit, query, found, interaction.user.id)
+        await interaction.response.send_message(embed = view.pages[0], view = view, ephemeral = True)
+
+    # 發送訊息事件
+    async def handle_message(self, message: discord.Message):
+        if message.author != self.bot.user:
+            if self.cache is not None:
+                self.cache.put(MessageRecord.from_message(message))
+            if self.archive is not None:
+                for attachment in message.attachments:
+                    self.archive.archive(attachment.url, attachment.filename, attachment.size)
+        if self.log_events.get("msg_send", False) == False:
+            return
         embed = discord.Embed(
             title="訊息紀錄",
             description="發送訊息",
             color=0xececff
         )
-        if self.config.get("enabled", False) == False or self.log_events.get("msg_send", False) == False:
-            return
-        if message.author.bot and self.config.get("enabled_for_bot", False) == False:
-            return
-        if message.author == self.bot.user:
-            return
         embed.add_field(name="發送者", value=message.author.mention)
         embed.add_field(name="頻道", value=message.channel.mention)
-        embed.add_field(name="訊息", value=message.content)
+        embed.add_field(name="訊息", value=_field_value(message.content))
         embed.set_footer(text=f"訊息ID: {message.id}")
         if message.attachments:
-            embed.add_field(name="附件", value="\n".join([attachment.url for attachment in message.attachments]))
+            embed.add_field(name="附件", value=_field_value("\n".join([attachment.url for attachment in message.attachments])))
         
         if self.config.get("console", False) == True:
             logger.info(f"事件：發送訊息\n發送者：{message.author.mention}\n頻道：{message.channel.mention}\n訊息：{message.content}")
         
-        await self.bot.get_channel(self.config.get("channel_id", 0)).send(embed=embed)
+        await self.post_log(embed, "msg_send", message.guild, user_id = message.author.id, channel_id = message.channel.id, message_id = message.id, content = message.content, extra = {"attachments": [attachment.url for attachment in message.attachments]})
 
-    # 刪除訊息事件
+    def _skip_author(self, author_id: int, author_bot: bool) -> bool:
+        if author_bot and self.config.get("enabled_for_bot", False) == False:
+            return True
+        return self.bot.user is not None and author_id == self.bot.user.id
+
+    async def _cached(self, channel_id: int, message_id: int, cached: discord.Message = None, remove: bool = False):
+        # 先找自己的快取，再找 discord.py 的訊息快取
+        record = await self.cache.get(channel_id, message_id, remove) if self.cache is not None else None
+        if record is None and cached is not None:
+            record = MessageRecord.from_message(cached)
+        return record
+
+    # 刪除訊息事件：同一頻道短時間內大量刪除時合併成一筆紀錄
     @commands.Cog.listener()
-    async def on_message_delete(self, message: discord.Message):
+    async def on_raw_message_delete(self, payload: discord.RawMessageDeleteEvent):
+        if self.config.get("enabled", False) == False or self.log_events.get("msg_delete", False) == False:
+            return
+        record = await self._cached(payload.channel_id, payload.message_id, payload.cached_message, remove = True)
+        if record is not None and self._skip_author(record.author_id, record.author_bot):
+            return
+        burst = self._delete_bursts.get(payload.channel_id)
+        if burst is None:
+            burst = self._delete_bursts[payload.channel_id] = {"guild_id": payload.guild_id, "deleted": {}, "last": 0}
+            burst["task"] = asyncio.create_task(self._wait_delete_burst(payload.channel_id))
+        burst["deleted"][payload.message_id] = record
+        burst["last"] = time.monotonic()
+
+    async def _wait_delete_burst(self, channel_id: int):
+        # 等到 burst_window 秒內沒有新的刪除（最多等待 10 倍的時間）再決定逐一記錄或合併
+        window = self.bulk_delete.get("burst_window", 2)
+        started = time.monotonic()
+        while True:
+            delay = self._delete_bursts[channel_id]["last"] + window - time.monotonic()
+            if delay <= 0 or time.monotonic() - started >= window * 10:
+                break
+            await asyncio.sleep(delay)
+        await self._emit_delete_burst(channel_id)
+
+    async def _emit_delete_burst(self, channel_id: int):
+        burst = self._delete_bursts.pop(channel_id)
+        if len(burst["deleted"]) >= self.bulk_delete.get("burst_threshold", 5):
+            await self._post_bulk_delete(burst["guild_id"], channel_id, burst["deleted"], "短時間內大量刪除訊息")
+            return
+        for message_id, record in burst["deleted"].items():
+            await self._post_delete(burst["guild_id"], channel_id, message_id, record)
+
+    async def _post_delete(self, guild_id: int, channel_id: int, message_id: int, record: MessageRecord):
         embed = discord.Embed(
             title="訊息紀錄",
             description="刪除訊息",
             color=0xffecf0
         )
-        if self.config.get("enabled", False) == False or self.log_events.get("msg_delete", False) == False:
-            return
-        if message.author.bot and self.config.get("enabled_for_bot", False) == False:
-            return
-        if message.author == self.bot.user:
-            return
-        embed.add_field(name="發送者", value=message.author.mention)
-        embed.add_field(name="頻道", value=message.channel.mention)
-        embed.add_field(name="訊息", value=message.content)
-        embed.set_footer(text=f"訊息ID: {message.id}")
-        if message.attachments:
-            embed.add_field(name="附件", value="\n".join([attachment.url for attachment in message.attachments]))
+        if record is None:
+            # 訊息在機器人啟動前發送或已經被移出快取，只能記錄 ID
+            embed.add_field(name="發送者", value="未知")
+            embed.add_field(name="頻道", value=f"<#{channel_id}>")
+            embed.add_field(name="訊息", value="（訊息不在快取中，無法取得內容）")
+        else:
+            embed.add_field(name="發送者", value=f"<@{record.author_id}>")
+            embed.add_field(name="頻道", value=f"<#{record.channel_id}>")
+            embed.add_field(name="訊息", value=_field_value(record.content))
+            if record.attachments:
+                embed.add_field(name="附件", value=self._attachments(record.attachments))
+        embed.set_footer(text=f"訊息ID: {message_id}")
         
         if self.config.get("console", False) == True:
-            logger.info(f"事件：刪除訊息\n發送者：{message.author.mention}\n頻道：{message.channel.mention}\n訊息：{message.content}")
+            logger.info(f"事件：刪除訊息\n發送者：{record.author_id if record else '未知'}\n頻道：{channel_id}\n訊息：{record.content if record else ''}")
         
-        await self.bot.get_channel(self.config.get("channel_id", 0)).send(embed=embed)
+        await self.post_log(
+            embed, "msg_delete", self.bot.get_guild(guild_id) if guild_id else None,
+            user_id = record.author_id if record else None, channel_id = channel_id, message_id = message_id,
+            content = record.content if record else None, extra = self._attachments_extra(record.attachments) if record else None
+        )
+
+    # 批量刪除訊息事件（管理員清除頻道）
+    @commands.Cog.listener()
+    async def on_raw_bulk_message_delete(self, payload: discord.RawBulkMessageDeleteEvent):
+        if self.config.get("enabled", False) == False or self.log_events.get("msg_delete", False) == False:
+            return
+        deleted = dict.fromkeys(sorted(payload.message_ids))
+        if self.cache is not None:
+            deleted.update(await self.cache.get_many(payload.channel_id, deleted, remove = True))
+        for message in payload.cached_messages:
+            if deleted.get(message.id) is None:
+                deleted[message.id] = MessageRecord.from_message(message)
+        deleted = {
+            message_id: record for message_id, record in deleted.items()
+            if record is None or not self._skip_author(record.author_id, record.author_bot)
+        }
+        if deleted:
+            await self._post_bulk_delete(payload.guild_id, payload.channel_id, deleted, "批量刪除訊息")
+
+    def _deleted_file(self, channel_id: int, deleted: dict) -> discord.File:
+        """將刪除的訊息逐筆寫入暫存檔，不在記憶體中組出整個附件，格式為文字或 JSON"""
+        fmt = self.bulk_delete.get("format", "txt")
+        fp = tempfile.TemporaryFile()
+        if fmt == "json":
+            fp.write(b"[")
+        for index, (message_id, record) in enumerate(deleted.items()):
+            if fmt == "json":
+                item = {"id": message_id, "created_at": discord.utils.snowflake_time(message_id).isoformat()}
+                if record is not None:
+                    item.update(author_id = record.author_id, content = record.content, **self._attachments_extra(record.attachments))
+                fp.write(((",\n" if index else "\n") + json.dumps(item, ensure_ascii = False)).encode("utf-8"))
+            else:
+                created = discord.utils.snowflake_time(message_id).astimezone().strftime("%Y-%m-%d %H:%M:%S")
+                if record is None:
+                    line = f"[{created}] 訊息ID {message_id}：（訊息不在快取中）\n"
+                else:
+                    line = f"[{created}] 訊息ID {message_id}，發送者 {record.author_id}：{record.content}\n"
+                    for url in record.attachments:
+                        entry = self.archive.lookup(url) if self.archive is not None else None
+                        line += f"    附件：{url}\n" + (f"    已封存：{entry['path']}（SHA-256 {entry['sha256']}）\n" if entry else "")
+                fp.write(line.encode("utf-8"))
+        if fmt == "json":
+            fp.write(b"\n]\n")
+        fp.seek(0)
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        return discord.File(fp, filename = f"deleted-{channel_id}-{stamp}.{'json' if fmt == 'json' else 'txt'}")
+
+    async def _post_bulk_delete(self, guild_id: int, channel_id: int, deleted: dict, description: str):
+        known = [record for record in deleted.values() if record is not None]
+        authors = Counter(record.author_id for record in known)
+        embed = discord.Embed(
+            title="訊息紀錄",
+            description=description,
+            color=0xffecf0
+        )
+        embed.add_field(name="頻道", value=f"<#{channel_id}>")
+        embed.add_field(name="數量", value=f"{len(deleted)} 則（{len(known)} 則有快取內容）")
+        if authors:
+            embed.add_field(
+                name="發送者",
+                value=_field_value("\n".join(f"<@{author_id}>：{count} 則" for author_id, count in authors.most_common(10))),
+                inline=False
+            )
+        embed.set_footer(text="刪除的訊息內容請見附件")
+
+        if self.config.get("console", False) == True:
+            logger.info(f"事件：{description}\n頻道：{channel_id}\n數量：{len(deleted)}")
+
+        await self.log_queue.put(embed, self._deleted_file(channel_id, deleted))
+        if self.audit is not None:
+            for message_id, record in deleted.items():
+                self.audit.record(
+                    "msg_delete", guild_id = guild_id, user_id = record.author_id if record else None, channel_id = channel_id,
+                    message_id = message_id, content = record.content if record else None, extra = {"bulk": True}
+                )
     
     # 編輯訊息事件
     @commands.Cog.listener()
-    async def on_message_edit(self, before: discord.Message, after: discord.Message):
+    async def on_raw_message_edit(self, payload: discord.RawMessageUpdateEvent):
+        if self.config.get("enabled", False) == False or self.log_events.get("msg_edit", False) == False:
+            return
+        # 網址預覽展開、釘選等更新也會觸發此事件（未快取的訊息仍可能帶有 content），
+        # 只有帶有 edited_timestamp 且包含 content 的更新才是使用者實際編輯了訊息
+        if not payload.data.get("edited_timestamp") or "content" not in payload.data:
+            return
+        content = payload.data["content"]
+        author = payload.data.get("author")
+        before = await self._cached(payload.channel_id, payload.message_id, payload.cached_message)
+        if author is not None:
+            author_id, author_bot = int(author["id"]), author.get("bot", False)
+        elif before is not None:
+            author_id, author_bot = before.author_id, before.author_bot
+        else:
+            return
+        if self._skip_author(author_id, author_bot):
+            return
+        if before is not None and before.content == content:
+            return
+        if self.cache is not None:
+            self.cache.put(MessageRecord(
+                payload.message_id, payload.channel_id, payload.guild_id, author_id, author_bot, content,
+                tuple(attachment["url"] for attachment in payload.data.get("attachments", ()))
+            ))
         embed = discord.Embed(
             title="訊息紀錄",
             description="編輯訊息",
             color=0xffe4ec
         )
-        if self.config.get("enabled", False) == False or self.log_events("msg_edit", False) == False:
-            return
-        if before.author.bot and self.config.get("enabled_for_bot", False) == False:
-            return
-        if before.author == self.bot.user:
-            return
-        embed.add_field(name="發送者", value=before.author.mention)
-        embed.add_field(name="頻道", value=before.channel.mention)
-        embed.add_field(name="舊訊息", value=before.content)
-        embed.add_field(name="新訊息", value=after.content)
-        embed.set_footer(text=f"訊息ID: {before.id}")
-        if before.attachments:
-            embed.add_field(name="附件", value="\n".join([attachment.url for attachment in before.attachments]))
+        embed.add_field(name="發送者", value=f"<@{author_id}>")
+        embed.add_field(name="頻道", value=f"<#{payload.channel_id}>")
+        embed.add_field(name="舊訊息", value=_field_value(before.content) if before else "（訊息不在快取中，無法取得內容）")
+        embed.add_field(name="新訊息", value=_field_value(content))
+        embed.set_footer(text=f"訊息ID: {payload.message_id}")
+        if before is not None and before.attachments:
+            embed.add_field(name="附件", value=self._attachments(before.attachments))
         
         if self.config.get("console", False) == True:
-            logger.info(f"事件：編輯訊息\n發送者：{before.author.mention}\n頻道：{before.channel.mention}\n舊訊息：{before.content}\n新訊息：{after.content}")
+            logger.info(f"事件：編輯訊息\n發送者：{author_id}\n頻道：{payload.channel_id}\n舊訊息：{before.content if before else ''}\n新訊息：{content}")
         
-        await self.bot.get_channel(self.config.get("channel_id", 0)).send(embed=embed)
+        await self.post_log(
+            embed, "msg_edit", self.bot.get_guild(payload.guild_id) if payload.guild_id else None,
+            user_id = author_id, channel_id = payload.channel_id, message_id = payload.message_id,
+            content = content, extra = dict(self._attachments_extra(before.attachments), before = before.content) if before else None
+        )
     
     # 加入伺服器事件
     @commands.Cog.listener()
@@ -119,16 +539,27 @@ class DcLogging(commands.Cog):
 
         if self.config.get("console", False) == True:
             logger.info(f"事件：加入伺服器\n成員：{member.mention}\n加入時間：{member.joined_at.strftime('%Y-%m-%d %H:%M:%S')}")
-        try:
-            await self.bot.get_channel(self.config.get("channel_id", 0)).send(embed=embed)
-        except discord.Forbidden:
-            logger.info(f"取得值：{self.config.get('channel_id', 0)}")
-            logger.warning(f"無法發送訊息到頻道 {self.config.get('channel_id', 0)}，請檢查機器人權限")
-            return
+        await self.post_log(embed, "member_join", member.guild, user_id = member.id)
     
-    # 離開伺服器事件
+    # 需要查詢執行者的事件在背景記錄，等待審核日誌時不佔用事件處理器的時間
     @commands.Cog.listener()
     async def on_member_remove(self, member: discord.Member):
+        await self._in_background(self.log_member_remove(member))
+
+    @commands.Cog.listener()
+    async def on_member_ban(self, guild: discord.Guild, user: discord.User):
+        await self._in_background(self.log_member_ban(guild, user))
+
+    @commands.Cog.listener()
+    async def on_member_unban(self, guild: discord.Guild, user: discord.User):
+        await self._in_background(self.log_member_unban(guild, user))
+
+    @commands.Cog.listener()
+    async def on_member_update(self, before: discord.Member, after: discord.Member):
+        await self._in_background(self.log_member_update(before, after))
+
+    # 離開伺服器事件
+    async def log_member_remove(self, member: discord.Member):
         embed = discord.Embed(
             title="成員紀錄",
             description="離開伺服器",
@@ -136,18 +567,24 @@ class DcLogging(commands.Cog):
         )
         if self.config.get("enabled", False) == False or self.log_events.get("member_leave", False) == False:
             return
+        left_at = discord.utils.utcnow()
         embed.add_field(name="成員", value=member.mention)
-        embed.add_field(name="離開時間", value=member.joined_at.strftime("%Y-%m-%d %H:%M:%S"))
+        embed.add_field(name="離開時間", value=left_at.astimezone().strftime("%Y-%m-%d %H:%M:%S"))
+        # 被踢出時審核日誌會有紀錄
+        kicked = await self._executor(member.guild, discord.AuditLogAction.kick, member.id)
+        if kicked is not None:
+            embed.description = "踢出成員"
+            embed.add_field(name="執行者", value=kicked["user"].mention)
+            if kicked["reason"]:
+                embed.add_field(name="原因", value=_field_value(kicked["reason"]))
 
-        try:
-            await self.bot.get_channel(self.config.get("channel_id", 0)).send(embed=embed)
-        except discord.Forbidden:
-            logger.warning(f"無法發送訊息到頻道 {self.config.get('channel_id', 0)}，請檢查機器人權限")
-            return
+        await self.post_log(
+            embed, "member_leave", member.guild, user_id = member.id, target_id = kicked["user"].id if kicked else None,
+            extra = {"kicked": True, "reason": kicked["reason"]} if kicked else None
+        )
 
     # 禁止成員事件
-    @commands.Cog.listener()
-    async def on_member_ban(self, guild: discord.Guild, user: discord.User):
+    async def log_member_ban(self, guild: discord.Guild, user: discord.User):
         embed = discord.Embed(
             title="成員紀錄",
             description="禁止成員",
@@ -157,21 +594,22 @@ class DcLogging(commands.Cog):
             return
         if user.bot and self.config.get("enabled_for_bot", False) == False:
             return
+        executor = await self._executor(guild, discord.AuditLogAction.ban, user.id)
         embed.add_field(name="成員", value=user.mention)
-        embed.add_field(name="執行者", value=guild.me.mention)
+        embed.add_field(name="執行者", value=executor["user"].mention if executor else "未知")
+        if executor and executor["reason"]:
+            embed.add_field(name="原因", value=_field_value(executor["reason"]))
 
         if self.config.get("console", False) == True:
-            logger.info(f"事件：禁止成員\n成員：{user.mention}\n執行者：{guild.me.mention}")
+            logger.info(f"事件：禁止成員\n成員：{user.mention}\n執行者：{executor['user'].mention if executor else '未知'}")
         
-        try:
-            await self.bot.get_channel(self.config.get("channel_id", 0)).send(embed=embed)
-        except discord.Forbidden:
-            logger.warning(f"無法發送訊息到頻道 {self.config.get('channel_id', 0)}，請檢查機器人權限")
-            return
+        await self.post_log(
+            embed, "member_banned", guild, user_id = user.id, target_id = executor["user"].id if executor else None,
+            extra = {"reason": executor["reason"]} if executor and executor["reason"] else None
+        )
 
     # 解除禁止成員事件
-    @commands.Cog.listener()
-    async def on_member_unban(self, guild: discord.Guild, user: discord.User):
+    async def log_member_unban(self, guild: discord.Guild, user: discord.User):
         embed = discord.Embed(
             title="成員紀錄",
             description="解除禁止成員",
@@ -181,116 +619,86 @@ class DcLogging(commands.Cog):
             return
         if user.bot and self.config.get("enabled_for_bot", False) == False:
             return
+        executor = await self._executor(guild, discord.AuditLogAction.unban, user.id)
         embed.add_field(name="成員", value=user.mention)
-        embed.add_field(name="執行者", value=guild.me.mention)
+        embed.add_field(name="執行者", value=executor["user"].mention if executor else "未知")
 
         if self.config.get("console", False) == True:
-            logger.info(f"事件：解除禁止成員\n成員：{user.mention}\n執行者：{guild.me.mention}")
-        
-        try:
-            await self.bot.get_channel(self.config.get("channel_id", 0)).send(embed=embed)
-        except discord.Forbidden:
-            logger.warning(f"無法發送訊息到頻道 {self.config.get('channel_id', 0)}，請檢查機器人權限")
-            return
-
-    # 靜音成員事件
-    @commands.Cog.listener()
-    async def on_member_update(self, before: discord.Member, after: discord.Member):
-        embed = discord.Embed(
-            title="成員紀錄",
-            description="靜音成員",
-            color=0xffecf0
-        )
-        if self.config.get("enabled", False) == False or self.log_events.get("member_muted", False) == False:
-            return
-        if before.guild_permissions.mute_members == after.guild_permissions.mute_members:
-            return
-        embed.add_field(name="成員", value=before.mention)
-        embed.add_field(name="執行者", value=before.guild.me.mention)
+            logger.info(f"事件：解除禁止成員\n成員：{user.mention}\n執行者：{executor['user'].mention if executor else '未知'}")
         
-        if self.config.get("console", False) == True:
-            logger.info(f"事件：靜音成員\n成員：{before.mention}\n執行者：{before.guild.me.mention}")
+        await self.post_log(embed, "member_unbanned", guild, user_id = user.id, target_id = executor["user"].id if executor else None)
 
-        try:
-            await self.bot.get_channel(self.config.get("channel_id", 0)).send(embed=embed)
-        except discord.Forbidden:
-            logger.warning(f"無法發送訊息到頻道 {self.config.get('channel_id', 0)}，請檢查機器人權限")
+    # 成員更新事件：身分組、禁言、暱稱與伺服器頭像的變更合併成一筆紀錄
+    async def log_member_update(self, before: discord.Member, after: discord.Member):
+        if self.config.get("enabled", False) == False:
             return
-    
-    # 解除靜音成員事件
-    @commands.Cog.listener()
-    async def on_member_update(self, before: discord.Member, after: discord.Member):
         embed = discord.Embed(
             title="成員紀錄",
-            description="解除靜音成員",
+            description="成員更新",
             color=0xececff
         )
-        if self.config.get("enabled", False) == False or self.log_events.get("member_unmuted", False) == False:
-            return
-        if before.guild_permissions.mute_members == after.guild_permissions.mute_members:
-            return
-        embed.add_field(name="成員", value=before.mention)
-        embed.add_field(name="執行者", value=before.guild.me.mention)
+        embed.add_field(name="成員", value=after.mention)
+        changes = {}
+        console = []
 
-        if self.config.get("console", False) == True:
-            logger.info(f"事件：解除靜音成員\n成員：{before.mention}\n執行者：{before.guild.me.mention}")
-        
-        try:
-            await self.bot.get_channel(self.config.get("channel_id", 0)).send(embed=embed)
-        except discord.Forbidden:
-            logger.warning(f"無法發送訊息到頻道 {self.config.get('channel_id', 0)}，請檢查機器人權限")
-            return
-    
-    # 加入角色事件
-    @commands.Cog.listener()
-    async def on_member_update(self, before: discord.Member, after: discord.Member):
-        embed = discord.Embed(
-            title="成員紀錄",
-            description="加入角色",
-            color=0xececff
-        )
-        if self.config.get("enabled", False) == False or self.log_events.get("member_role_add", False) == False:
-            return
-        if before.roles == after.roles:
-            return
-        embed.add_field(name="成員", value=before.mention)
-        embed.add_field(name="加入角色", value=", ".join([role.mention for role in after.roles if role not in before.roles]))
-        # embed.add_field(name="執行者", value=before.guild.me.mention)
+        if self.log_events.get("member_role_add", False) or self.log_events.get("member_role_remove", False):
+            before_roles = {role.id for role in before.roles}
+            after_roles = {role.id for role in after.roles}
+            if before_roles != after_roles:
+                added = after_roles - before_roles
+                removed = before_roles - after_roles
+                if added and self.log_events.get("member_role_add", False):
+                    changes["roles_added"] = sorted(added)
+                    value = ", ".join(f"<@&{role_id}>" for role_id in changes["roles_added"])
+                    embed.add_field(name="加入角色", value=_field_value(value))
+                    console.append(f"加入角色：{value}")
+                if removed and self.log_events.get("member_role_remove", False):
+                    changes["roles_removed"] = sorted(removed)
+                    value = ", ".join(f"<@&{role_id}>" for role_id in changes["roles_removed"])
+                    embed.add_field(name="移除角色", value=_field_value(value))
+                    console.append(f"移除角色：{value}")
 
-        if self.config.get("console", False) == True:
-            logger.info(f"事件：加入角色\n成員：{before.mention}\n加入角色：{', '.join([role.mention for role in after.roles if role not in before.roles])}")
-        
-        try:
-            await self.bot.get_channel(self.config.get("channel_id", 0)).send(embed=embed)
-        except discord.Forbidden:
-            logger.warning(f"無法發送訊息到頻道 {self.config.get('channel_id', 0)}，請檢查機器人權限")
-            return
+        if before.timed_out_until != after.timed_out_until:
+            if after.timed_out_until is not None and self.log_events.get("member_muted", False):
+                changes["timed_out_until"] = after.timed_out_until.timestamp()
+                embed.add_field(name="禁言至", value=f"<t:{int(changes['timed_out_until'])}:f>")
+                console.append(f"禁言至：{after.timed_out_until.strftime('%Y-%m-%d %H:%M:%S')}")
+            elif after.timed_out_until is None and self.log_events.get("member_unmuted", False):
+                changes["timed_out_until"] = None
+                embed.add_field(name="解除禁言", value="是")
+                console.append("解除禁言")
 
-    # 移除角色事件
-    @commands.Cog.listener()
-    async def on_member_update(self, before: discord.Member, after: discord.Member):
-        embed = discord.Embed(
-            title="成員紀錄",
-            description="移除角色",
-            color=0xffecf0
-        )
-        if self.config.get("enabled", False) == False or self.log_events.get("member_role_remove", False) == False:
-            return
-        if before.roles == after.roles:
+        if before.nick != after.nick and self.log_events.get("member_nick", False):
+            changes["nick"] = [before.nick, after.nick]
+            value = f"{before.nick or '（無）'} → {after.nick or '（無）'}"
+            embed.add_field(name="暱稱", value=_field_value(value))
+            console.append(f"暱稱：{value}")
+
+        if before.guild_avatar != after.guild_avatar and self.log_events.get("member_avatar", False):
+            changes["avatar"] = after.guild_avatar.key if after.guild_avatar else None
+            embed.add_field(name="伺服器頭像", value="已更換" if after.guild_avatar else "已移除")
+            embed.set_thumbnail(url=after.display_avatar.url)
+            console.append("伺服器頭像：" + ("已更換" if after.guild_avatar else "已移除"))
+
+        if not changes:
             return
-        embed.add_field(name="成員", value=before.mention)
-        embed.add_field(name="移除角色", value=", ".join([role.mention for role in before.roles if role not in after.roles]))
-        # embed.add_field(name="執行者", value=before.guild.me.mention)
+
+        # 身分組變更與禁言在審核日誌中是不同的動作
+        if "roles_added" in changes or "roles_removed" in changes:
+            executor = await self._executor(after.guild, discord.AuditLogAction.member_role_update, after.id)
+        elif "timed_out_until" in changes:
+            executor = await self._executor(after.guild, discord.AuditLogAction.member_update, after.id)
+        else:
+            executor = None
+        if executor is not None:
+            embed.add_field(name="執行者", value=executor["user"].mention)
+            console.append(f"執行者：{executor['user'].mention}")
 
         if self.config.get("console", False) == True:
-            logger.info(f"事件：移除角色\n成員：{before.mention}\n移除角色：{', '.join([role.mention for role in before.roles if role not in after.roles])}")
-        
-        try:
-            await self.bot.get_channel(self.config.get("channel_id", 0)).send(embed=embed)
-        except discord.Forbidden:
-            logger.warning(f"無法發送訊息到頻道 {self.config.get('channel_id', 0)}，請檢查機器人權限")
-            return
-    
+            logger.info(f"事件：成員更新\n成員：{after.mention}\n" + "\n".join(console))
+
+        await self.post_log(embed, "member_update", after.guild, user_id = after.id, target_id = executor["user"].id if executor else None, extra = changes)
+
     # 語音頻道相關事件
     @commands.Cog.listener()
     async def on_voice_state_update(self, member: discord.Member, before: discord.VoiceState, after: discord.VoiceState):
@@ -299,7 +707,9 @@ class DcLogging(commands.Cog):
             description="語音頻道相關事件",
             color=0xececff
         )
+        event = None
         if before.channel is None and after.channel and self.log_events.get("vc_join", False) == True:
+            event = "vc_join"
             embed.add_field(name="成員", value=member.mention)
             embed.add_field(name="加入語音頻道", value=after.channel.mention)
 
@@ -314,6 +724,7 @@ class DcLogging(commands.Cog):
                 logger.info(f"事件：加入語音頻道\n成員：{member.mention}\n加入語音頻道：{after.channel.mention}\n靜音：{muted}")
             
         elif before.channel and after.channel is None and self.log_events.get("vc_leave", False) == True:
+            event = "vc_leave"
             embed.add_field(name="成員", value=member.mention)
             embed.add_field(name="離開語音頻道", value=before.channel.mention)
 
@@ -328,6 +739,7 @@ class DcLogging(commands.Cog):
                 logger.info(f"事件：離開語音頻道\n成員：{member.mention}\n離開語音頻道：{before.channel.mention}\n靜音：{muted}")
             
         elif before.channel != after.channel and self.log_events.get("vc_move", False) == True:
+            event = "vc_move"
             embed.add_field(name="成員", value=member.mention)
             embed.add_field(name="移動：從", value=before.channel.mention)
             embed.add_field(name="移動：到", value=after.channel.mention)
@@ -342,11 +754,11 @@ class DcLogging(commands.Cog):
             if self.config.get("console", False) == True:
                 logger.info(f"事件：移動語音頻道\n成員：{member.mention}\n移動：從：{before.channel.mention}\n移動：到：{after.channel.mention}\n靜音：{muted}")
         
-        try:
-            await self.bot.get_channel(self.config.get("channel_id", 0)).send(embed=embed)
-        except discord.Forbidden:
-            logger.warning(f"無法發送訊息到頻道 {self.config.get('channel_id', 0)}，請檢查機器人權限")
+        # 自己靜音、拒聽等變化或未啟用的事件，不送出空的紀錄
+        if event is None:
             return
+        channel = after.channel or before.channel
+        await self.post_log(embed, event, member.guild, user_id = member.id, channel_id = channel.id if channel else None)
 
 async def setup(bot):
     if not bot.config.get("dc_logging", {}).get("enable", False):
@@ -0,0 +1,108 @@
+# 除錯資訊
+
+import discord
+from discord.ext import commands
+from discord import app_commands
+import logging
+from plugins.member_index import MemberIndex
+
+logger = logging.getLogger(__name__)
+
+COG_INTRO = {
+    "name": "除錯資訊",
+    "description": "提供機器人管理員查看記憶體與效能狀態的指令",
+    "author": "SamHacker",
+    "countributors": ["SamHacker"],
+    "config_sections": ["admin_id", "member_index", "perf"],
+}
+
+def _format_bytes(size: int) -> str:
+    for unit in ("B", "KiB", "MiB"):
+        if size < 1024:
+            return f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GiB"
+
+class Debug(commands.Cog):
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+        logger.info("Debug cog 已經載入")
+
+    debug = app_commands.Group(
+        name = "debug",
+        description = "除錯資訊（僅限機器人管理員）"
+    )
+
+    @debug.command(
+        name = "memory",
+        description = "比較精簡成員索引與 discord.py 成員快取的記憶體用量"
+    )
+    async def memory(self, interaction: discord.Interaction):
+        if interaction.user.id not in self.bot.config["admin_id"]:
+            await interaction.response.send_message("你沒有權限使用此機器人", ephemeral = True)
+            return
+        cache = MemberIndex.discord_footprint(self.bot)
+        total = sum(guild.member_count or 0 for guild in self.bot.guilds)
+        embed = discord.Embed(
+            title = "記憶體用量",
+            description = f"伺服器共有 {total} 位成員（數值為估計值）",
+            color = 0x718e73
+        )
+        embed.add_field(
+            name = "discord.py 成員快取",
+            value = f"{cache['members']} 位成員，約 {_format_bytes(cache['bytes'])}",
+            inline = False
+        )
+        index = self.bot.member_index
+        if index is None:
+            embed.add_field(name = "精簡成員索引", value = "未啟用（可在 cfg.yml 的 member_index 啟用）", inline = False)
+        else:
+            footprint = index.footprint()
+            per_member = footprint["bytes"] / footprint["members"] if footprint["members"] else 0
+            embed.add_field(
+                name = "精簡成員索引",
+                value = f"{footprint['members']} 位成員，約 {_format_bytes(footprint['bytes'])}（每位約 {per_member:.0f} B）",
+                inline = False
+            )
+        await interaction.response.send_message(embed = embed, ephemeral = True)
+
+    perf = app_commands.Group(
+        name = "perf",
+        description = "處理器效能（僅限機器人管理員）"
+    )
+
+    @perf.command(
+        name = "top",
+        description = "列出最近一段時間內最慢的事件監聽器與指令"
+    )
+    @app_commands.describe(minutes = "統計最近幾分鐘", limit = "顯示幾個處理器")
+    async def perf_top(
+        self,
+        interaction: discord.Interaction,
+        minutes: app_commands.Range[int, 1, 1440] = 10,
+        limit: app_commands.Range[int, 1, 25] = 10
+    ):
+        if interaction.user.id not in self.bot.config["admin_id"]:
+            await interaction.response.send_message("你沒有權限使用此機器人", ephemeral = True)
+            return
+        results = self.bot.perf.top(minutes, limit)
+        embed = discord.Embed(
+            title = "最慢的處理器",
+            description = f"最近 {minutes} 分鐘，依 p99 排序" if results else f"最近 {minutes} 分鐘沒有任何紀錄",
+            color = 0x718e73
+        )
+        for item in results:
+            embed.add_field(
+                name = item["name"],
+                value = (
+                    f"{item['calls']} 次｜p50 {item['p50'] * 1000:.1f}ms｜p95 {item['p95'] * 1000:.1f}ms｜"
+                    f"p99 {item['p99'] * 1000:.1f}ms｜最長 {item['max'] * 1000:.1f}ms\n"
+                    f"第一次 await 前 p95 {item['first_await_p95'] * 1000:.1f}ms"
+                ),
+                inline = False
+            )
+        await interaction.response.send_message(embed = embed, ephemeral = True)
+
+async def setup(bot: commands.Bot):
+    await bot.add_cog(Debug(bot))
+    logger.info(f"{COG_INTRO['name']} 已經註冊")
@@ -16,6 +16,7 @@ COG_INTRO = {
     "description": "控制採用翼手龍面版（Pterdactyl）的伺服器",
     "author": "SamHacker",
     "countributors": ["SamHacker"],
+    "config_sections": ["pterodactyl"],
 }
 
 class PteroManager(commands.Cog):
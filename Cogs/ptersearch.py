@@ -4,26 +4,25 @@ import discord
 from discord.ext import commands
 from discord import app_commands
 import logging
-import yaml
 # from pydactyl import PterodactylClient
 from plugins.discordcore import *
 from plugins.mcsm_client import mcsmClient
+from plugins.config_service import get_config
+from plugins.http_service import get_http
 import re
 from discord.ext import tasks
 
-with open('cfg.yml', "r", encoding="utf-8") as file:
-    cfg_data = yaml.safe_load(file)
-    if cfg_data is None:
-        raise ValueError("配置文件讀取失敗或為空")
-    config = cfg_data.get("ptersearch")
-    mcsm_cfg = cfg_data.get("mcsm")
-    if config is None:
-        raise ValueError("配置文件中缺少 'ptersearch' 鍵")
-    if mcsm_cfg is None:
-        raise ValueError("配置文件中缺少 'mcsm' 鍵")
-    taskCfg = config.get("upd_task")
-    if taskCfg is None:
-        raise ValueError("配置文件中缺少 'upd_task' 鍵")
+# 排程間隔在類別定義時就需要，因此在載入時取用共用設定的快照（重新載入設定時會重新執行）
+cfg_data = get_config()
+config = cfg_data.get("ptersearch")
+mcsm_cfg = cfg_data.get("mcsm")
+if config is None:
+    raise ValueError("配置文件中缺少 'ptersearch' 鍵")
+if mcsm_cfg is None:
+    raise ValueError("配置文件中缺少 'mcsm' 鍵")
+taskCfg = config.get("upd_task")
+if taskCfg is None:
+    raise ValueError("配置文件中缺少 'upd_task' 鍵")
 
 logger = logging.getLogger(__name__)
 
@@ -32,6 +31,7 @@ COG_INTRO = {
     "description": "搜尋經 DiscordSRV 插件綁定的玩家資訊，並以本地 SQLite 資料庫快取",
     "author": "SamHacker",
     "countributors": ["SamHacker"],
+    "config_sections": ["ptersearch", "mcsm"],
 }
 
 class PteroSearch(commands.Cog):
@@ -108,9 +108,8 @@ class PteroSearch(commands.Cog):
         playerName: str
             玩家名稱
         """
-        async with aiohttp.ClientSession() as session:
-            async with session.get(f"https://api.mojang.com/users/profiles/minecraft/{playerName}") as response:
-                return await response.json()["id"]
+        response = await get_http().get(f"https://api.mojang.com/users/profiles/minecraft/{playerName}")
+        return response["data"]["id"]
 
     @s.command(
         name = "藉minecraft查詢",
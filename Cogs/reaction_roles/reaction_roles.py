@@ -5,6 +5,7 @@ import yaml
 import os
 import inspect
 from typing import Union
+from plugins.member_index import MemberIndex
 
 logger = logging.getLogger(__name__)
 
@@ -21,6 +22,11 @@ COG_INTRO = {
     "description": "使用反應身分組、配置視圖等方式讓使用者取得身分組。",
     "author": "SamHacker",
     "countributors": ["SamHacker"],
+    "config_sections": ["reaction_roles"],
+    "enabled_by": "reaction_roles.enable",
+    "intents": {"guild_reactions": True, "members": True},
+    # 移除反應時需要從快取取得成員
+    "chunk_members": True,
 }
 
 class ReactionRules(commands.Cog):
@@ -70,7 +76,8 @@ class ReactionRules(commands.Cog):
                 # 取得身分組
                 guild = self.bot.get_guild(payload.guild_id)
                 role = guild.get_role(reaction["role_id"])
-                member = guild.get_member(payload.user_id)
+                # 新增反應的事件本身就帶有成員資料，不需要成員快取
+                member = payload.member or await MemberIndex.resolve(guild, payload.user_id)
                 # 給予身分組
                 await member.add_roles(role)
                 logger.info(f"{member} 取得了 {role} 身分組。")
@@ -95,7 +102,7 @@ class ReactionRules(commands.Cog):
                 # 取得身分組
                 guild = self.bot.get_guild(payload.guild_id)
                 role = guild.get_role(reaction["role_id"])
-                member = guild.get_member(payload.user_id)
+                member = await MemberIndex.resolve(guild, payload.user_id)
                 # 移除身分組
                 await member.remove_roles(role)
                 logger.info(f"{member} 移除了 {role} 身分組。")
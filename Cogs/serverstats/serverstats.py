@@ -3,6 +3,7 @@ import discord
 from discord.ext import tasks, commands
 import time
 from discord import app_commands
+from plugins import metrics
 
 logger = logging.getLogger(__name__)
 
@@ -11,6 +12,14 @@ COG_INTRO = {
     "description": "在伺服器中的狀態類別建立多個頻道，並由機器人自動更新狀態，如人數、身分組數。",
     "author": "SamHacker",
     "countributors": ["SamHacker"],
+    "config_sections": ["serverstats"],
+    "enabled_by": "serverstats.enabled",
+    # 線上／離線成員計數需要成員的狀態，其他計數只需要成員清單
+    "intents": {
+        "members": True,
+        "presences": ["serverstats.counters.member.online_members.enabled", "serverstats.counters.member.offline_members.enabled"],
+    },
+    "chunk_members": True,
 }
 
 class ServerStatus(commands.Cog):
@@ -89,12 +98,14 @@ class ServerStatus(commands.Cog):
         # 取得與成員有關的統計配置
         member_config = self.ct_config.get("member", {})
         g_member = guild.members
-        logger.debug(f"更新伺服器 {guild.name} 的成員數量：{len(g_member)}")
+        # 啟用精簡成員索引時，計數改由索引提供，不需要 discord.py 的完整成員快取
+        index = self.bot.member_index
+        logger.debug(f"更新伺服器 {guild.name} 的成員數量：{index.count(guild.id) if index else len(g_member)}")
         # 更新所有成員計數
         # （member下的all_members）
         all_members_config = member_config.get("all_members", {})
         if all_members_config.get("enabled", False):
-            count = len(g_member)
+            count = index.count(guild.id) if index else len(g_member)
             channel_id = all_members_config.get("channel_id")
             await self._update_channel_name(
                 channel_id,
@@ -110,7 +121,10 @@ class ServerStatus(commands.Cog):
         # （member下的online_members）
         online_members_config = member_config.get("online_members", {})
         if online_members_config.get("enabled", False):
-            count = sum(1 for member in g_member if member.status == discord.Status.online)
+            if index:
+                count = index.count_status(guild.id, discord.Status.online)
+            else:
+                count = sum(1 for member in g_member if member.status == discord.Status.online)
             channel_id = online_members_config.get("channel_id")
             await self._update_channel_name(
                 channel_id,
@@ -128,7 +142,10 @@ class ServerStatus(commands.Cog):
         # （member下的offline_members）
         offline_members_config = member_config.get("offline_members", {})
         if offline_members_config.get("enabled", False):
-            count = sum(1 for member in g_member if member.status == discord.Status.offline)
+            if index:
+                count = index.count_status(guild.id, discord.Status.offline)
+            else:
+                count = sum(1 for member in g_member if member.status == discord.Status.offline)
             channel_id = offline_members_config.get("channel_id")
             await self._update_channel_name(
                 channel_id,
@@ -146,7 +163,10 @@ class ServerStatus(commands.Cog):
         # （member下的humans）
         humans_config = member_config.get("humans", {})
         if humans_config.get("enabled", False):
-            count = sum(1 for member in g_member if not member.bot)
+            if index:
+                count = index.count_bots(guild.id, bot=False)
+            else:
+                count = sum(1 for member in g_member if not member.bot)
             channel_id = humans_config.get("channel_id")
             await self._update_channel_name(
                 channel_id,
@@ -164,7 +184,10 @@ class ServerStatus(commands.Cog):
         # （member下的bots）
         bots_config = member_config.get("bots", {})
         if bots_config.get("enabled", False):
-            count = sum(1 for member in g_member if member.bot)
+            if index:
+                count = index.count_bots(guild.id)
+            else:
+                count = sum(1 for member in g_member if member.bot)
             channel_id = bots_config.get("channel_id")
             await self._update_channel_name(
                 channel_id,
@@ -200,7 +223,10 @@ class ServerStatus(commands.Cog):
         # （role下的member_no_role）
         no_role_config = self.ct_config.get("member_no_role", {})
         if no_role_config.get("enabled", False):
-            count = sum(1 for member in g_member if not member.roles)
+            if index:
+                count = index.count_no_role(guild.id)
+            else:
+                count = sum(1 for member in g_member if not member.roles)
             channel_id = no_role_config.get("channel_id")
             await self._update_channel_name(
                 channel_id,
@@ -227,7 +253,7 @@ class ServerStatus(commands.Cog):
             #    ...
             # ]
             # 是否存在
-            if isinstance(role_config.get("role"), list):
+            if isinstance(role_config.get("role"), (list, tuple)):
                 for role in role_config.get("role"):
                     # 檢查role_id鍵是否存在
                     if role.get("role_id") and role.get("channel_id"):
@@ -235,7 +261,10 @@ class ServerStatus(commands.Cog):
                         role_obj = guild.get_role(role["role_id"])
                         if role_obj:
                             # 計算擁有該身分組的成員數量
-                            count = sum(1 for member in g_member if role_obj in member.roles)
+                            if index:
+                                count = index.count_role(guild.id, role_obj.id)
+                            else:
+                                count = sum(1 for member in g_member if role_obj in member.roles)
                             channel_id = role["channel_id"]
                             await self._update_channel_name(
                                 channel_id,
@@ -439,6 +468,7 @@ class ServerStatus(commands.Cog):
             logger.debug(f"伺服器計數器 'stickers' 未啟用，跳過更新。")
         end_time = time.time()
         elapsed_time = end_time - start_time
+        metrics.UPDATE_STATUS_SECONDS.observe(elapsed_time)
         logger.info(f"更新伺服器狀態完成，共耗時 {elapsed_time:.2f} 秒。")
 
         # 更新上次更新的時間
@@ -5,17 +5,46 @@ import os
 import discord
 from discord.ext import commands
 from discord import app_commands
-import yaml
 import json
+from plugins.config_service import get_config
+from plugins.member_index import MemberIndex
+from plugins.templates import compile_template
 
 logger = logging.getLogger(__name__)
 
-with open('cfg.yml', "r", encoding="utf-8") as file:
-    config = yaml.safe_load(file)["tickets"]
-    message = config["messages"]
-    multiline_msg = config["multiline_messages"]
-    button_texts = config["button_texts"]
-    embed_txt = config["embed_text"]
+# 按鈕文字在類別定義時就需要，因此在載入時取用共用設定的快照（重新載入設定時會重新執行）
+config = get_config()["tickets"]
+message = config["messages"]
+multiline_msg = config["multiline_messages"]
+button_texts = config["button_texts"]
+embed_txt = config["embed_text"]
+
+# 多行訊息可以使用的佔位符
+PLACEHOLDERS = ("user", "user_mention", "user_id", "channel", "channel_mention", "channel_id", "staff_mention")
+DEFAULT_MULTILINE = {
+    "welcome_ticket": "歡迎 {user_mention} 開啟客服單！",
+    "call_staff": "{staff_mention} 有人呼叫客服！請盡快前往 {channel_mention} 處理。",
+    "staff_notification": "{user_mention} 在 {channel_mention} 呼叫客服，請盡快處理。"
+}
+# 多行訊息在載入時解析並檢查佔位符，缺少或無效時使用預設訊息
+multiline_templates = {
+    key: compile_template(
+        multiline_msg.get(key, default), PLACEHOLDERS, fallback=default, name=f"tickets.multiline_messages.{key}"
+    )
+    for key, default in DEFAULT_MULTILINE.items()
+}
+
+def _template_values(user: discord.abc.User, channel: discord.abc.GuildChannel, staff_role_ids: list) -> dict:
+    # 只有樣板中用到的佔位符才會取值
+    return {
+        "user": lambda: user.name,
+        "user_mention": lambda: user.mention,
+        "user_id": lambda: user.id,
+        "channel": lambda: channel.name,
+        "channel_mention": lambda: channel.mention,
+        "channel_id": lambda: channel.id,
+        "staff_mention": lambda: ", ".join([channel.guild.get_role(role_id).mention for role_id in staff_role_ids])
+    }
 
 SELF_PATH = os.path.dirname(os.path.abspath(__file__))
 os.chdir(SELF_PATH)
@@ -38,6 +67,11 @@ COG_INTRO = {
     "description": "為伺服器新增客服單功能，由夜間部設計",
     "author": "SamHacker",
     "countributors": ["SamHacker", "!夜間部（woodypegasus_tw）"],
+    "config_sections": ["tickets"],
+    "enabled_by": "tickets.enabled",
+    # 以名稱查詢成員與列出客服人員身分組的成員都需要完整的成員快取
+    "intents": {"members": True},
+    "chunk_members": True,
 }
 
 class MainMenu(discord.ui.View):
@@ -87,17 +121,8 @@ class MainMenu(discord.ui.View):
             )
 
             # 發送歡迎訊息
-            staff_mentions = ", ".join([GUILD.get_role(role_id).mention for role_id in STAFF_ROLE_ID])
             await CHANNEL.send(
-                multiline_msg["welcome_ticket"].format(
-                    user = AUTHOR.name,
-                    user_mention = AUTHOR.mention,
-                    user_id = AUTHOR.id,
-                    channel = CHANNEL.name,
-                    channel_mention = CHANNEL.mention,
-                    channel_id = CHANNEL.id,
-                    staff_mention = staff_mentions
-                ),
+                multiline_templates["welcome_ticket"].render(_template_values(AUTHOR, CHANNEL, STAFF_ROLE_ID)),
                 view = TicketView(self.bot)
             )
         except Exception as e:
@@ -158,7 +183,11 @@ class TicketConfirmClose(discord.ui.View):
             description=f"客服單 {interaction.channel.name} 已關閉"
         )
         user_name = interaction.channel.name.split("-")[1]  # 取得客服單的用戶名稱
-        user = interaction.guild.get_member_named(user_name)
+        index = interaction.client.member_index
+        if index:
+            user = index.get_named(interaction.guild.id, user_name)
+        else:
+            user = interaction.guild.get_member_named(user_name)
         embed.add_field(name="開啟人員", value=f"<@{user.id}>", inline=True)
 
         # 傳送 log 文件至 config["log_channel_id"] 中
@@ -277,30 +306,20 @@ class TicketView(discord.ui.View):
                 )
                 return
             # 傳送呼叫訊息
-            staff_mentions = ", ".join([GUILD.get_role(role_id).mention for role_id in STAFF_ROLE_ID])
-            await interaction.response.send_message(
-                multiline_msg["call_staff"].format(
-                    user=AUTHOR.name,
-                    user_mention=AUTHOR.mention,
-                    user_id=AUTHOR.id,
-                    channel=interaction.channel.name,
-                    channel_mention=interaction.channel.mention,
-                    channel_id=interaction.channel.id,
-                    staff_mention=staff_mentions
-                )
-            )
+            values = _template_values(AUTHOR, interaction.channel, STAFF_ROLE_ID)
+            await interaction.response.send_message(multiline_templates["call_staff"].render(values))
+            # 每位客服人員收到的通知相同，只產生一次
+            notification = multiline_templates["staff_notification"].render(values)
             # 通知客服人員
             for role_id in STAFF_ROLE_ID:
-                role = GUILD.get_role(role_id)
-                for member in role.members:
-                    await member.send(
-                        multiline_msg["staff_notification"].format(
-                            user=AUTHOR.name,
-                            user_mention=AUTHOR.mention,
-                            channel=interaction.channel.name,
-                            channel_mention=interaction.channel.mention
-                        )
-                    )
+                index = interaction.client.member_index
+                if index:
+                    # 索引只保存成員 ID，需要私訊時才取得完整的成員物件
+                    members = [await MemberIndex.resolve(GUILD, member_id) for member_id in index.with_role(GUILD.id, role_id)]
+                else:
+                    members = GUILD.get_role(role_id).members
+                for member in members:
+                    await member.send(notification)
         except Exception as e:
             logger.error(f"呼叫客服時發生錯誤：{e}")
             await interaction.response.send_message("發生錯誤：無法呼叫客服", ephemeral=True)
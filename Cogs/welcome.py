@@ -4,43 +4,65 @@ import discord
 from discord.ext import commands
 from discord import app_commands
 import logging
-import yaml
 
-with open('cfg.yml', "r", encoding="utf-8") as file:
-    config = yaml.safe_load(file)
+from plugins.templates import compile_template
 
 logger = logging.getLogger(__name__)
 
+# 歡迎與離開訊息可以使用的佔位符
+PLACEHOLDERS = (
+    "member", "member_name", "guild", "member_count", "member_id", "member_created_at", "member_joined_at", "member_avatar"
+)
+
 COG_INTRO = {
     "name": "歡迎訊息",
     "description": "歡迎新使用者加入 Discord 伺服器的訊息",
     "author": "SamHacker",
     "countributors": ["SamHacker"],
+    "config_sections": [
+        "welcome_channel_id", "welcome_title", "welcome_message",
+        "leave_channel_id", "leave_title", "leave_message"
+    ],
+    "intents": {"members": True},
 }
 
 class Welcome(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        self.config = bot.config
+        # 訊息樣板在載入時解析並檢查佔位符
+        self.welcome_message = compile_template(
+            self.config['welcome_message'], PLACEHOLDERS, fallback="歡迎 {member} 加入 {guild}！", name="welcome_message"
+        )
+        self.leave_message = compile_template(
+            self.config['leave_message'], PLACEHOLDERS, fallback="{member_name} 離開了 {guild}", name="leave_message"
+        )
         logger.info("Welcome cog 已經載入")
 
+    @staticmethod
+    def _values(member: discord.Member) -> dict:
+        # 只有樣板中用到的佔位符才會取值
+        return {
+            "member": lambda: member.mention,
+            "member_name": lambda: member.name,
+            "guild": lambda: member.guild.name,
+            "member_count": lambda: member.guild.member_count,
+            "member_id": lambda: member.id,
+            "member_created_at": lambda: member.created_at,
+            "member_joined_at": lambda: member.joined_at,
+            "member_avatar": lambda: member.avatar.url
+        }
+
     # 事件
     @commands.Cog.listener()
     async def on_member_join(self, member: discord.Member):
         logger.info(f'{member} 加入了伺服器')
+        config = self.config
         channel_id = config['welcome_channel_id']
         # 取得頻道
         channel = member.guild.get_channel(channel_id)
         # 傳送訊息
-        fmt = config['welcome_message'].format(
-            member = member.mention,
-            member_name = member.name,
-            guild = member.guild.name,
-            member_count = len(member.guild.members),
-            member_id = member.id,
-            member_created_at = member.created_at,
-            member_joined_at = member.joined_at,
-            member_avatar = member.avatar.url
-        )
+        fmt = self.welcome_message.render(self._values(member))
         embed = discord.Embed(
             title = config['welcome_title'],
             description = fmt,
@@ -52,20 +74,12 @@ class Welcome(commands.Cog):
     @commands.Cog.listener()
     async def on_member_remove(self, member: discord.Member):
         logger.info(f'{member} 離開了伺服器')
+        config = self.config
         channel_id = config['leave_channel_id']
         # 取得頻道
         channel = member.guild.get_channel(channel_id)
         # 傳送訊息
-        fmt = config['leave_message'].format(
-            member = member.mention,
-            member_name = member.name,
-            guild = member.guild.name,
-            member_count = len(member.guild.members),
-            member_id = member.id,
-            member_created_at = member.created_at,
-            member_joined_at = member.joined_at,
-            member_avatar = member.avatar.url
-        )
+        fmt = self.leave_message.render(self._values(member))
         embed = discord.Embed(
             title = config["leave_title"],
             description = fmt,
@@ -0,0 +1,87 @@
+# 自動回覆規則比對的微基準測試
+
+import argparse
+import asyncio
+import random
+import re
+import string
+import time
+
+from plugins.rule_matcher import RuleMatcher
+
+def make_rules(count: int, regex_ratio: float, rng: random.Random) -> list:
+    """產生 count 條規則，其中約 regex_ratio 比例為正規表示式"""
+    rules = []
+    for _ in range(count):
+        word = "".join(rng.choices(string.ascii_lowercase, k=rng.randint(5, 10)))
+        if rng.random() < regex_ratio:
+            rules.append({"trigger": rf"(?i)\b{word}\d*\b", "response": "regex", "match_regex": True})
+        else:
+            rules.append({"trigger": word, "response": "literal", "match_regex": False})
+    return rules
+
+def make_messages(rules: list, count: int, hit_ratio: float, rng: random.Random) -> list:
+    """產生 count 則訊息，其中約 hit_ratio 比例包含某條規則的觸發字串"""
+    filler = ["lorem", "ipsum", "dolor", "sit", "amet", "hello", "everyone", "gg", "minecraft", "server"]
+    messages = []
+    for _ in range(count):
+        words = rng.choices(filler, k=rng.randint(3, 20))
+        if rng.random() < hit_ratio:
+            trigger = rng.choice(rules)["trigger"]
+            words.insert(rng.randrange(len(words) + 1), re.sub(r"\(\?i\)\\b|\\d\*\\b", "", trigger))
+        messages.append(" ".join(words))
+    return messages
+
+def naive_match(rules: list, content: str):
+    """原本 Auto_Reply.handle_message 的比對方式：依序檢查每條規則"""
+    for rule in rules:
+        if rule["match_regex"]:
+            if re.search(rule["trigger"], content):
+                return rule
+        elif rule["trigger"] in content:
+            return rule
+    return None
+
+async def measure(function, messages: list) -> tuple:
+    """
+    Returns
+    -------
+    tuple[float, list]
+        (每則訊息平均耗時（微秒）, 每則訊息的比對結果)
+    """
+    results = []
+    start = time.perf_counter()
+    for content in messages:
+        result = function(content)
+        if asyncio.iscoroutine(result):
+            result = await result
+        results.append(result)
+    return (time.perf_counter() - start) / len(messages) * 1_000_000, results
+
+def main(argv: list = None):
+    parser = argparse.ArgumentParser(description="比較自動回覆規則逐條比對與編譯後比對的每則訊息耗時")
+    parser.add_argument("--sizes", default="10,100,1000,5000", help="規則數量，以逗號分隔")
+    parser.add_argument("--messages", type=int, default=300, help="每種規則數量測試的訊息數")
+    parser.add_argument("--regex-ratio", type=float, default=0.2, help="正規表示式規則的比例")
+    parser.add_argument("--hit-ratio", type=float, default=0.1, help="觸發規則的訊息比例")
+    parser.add_argument("--seed", type=int, default=0)
+    asyncio.run(run(parser.parse_args(argv)))
+
+async def run(args):
+    print(f"{'規則數':>8} {'逐條比對（µs/則）':>18} {'編譯後（µs/則）':>16} {'編譯耗時（ms）':>14}")
+    for size in (int(value) for value in args.sizes.split(",")):
+        rng = random.Random(args.seed)
+        rules = make_rules(size, args.regex_ratio, rng)
+        messages = make_messages(rules, args.messages, args.hit_ratio, rng)
+        start = time.perf_counter()
+        matcher = RuleMatcher(rules)
+        compile_ms = (time.perf_counter() - start) * 1000
+        naive, expected = await measure(lambda content: naive_match(rules, content), messages)
+        compiled, results = await measure(matcher.match, messages)
+        # 確認結果與逐條比對相同
+        for content, rule, result in zip(messages, expected, results):
+            assert (result.config if result else None) is rule, f"比對結果不同：{content}"
+        print(f"{size:>8} {naive:>18.1f} {compiled:>16.1f} {compile_ms:>14.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,285 @@
+# 基準測試用的假 Gateway 資料與 REST 客戶端
+
+import asyncio
+import itertools
+import random
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+from discord import utils
+
+# 產生的 ID 從前一天開始，訊息要在 14 天內才能批量刪除
+EPOCH = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=1)
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+class GatewayFaker:
+    """
+    產生假的 Gateway 事件資料（與 Discord 送來的 JSON 相同格式）。
+
+    事件會交給 discord.py 原本的解析函式，齒輪收到的是真正的 discord.Message、
+    discord.Member 與 discord.RawReactionActionEvent，而不是另外模擬的物件。
+
+    Attributes
+    ----------
+    guild_id : int
+        假伺服器 ID
+    bot_id : int
+        機器人自己的使用者 ID
+    members : int
+        伺服器初始成員數
+    text_channels : list[int]
+        一般文字頻道 ID
+    log_channel : int
+        紀錄、歡迎與離開訊息使用的頻道 ID
+    announce_channel : int
+        自動刪除的公告頻道 ID
+    role_channel : int
+        反應身分組訊息所在的頻道 ID
+    role_message : int
+        反應身分組訊息 ID
+    stat_channels : list[int]
+        伺服器狀態使用的語音頻道 ID
+    roles : list[int]
+        身分組 ID（不含 @everyone）
+    emojis : list[str]
+        反應身分組使用的表情符號，與 roles 一一對應
+    """
+    def __init__(self, members: int = 1000, channels: int = 10, seed: int = 0):
+        self.random = random.Random(seed)
+        # 從固定的時間點產生 ID，相同的種子與成員數會得到相同的伺服器，錄下的事件流才能以內建設定重播
+        self._ids = itertools.count(utils.time_snowflake(EPOCH) + seed * 1_000_000_000)
+        self.guild_id = self.snowflake()
+        self.bot_id = self.snowflake()
+        self.members = members
+        self.text_channels = [self.snowflake() for _ in range(channels)]
+        self.log_channel = self.snowflake()
+        self.announce_channel = self.snowflake()
+        self.role_channel = self.snowflake()
+        self.role_message = self.snowflake()
+        self.stat_channels = [self.snowflake() for _ in range(3)]
+        self.roles = [self.snowflake() for _ in range(4)]
+        self.emojis = ["🎮", "🎨", "🎵", "📢"]
+        self._member_ids = [self.snowflake() for _ in range(members)]
+        # 被禁止的成員 ID，RecordingHTTP 以此產生審核日誌
+        self.banned = []
+
+    def snowflake(self) -> int:
+        return next(self._ids)
+
+    # 物件資料
+    def user(self, user_id: int, bot: bool = False) -> dict:
+        return {
+            "id": str(user_id),
+            "username": f"user{user_id % 100000}",
+            "discriminator": "0",
+            "global_name": None,
+            "avatar": "0" * 32,
+            "bot": bot
+        }
+
+    def member(self, user_id: int, roles: list = None) -> dict:
+        return {
+            "user": self.user(user_id),
+            "nick": None,
+            "roles": [str(role_id) for role_id in (roles or [])],
+            "joined_at": _now(),
+            "deaf": False,
+            "mute": False,
+            "flags": 0
+        }
+
+    def _channel(self, channel_id: int, name: str, position: int, type: int = 0) -> dict:
+        data = {
+            "id": str(channel_id),
+            "type": type,
+            "name": name,
+            "position": position,
+            "permission_overwrites": [],
+            "guild_id": str(self.guild_id)
+        }
+        if type == 2:
+            data.update(bitrate=64000, user_limit=0)
+        return data
+
+    def ready(self) -> dict:
+        return {"t": "READY", "d": {"user": self.user(self.bot_id, bot=True), "guilds": [{"id": str(self.guild_id), "unavailable": True}]}}
+
+    def guild(self) -> dict:
+        """GUILD_CREATE 的資料，包含頻道、身分組與初始成員"""
+        channels = [self._channel(channel_id, f"text-{i}", i) for i, channel_id in enumerate(self.text_channels)]
+        channels.append(self._channel(self.log_channel, "log", len(channels)))
+        channels.append(self._channel(self.announce_channel, "announce", len(channels)))
+        channels.append(self._channel(self.role_channel, "roles", len(channels)))
+        channels.extend(self._channel(channel_id, f"stat-{i}", len(channels) + i, 2) for i, channel_id in enumerate(self.stat_channels))
+        roles = [{"id": str(self.guild_id), "name": "@everyone", "permissions": "0", "position": 0, "color": 0,
+                  "hoist": False, "managed": False, "mentionable": False}]
+        roles.extend({"id": str(role_id), "name": f"role-{i}", "permissions": "0", "position": i + 1, "color": 0,
+                      "hoist": False, "managed": False, "mentionable": False} for i, role_id in enumerate(self.roles))
+        members = [self.member(self.bot_id)]
+        members[0]["user"]["bot"] = True
+        members.extend(self.member(user_id, self.random.sample(self.roles, self.random.randint(0, 2))) for user_id in self._member_ids)
+        return {
+            "id": str(self.guild_id),
+            "name": "benchmark",
+            "owner_id": str(self._member_ids[0] if self._member_ids else self.bot_id),
+            "member_count": len(members),
+            "large": len(members) > 250,
+            "roles": roles,
+            "channels": channels,
+            "members": members,
+            "presences": [
+                {"user": {"id": str(user_id)}, "status": self.random.choice(("online", "idle", "offline")), "activities": [], "client_status": {}}
+                for user_id in self._member_ids
+            ],
+            "emojis": [],
+            "stickers": [],
+            "features": [],
+            "premium_subscription_count": 0,
+            "premium_tier": 0
+        }
+
+    def random_member(self) -> int:
+        return self.random.choice(self._member_ids)
+
+    def message(self, channel_id: int, author_id: int, content: str, message_id: int = None) -> dict:
+        member = self.member(author_id)
+        user = member.pop("user")
+        return {
+            "id": str(message_id or self.snowflake()),
+            "channel_id": str(channel_id),
+            "guild_id": str(self.guild_id),
+            "author": user,
+            "member": member,
+            "content": content,
+            "timestamp": _now(),
+            "edited_timestamp": None,
+            "tts": False,
+            "mention_everyone": False,
+            "mentions": [],
+            "mention_roles": [],
+            "attachments": [],
+            "embeds": [],
+            "pinned": False,
+            "type": 0
+        }
+
+    # Gateway 事件，格式與 Gateway 的 {"t": 事件名稱, "d": 資料} 相同
+    def message_create(self, channel_id: int, author_id: int, content: str) -> dict:
+        return {"t": "MESSAGE_CREATE", "d": self.message(channel_id, author_id, content)}
+
+    def message_update(self, created: dict, content: str) -> dict:
+        data = dict(created["d"], content=content, edited_timestamp=_now())
+        return {"t": "MESSAGE_UPDATE", "d": data}
+
+    def message_delete(self, created: dict) -> dict:
+        data = created["d"]
+        return {"t": "MESSAGE_DELETE", "d": {"id": data["id"], "channel_id": data["channel_id"], "guild_id": data["guild_id"]}}
+
+    def message_delete_bulk(self, created: list) -> dict:
+        data = created[0]["d"]
+        ids = [event["d"]["id"] for event in created]
+        return {"t": "MESSAGE_DELETE_BULK", "d": {"ids": ids, "channel_id": data["channel_id"], "guild_id": data["guild_id"]}}
+
+    def member_add(self) -> tuple:
+        user_id = self.snowflake()
+        return user_id, {"t": "GUILD_MEMBER_ADD", "d": dict(self.member(user_id), guild_id=str(self.guild_id))}
+
+    def member_remove(self, user_id: int) -> dict:
+        return {"t": "GUILD_MEMBER_REMOVE", "d": {"guild_id": str(self.guild_id), "user": self.user(user_id)}}
+
+    def member_update(self, user_id: int, roles: list, nick: str = None, timed_out_until: str = None) -> dict:
+        data = dict(self.member(user_id, roles), guild_id=str(self.guild_id), nick=nick, communication_disabled_until=timed_out_until)
+        return {"t": "GUILD_MEMBER_UPDATE", "d": data}
+
+    def ban(self, user_id: int) -> dict:
+        self.banned.append(user_id)
+        return {"t": "GUILD_BAN_ADD", "d": {"guild_id": str(self.guild_id), "user": self.user(user_id)}}
+
+    def reaction(self, user_id: int, emoji: str, add: bool = True) -> dict:
+        data = {
+            "user_id": str(user_id),
+            "channel_id": str(self.role_channel),
+            "message_id": str(self.role_message),
+            "guild_id": str(self.guild_id),
+            "emoji": {"id": None, "name": emoji}
+        }
+        if add:
+            data["member"] = self.member(user_id)
+        return {"t": "MESSAGE_REACTION_ADD" if add else "MESSAGE_REACTION_REMOVE", "d": data}
+
+class RecordingHTTP:
+    """
+    取代 discord.py HTTPClient.request 的 REST 客戶端：不連線，只記錄每個路由的呼叫次數，
+    並回傳足以讓 discord.py 建立物件的假資料
+
+    Attributes
+    ----------
+    calls : Counter
+        {"方法 路由": 次數}
+    latency : float
+        每次呼叫模擬的網路延遲（秒）
+    """
+    def __init__(self, faker: GatewayFaker, latency: float = 0.0):
+        self.faker = faker
+        self.latency = latency
+        self.calls = Counter()
+        self._responses = {
+            ("POST", "/channels/{channel_id}/messages"): self._send_message,
+            ("GET", "/channels/{channel_id}/messages/{message_id}"): self._get_message,
+            ("POST", "/users/@me/channels"): self._create_dm,
+            ("GET", "/guilds/{guild_id}/members/{user_id}"): self._get_member,
+            ("GET", "/guilds/{guild_id}/bans"): lambda route, kwargs: [],
+            ("GET", "/guilds/{guild_id}/audit-logs"): self._audit_logs
+        }
+
+    @property
+    def total(self) -> int:
+        return sum(self.calls.values())
+
+    async def request(self, route, **kwargs):
+        self.calls[f"{route.method} {route.path}"] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        else:
+            await asyncio.sleep(0)
+        respond = self._responses.get((route.method, route.path))
+        return respond(route, kwargs) if respond is not None else None
+
+    def _send_message(self, route, kwargs) -> dict:
+        payload = kwargs.get("json") or {}
+        data = self.faker.message(route.channel_id, self.faker.bot_id, payload.get("content") or "")
+        data["author"]["bot"] = True
+        data["embeds"] = payload.get("embeds") or []
+        return data
+
+    def _get_message(self, route, kwargs) -> dict:
+        return self.faker.message(route.channel_id, self.faker.bot_id, "", int(route.url.rsplit("/", 1)[-1]))
+
+    def _create_dm(self, route, kwargs) -> dict:
+        recipient = int(kwargs["json"]["recipient_id"])
+        return {"id": str(self.faker.snowflake()), "type": 1, "recipients": [self.faker.user(recipient)]}
+
+    def _get_member(self, route, kwargs) -> dict:
+        return self.faker.member(int(route.url.rsplit("/", 1)[-1]))
+
+    def _audit_logs(self, route, kwargs) -> dict:
+        # 所有禁止都由伺服器擁有者執行，紀錄時間為現在，由新到舊排列
+        moderator = self.faker._member_ids[0]
+        limit = int(kwargs.get("params", {}).get("limit", 100))
+        now = utils.time_snowflake(datetime.now(timezone.utc))
+        banned = self.faker.banned[::-1][:limit]
+        return {
+            "audit_log_entries": [
+                {"id": str(now - index), "user_id": str(moderator), "target_id": str(user_id), "action_type": 22, "changes": [], "reason": None}
+                for index, user_id in enumerate(banned)
+            ],
+            "users": [self.faker.user(moderator)] + [self.faker.user(user_id) for user_id in banned],
+            "webhooks": [],
+            "threads": [],
+            "integrations": [],
+            "guild_scheduled_events": [],
+            "auto_moderation_rules": [],
+            "application_commands": []
+        }
@@ -0,0 +1,285 @@
+# 齒輪事件重播與吞吐量基準測試
+#
+# 用法（在專案根目錄執行）：
+#   python -m benchmarks.replay message_flood --events 10000
+#   python -m benchmarks.replay mixed --rest-latency 50 --json
+#   python -m benchmarks.replay --stream recorded.jsonl --config cfg.yml
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+
+import discord
+
+from benchmarks.fakes import GatewayFaker, RecordingHTTP
+from benchmarks.scenarios import SCENARIOS, UPDATE_STATUS, bench_config, dump_stream, load_stream
+from plugins.cfbot import CFBot
+from plugins.config_service import ConfigService, freeze
+from plugins.message_router import MessageRouter
+from plugins.perf import PerfRecorder
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+# 受測的齒輪
+DEFAULT_COGS = (
+    "Cogs.dclogging",
+    "Cogs.auto_reply",
+    "Cogs.auto_delete",
+    "Cogs.welcome",
+    "Cogs.reaction_roles.reaction_roles",
+    "Cogs.serverstats.serverstats"
+)
+
+# 在計時前處理、用來建立機器人狀態的事件
+PRELUDE_EVENTS = ("READY", "GUILD_CREATE")
+
+def peak_rss() -> int:
+    """取得程式執行至今的最高常駐記憶體（位元組），無法取得時回傳 None"""
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 以 KB 為單位，macOS 以位元組為單位
+    return usage if sys.platform == "darwin" else usage * 1024
+
+class ReplayHarness:
+    """
+    以真正的 CFBot 與齒輪重播事件流。
+
+    事件交給 discord.py 原本的解析函式處理，訊息經過與正式環境相同的 MessageRouter，
+    所有 REST 呼叫都由 RecordingHTTP 記錄而不會連線。處理器耗時由 CFBot 的 PerfRecorder 記錄。
+
+    Attributes
+    ----------
+    faker : GatewayFaker
+        假伺服器，事件流沒有提供 READY 與 GUILD_CREATE 時使用
+    config : Mapping
+        提供給齒輪的設定
+    cogs : tuple[str]
+        要載入的齒輪模組
+    http : RecordingHTTP
+        記錄 REST 呼叫的客戶端
+    errors : dict
+        {事件名稱: 處理器拋出例外的次數}
+    """
+    def __init__(self, faker: GatewayFaker, config = None, cogs: tuple = DEFAULT_COGS,
+                 rest_latency: float = 0.0, budget_ms: float = 500, ring_size: int = 100000):
+        self.faker = faker
+        self.config = config if config is not None else freeze(bench_config(faker))
+        self.cogs = cogs
+        self.http = RecordingHTTP(faker, rest_latency)
+        self.errors: dict = {}
+        self.bot = CFBot(
+            command_prefix = "sh!",
+            intents = discord.Intents.all(),
+            perf = PerfRecorder(budget_ms, ring_size)
+        )
+        # 在 CFBot 的 REST 量測之下換掉實際送出請求的部分，量測與正式環境相同
+        self.bot.http.request = self.bot._instrument_request(self.http.request)
+        self.bot.on_error = self._on_error
+        self._tasks = set()
+
+    async def _on_error(self, event_method: str, *args, **kwargs):
+        count = self.errors.get(event_method, 0)
+        self.errors[event_method] = count + 1
+        if count == 0:
+            logger.warning(f"處理 {event_method} 時發生錯誤（同一事件只顯示第一次）", exc_info = sys.exc_info())
+
+    async def setup(self, prelude: list = ()):
+        """建立機器人狀態並載入齒輪，prelude 為事件流開頭的 READY 與 GUILD_CREATE"""
+        bot = self.bot
+        bot.config = self.config
+        bot.member_index = None
+        bot.message_router = MessageRouter(bot)
+        bot.message_router.subscribe("commands", bot.process_commands, prefix = bot.command_prefix, include_bots = False)
+
+        # 與 main.py 相同，所有訊息都只經過訊息分派器
+        @bot.event
+        async def on_message(message):
+            await bot.message_router.dispatch(message)
+
+        await bot._async_setup_hook()
+        state = bot._connection
+        user = next((event["d"]["user"] for event in prelude if event["t"] == "READY"), None)
+        state.user = discord.ClientUser(state = state, data = user or self.faker.user(self.faker.bot_id, bot = True))
+        guilds = [event["d"] for event in prelude if event["t"] == "GUILD_CREATE"] or [self.faker.guild()]
+        for data in guilds:
+            state._add_guild_from_data(data)
+
+        # 部分齒輪在匯入時會切換工作目錄，載入完成後切換回來
+        cwd = os.getcwd()
+        try:
+            for cog in self.cogs:
+                await bot.load_extension(cog)
+        finally:
+            os.chdir(cwd)
+        self._tasks = asyncio.all_tasks()
+
+    async def _update_status(self):
+        cog = self.bot.get_cog("ServerStatus")
+        if cog is not None:
+            await self.bot.perf.run("ServerStatus.update_status", cog.update_status())
+
+    async def _drain(self):
+        """等待重播期間產生的所有工作完成（不包含載入齒輪時啟動的定時任務）"""
+        current = asyncio.current_task()
+        while True:
+            pending = [task for task in asyncio.all_tasks() if task not in self._tasks and task is not current]
+            if not pending:
+                return
+            await asyncio.wait(pending)
+
+    async def replay(self, events: list, rate: float = None) -> dict:
+        """
+        重播事件流並等待所有處理器完成
+
+        Parameters
+        ----------
+        events : list[dict]
+            {"t": 事件名稱, "d": 資料} 的清單
+        rate : float | None
+            每秒送出的事件數，None 代表盡可能快
+
+        Returns
+        -------
+        dict
+            {"events", "seconds", "events_per_sec", "handlers", "rest_calls", "rest_per_event", "rest_routes", "errors", "peak_rss"}
+        """
+        parsers = self.bot._connection.parsers
+        skipped = 0
+        start = time.perf_counter()
+        for index, event in enumerate(events):
+            name = event["t"]
+            if name == UPDATE_STATUS:
+                asyncio.create_task(self._update_status())
+            elif name in parsers:
+                # 與 DiscordWebSocket.received_message 相同的順序
+                self.bot.dispatch("socket_event_type", name)
+                parsers[name](event["d"])
+            else:
+                skipped += 1
+            if rate:
+                delay = start + (index + 1) / rate - time.perf_counter()
+                await asyncio.sleep(max(delay, 0))
+            else:
+                # Gateway 每收到一個事件都會讓出控制權，這裡也一樣
+                await asyncio.sleep(0)
+        await self._drain()
+        elapsed = time.perf_counter() - start
+        processed = len(events) - skipped
+        router = self.bot.message_router.stats()
+        errors = dict(self.errors)
+        for name, stats in router["subscribers"].items():
+            if stats["errors"]:
+                errors[f"{name}.on_message"] = stats["errors"]
+        return {
+            "events": processed,
+            "skipped": skipped,
+            "seconds": elapsed,
+            "events_per_sec": processed / elapsed if elapsed else 0.0,
+            "handlers": self.bot.perf.top(minutes = elapsed / 60 + 1, limit = 50),
+            "rest_calls": self.http.total,
+            "rest_per_event": self.http.total / processed if processed else 0.0,
+            "rest_routes": dict(self.http.calls.most_common()),
+            "errors": errors,
+            "peak_rss": peak_rss()
+        }
+
+    async def close(self):
+        for cog in self.cogs:
+            if cog in self.bot.extensions:
+                await self.bot.unload_extension(cog)
+        await self.bot.close()
+
+def format_report(name: str, result: dict) -> str:
+    """將 replay() 的結果整理為文字報告"""
+    lines = [
+        f"情境：{name}",
+        f"事件：{result['events']} 個（略過 {result['skipped']} 個不支援的事件），耗時 {result['seconds']:.2f} 秒，"
+        f"{result['events_per_sec']:.0f} 事件/秒",
+        f"REST 呼叫：{result['rest_calls']} 次，平均每個事件 {result['rest_per_event']:.2f} 次"
+    ]
+    for route, count in result["rest_routes"].items():
+        lines.append(f"  {count:>8}  {route}")
+    lines.append("處理器延遲（毫秒，依 p99 排序）：")
+    lines.append(f"  {'處理器':<40}{'次數':>8}{'p50':>10}{'p95':>10}{'p99':>10}{'最長':>10}")
+    for item in result["handlers"]:
+        lines.append(
+            f"  {item['name']:<40}{item['calls']:>8}{item['p50'] * 1000:>10.2f}{item['p95'] * 1000:>10.2f}"
+            f"{item['p99'] * 1000:>10.2f}{item['max'] * 1000:>10.2f}"
+        )
+    if result["errors"]:
+        lines.append("錯誤：")
+        for event, count in result["errors"].items():
+            lines.append(f"  {count:>8}  {event}")
+    if result["peak_rss"] is not None:
+        lines.append(f"最高常駐記憶體：{result['peak_rss'] / 1024 / 1024:.1f} MB")
+    return "\n".join(lines)
+
+async def run(args) -> dict:
+    faker = GatewayFaker(members = args.members, seed = args.seed)
+    if args.stream:
+        events = load_stream(args.stream)
+        name = os.path.basename(args.stream)
+    else:
+        events = SCENARIOS[args.scenario](faker, args.events)
+        name = args.scenario
+    if args.dump:
+        # 連同機器人與伺服器狀態一起寫入，檔案本身就能重播
+        head = [] if args.stream else [faker.ready(), {"t": "GUILD_CREATE", "d": faker.guild()}]
+        dump_stream(head + events, args.dump)
+    prelude = [event for event in events if event["t"] in PRELUDE_EVENTS]
+    events = [event for event in events if event["t"] not in PRELUDE_EVENTS]
+
+    config = ConfigService(args.config) if args.config else None
+    harness = ReplayHarness(
+        faker,
+        config,
+        rest_latency = args.rest_latency / 1000,
+        budget_ms = args.budget_ms,
+        ring_size = max(len(events), 1000)
+    )
+    try:
+        await harness.setup(prelude)
+        result = await harness.replay(events, args.rate)
+    finally:
+        await harness.close()
+    result["scenario"] = name
+    return result
+
+def main(argv: list = None):
+    parser = argparse.ArgumentParser(description = "以假事件流重播齒輪並量測吞吐量、處理器延遲、REST 呼叫數與記憶體")
+    parser.add_argument("scenario", nargs = "?", default = "mixed", choices = sorted(SCENARIOS), help = "內建情境")
+    parser.add_argument("--events", type = int, default = 5000, help = "內建情境產生的事件數")
+    parser.add_argument("--members", type = int, default = 1000, help = "假伺服器的初始成員數")
+    parser.add_argument("--seed", type = int, default = 0, help = "產生事件的亂數種子")
+    parser.add_argument("--stream", help = "改為重播事件流檔案（每行一個 Gateway 事件的 JSON）")
+    parser.add_argument("--dump", help = "將要重播的事件流寫入檔案，供之後重播或比較")
+    parser.add_argument("--config", help = "使用指定的 cfg.yml 而不是內建的測試設定（重播實際錄下的事件流時使用）")
+    parser.add_argument("--rate", type = float, help = "每秒送出的事件數，預設為盡可能快")
+    parser.add_argument("--rest-latency", type = float, default = 0.0, help = "模擬每個 REST 呼叫的延遲（毫秒）")
+    parser.add_argument("--budget-ms", type = float, default = 500, help = "處理器的時間預算，超過時輸出警告")
+    parser.add_argument("--json", action = "store_true", help = "以 JSON 輸出結果")
+    parser.add_argument("--log-level", default = "WARNING", help = "日誌等級，齒輪在 INFO 等級會為每個事件輸出日誌")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(
+        level = args.log_level.upper(),
+        format = '%(lineno)d: [%(asctime)s][%(levelname)s] - [%(module)s] %(message)s'
+    )
+    result = asyncio.run(run(args))
+    if args.json:
+        print(json.dumps(result, ensure_ascii = False, indent = 2))
+    else:
+        print(format_report(result["scenario"], result))
+
+if __name__ == "__main__":
+    main()
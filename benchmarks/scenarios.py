@@ -0,0 +1,192 @@
+# 基準測試情境：齒輪設定與事件流
+
+import json
+
+from benchmarks.fakes import GatewayFaker
+
+# 不是 Gateway 事件、由重播器自行處理的事件
+UPDATE_STATUS = "BENCH_UPDATE_STATUS"
+
+def bench_config(faker: GatewayFaker) -> dict:
+    """
+    建立啟用所有受測齒輪的設定，頻道與身分組 ID 對應假伺服器
+
+    setup() 檢查的是 enable，cfg.yml 與齒輪內部使用的是 enabled，兩者都設定才能讓齒輪完整運作
+    """
+    def counter(channel_id, name):
+        return {"enabled": True, "channel_id": channel_id, "channel_name": name + "：{count}"}
+
+    return {
+        "admin_id": [],
+        "welcome_channel_id": faker.log_channel,
+        "welcome_title": "歡迎",
+        "welcome_message": "{member} 加入了 {guild}，目前共有 {member_count} 位成員",
+        "leave_channel_id": faker.log_channel,
+        "leave_title": "再見",
+        "leave_message": "{member_name} 離開了 {guild}",
+        "dc_logging": {
+            "enable": True,
+            "enabled": True,
+            "enabled_for_bot": False,
+            "channel_id": faker.log_channel,
+            "console": False,
+            "audit_log": {"enabled": True, "window": 0.5, "ttl": 60},
+            "log_events": {
+                name: True for name in (
+                    "msg_send", "msg_edit", "msg_delete", "member_join", "member_leave", "member_banned",
+                    "member_unbanned", "member_muted", "member_unmuted", "member_role_add", "member_role_remove",
+                    "member_nick", "member_avatar",
+                    "vc_join", "vc_leave", "vc_move"
+                )
+            }
+        },
+        "auto_reply": {
+            "enable": True,
+            "enabled": True,
+            "ignore_rules": {"ignore_bots": True, "ignore_self": True, "ignore_roles": [], "ignore_users": [], "ignore_channels": []},
+            "rules": [
+                {"trigger": "hello", "response": "Hello {author_mention}", "match_regex": False, "no_reply": False},
+                {"trigger": r"^!ip\b", "response": "伺服器位址在 {channel_mention} 的釘選訊息", "match_regex": True, "no_reply": True},
+                {"trigger": r"(?i)how (do|can) i join", "response": "請參考 {guild} 的新手教學", "match_regex": True, "no_reply": False}
+            ],
+            "throttle": {
+                "rule": {"capacity": 10, "per": 60},
+                "channel": {"capacity": 5, "per": 10},
+                "user": {"capacity": 3, "per": 30},
+                "collapse_window": 5
+            }
+        },
+        "auto_delete": {
+            "enable": True,
+            "enabled": True,
+            "channel_id": [faker.announce_channel],
+            "whitelist": [],
+            "dm": False
+        },
+        "reaction_roles": {
+            "enable": True,
+            "enabled": True,
+            "role_channel_id": faker.role_channel,
+            "role_message_id": faker.role_message,
+            "remove_role_on_reaction_remove": True,
+            "reactions": [{"emoji": emoji, "role_id": role_id} for emoji, role_id in zip(faker.emojis, faker.roles)]
+        },
+        "serverstats": {
+            "enabled": True,
+            "interval": 60,
+            "counters": {
+                "member": {
+                    "all_members": counter(faker.stat_channels[0], "所有成員"),
+                    "online_members": counter(faker.stat_channels[1], "線上成員"),
+                    "offline_members": counter(faker.stat_channels[2], "離線成員")
+                }
+            }
+        }
+    }
+
+# 情境
+def message_flood(faker: GatewayFaker, count: int) -> list:
+    """大量訊息：一成觸發自動回覆、一成在自動刪除頻道，另有部分訊息被編輯或刪除"""
+    events = []
+    contents = ("lorem ipsum dolor sit amet", "hello everyone", "!ip", "how do i join the server?", "gg")
+    weights = (70, 10, 5, 5, 10)
+    while len(events) < count:
+        roll = faker.random.random()
+        if roll < 0.1:
+            channel_id = faker.announce_channel
+        else:
+            channel_id = faker.random.choice(faker.text_channels)
+        created = faker.message_create(channel_id, faker.random_member(), faker.random.choices(contents, weights)[0])
+        events.append(created)
+        if roll > 0.95:
+            events.append(faker.message_update(created, created["d"]["content"] + "（已編輯）"))
+        elif roll > 0.9:
+            events.append(faker.message_delete(created))
+    return events[:count]
+
+def join_raid(faker: GatewayFaker, count: int) -> list:
+    """大量成員加入，其中兩成在短時間內離開"""
+    events = []
+    joined = []
+    while len(events) < count:
+        user_id, event = faker.member_add()
+        events.append(event)
+        joined.append(user_id)
+        if faker.random.random() < 0.2:
+            events.append(faker.member_remove(joined.pop(faker.random.randrange(len(joined)))))
+    return events[:count]
+
+def reaction_storm(faker: GatewayFaker, count: int) -> list:
+    """大量成員在反應身分組訊息上新增與移除反應"""
+    events = []
+    while len(events) < count:
+        user_id = faker.random_member()
+        emoji = faker.random.choice(faker.emojis)
+        events.append(faker.reaction(user_id, emoji))
+        if faker.random.random() < 0.5:
+            events.append(faker.reaction(user_id, emoji, add=False))
+    return events[:count]
+
+def purge(faker: GatewayFaker, count: int) -> list:
+    """洗版後由管理員清除：每 100 則訊息一次批量刪除，另有同一頻道連續的單則刪除"""
+    events = []
+    while len(events) < count:
+        channel_id = faker.random.choice(faker.text_channels)
+        created = [faker.message_create(channel_id, faker.random_member(), f"spam {i}") for i in range(100)]
+        events.extend(created)
+        events.append(faker.message_delete_bulk(created[:80]))
+        events.extend(faker.message_delete(event) for event in created[80:])
+    return events[:count]
+
+def ban_wave(faker: GatewayFaker, count: int) -> list:
+    """大量禁止成員（例如清除機器人帳號），每則紀錄都需要查詢執行者"""
+    return [faker.ban(faker.random_member()) for _ in range(count)]
+
+def role_sync(faker: GatewayFaker, count: int) -> list:
+    """大量成員的身分組被同步（例如身分組機器人或整合服務），部分同時變更暱稱或被禁言"""
+    events = []
+    for _ in range(count):
+        roll = faker.random.random()
+        nick = f"nick-{faker.random.randrange(1000)}" if roll < 0.1 else None
+        timed_out_until = "2099-01-01T00:00:00+00:00" if roll > 0.98 else None
+        roles = faker.random.sample(faker.roles, faker.random.randint(0, len(faker.roles)))
+        events.append(faker.member_update(faker.random_member(), roles, nick, timed_out_until))
+    return events
+
+def mixed(faker: GatewayFaker, count: int) -> list:
+    """以上三種情境交錯，並每 1000 個事件更新一次伺服器狀態"""
+    parts = [message_flood(faker, count * 7 // 10), join_raid(faker, count // 10), reaction_storm(faker, count // 5)]
+    events = [event for part in parts for event in part]
+    faker.random.shuffle(events)
+    # 打亂後同一則訊息的編輯與刪除可能排在建立之前，這些事件只會觸發 raw 事件，與真實情況相同
+    for index in range(1000, len(events), 1000):
+        events.insert(index, {"t": UPDATE_STATUS, "d": {}})
+    return events[:count]
+
+SCENARIOS = {
+    "message_flood": message_flood,
+    "join_raid": join_raid,
+    "reaction_storm": reaction_storm,
+    "role_sync": role_sync,
+    "purge": purge,
+    "ban_wave": ban_wave,
+    "mixed": mixed
+}
+
+# 事件流檔案：每行一個 {"t": 事件名稱, "d": 資料}，與 Gateway 送來的格式相同
+def load_stream(path: str) -> list:
+    events = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            event = json.loads(line)
+            if event.get("t"):
+                events.append({"t": event["t"], "d": event.get("d") or {}})
+    return events
+
+def dump_stream(events: list, path: str):
+    with open(path, "w", encoding="utf-8") as f:
+        for event in events:
+            f.write(json.dumps(event, ensure_ascii=False) + "\n")
@@ -1,22 +1,35 @@
 import logging
 import discord
 from discord.ext import commands
-from discord.ext.commands import CommandNotFound, NoEntryPointError
+from discord.ext.commands import CommandNotFound
 import os
-import yaml
 import asyncio
 import platform
 import json
 import plugins.const_codes as const_codes
+from plugins.slash_sync import SlashSyncManager
+from plugins.cog_loader import CogLoader
+from plugins.config_service import ConfigService
+from plugins.http_service import HttpService
+from plugins.message_router import MessageRouter
+from plugins.intents_policy import IntentPolicy
+from plugins.member_index import MemberIndex
+from plugins.cfbot import CFBot
+from plugins.perf import PerfRecorder
+from plugins.metrics import MetricsServer
+from plugins.log_pipeline import LogPipeline
+from plugins.command_catalog import CommandCatalog, HelpPaginator
 
 # Project Version
 VERSION = '1.0.5'
 
 # Logging
-logging.basicConfig(
+# 日誌只放進佇列，由背景執行緒寫到控制台（與檔案），事件迴圈不會因輸出而阻塞
+log_pipeline = LogPipeline(
     level=logging.INFO,
-    format='%(lineno)d: [%(asctime)s][%(levelname)s] - [%(module)s] %(message)s'
+    fmt='%(lineno)d: [%(asctime)s][%(levelname)s] - [%(module)s] %(message)s'
 )
+log_pipeline.start()
 
 logging.getLogger('discord').setLevel(logging.WARNING)
 logging.getLogger('logging').setLevel(logging.WARNING)
@@ -25,15 +38,54 @@ logging.getLogger('asyncio').setLevel(logging.WARNING)
 logging.getLogger('json').setLevel(logging.WARNING)
 logging.getLogger('yaml').setLevel(logging.WARNING)
 
-# Bot
-bot = commands.Bot(command_prefix='sh!', intents=discord.Intents.all())
+# 整個機器人只解析一次cfg.yml，Cog一律透過bot.config取得設定
+cfg = ConfigService('cfg.yml')
+logging.info('讀取cfg.yml成功！')
+
+# 檢查錯誤狀態
+if len(cfg) == 0:
+    logging.error('cfg.yml為空！')
+    exit()
+
+# 依設定加上 JSON 日誌檔與抽樣
+log_pipeline.configure(**cfg.get('logging', {}))
 
-with open('cfg.yml', 'r', encoding='utf-8') as f:
-    cfg = yaml.load(f, Loader=yaml.FullLoader)
-    logging.info('讀取cfg.yml成功！')
+# 熱重載時重新套用日誌設定與除錯模式的日誌等級，不需要重新啟動
+def _update_logging(changed: set):
+    if 'logging' in changed:
+        log_pipeline.configure(**cfg.get('logging', {}))
+    if 'debug' in changed:
+        logging.getLogger().setLevel(logging.DEBUG if cfg['debug'] else logging.INFO)
+        logging.info(f'除錯模式已{"啟用" if cfg["debug"] else "停用"}')
+
+cfg.subscribe(['logging', 'debug'], _update_logging)
+
+# Bot
+# 依照已啟用的Cog所宣告的需求計算最小的Intents與成員快取策略
+if cfg.get('gateway', {}).get('intents', 'auto') == 'all':
+    bot_options = {'intents': discord.Intents.all()}
+    logging.info('Intents：依設定使用全部 Intents')
+else:
+    intent_policy = IntentPolicy(cfg, './Cogs')
+    bot_options = intent_policy.bot_options()
+    for line in intent_policy.describe(bot_options['intents']):
+        logging.info(f'Intents：{line}')
+perf_cfg = cfg.get('perf', {})
+bot = CFBot(
+    command_prefix='sh!',
+    perf=PerfRecorder(perf_cfg.get('budget_ms', 500), perf_cfg.get('ring_size', 1000)),
+    **bot_options
+)
 
 bot.config = cfg
 
+# 精簡成員索引，未啟用時為 None，Cog 會改用 discord.py 的成員快取
+bot.member_index = None
+if cfg.get('member_index', {}).get('enabled', False):
+    bot.member_index = MemberIndex(request_chunks=not bot_options.get('chunk_guilds_at_startup', True))
+    bot.member_index.attach(bot)
+    logging.info('已啟用精簡成員索引')
+
 if cfg['debug']:
     logging.getLogger().setLevel(logging.DEBUG)
     # logging.getLogger('discord').setLevel(logging.DEBUG)
@@ -62,34 +114,74 @@ ____!___!___!___!___!___!___!___!___!____
     for line in WARNING_MSG.split('\n'):
         logging.warning(line)
 
-# 檢查錯誤狀態
-if cfg is None:
-    logging.error('cfg.yml為空！')
-    exit()
-
 # 可以使用指令的使用者ID
 BOT_ADMIN = cfg["admin_id"]
 
+# 設定檔中的管理員變更時同步更新
+def _update_admin(changed: set):
+    global BOT_ADMIN
+    BOT_ADMIN = cfg["admin_id"]
+    logging.info(f'管理員已更新：{list(BOT_ADMIN)}')
+
+cfg.subscribe(['admin_id'], _update_admin)
+
+# 斜線指令同步管理，指紋檔案與 slash.json 放在同一個資料夾
+bot.sync_manager = SlashSyncManager(
+    bot,
+    os.path.dirname(os.path.abspath(__file__)),
+    guild_ids = cfg.get('slash_sync', {}).get('guild_ids') or []
+)
+
+# 所有對外 HTTP 請求共用的連線池
+bot.http_service = HttpService(**cfg.get('http', {}))
+
+# 唯一的訊息事件分派點，各齒輪向它訂閱，而不是各自監聽 on_message
+bot.message_router = MessageRouter(bot)
+# 只有 sh! 開頭的訊息才需要解析前綴指令
+bot.message_router.subscribe('commands', bot.process_commands, prefix=bot.command_prefix, include_bots=False)
+
+# 指令與齒輪目錄，/說明、/齒輪列表、slash.json 與齒輪指令的自動完成共用，載入或停用齒輪時失效
+bot.command_catalog = CommandCatalog(bot, './Cogs')
+
+# 背景檢查更新的工作，避免重新連線觸發 on_ready 時重複檢查
+bot.update_task = None
+
 # 寫入已同步的指令
-async def write_slash_synced(slash: discord.app_commands.AppCommand):
+async def write_slash_synced():
     SELF_PATH = os.path.dirname(os.path.abspath(__file__))
     FILE_NAME = 'slash.json'
     FILE_PATH = os.path.join(SELF_PATH, FILE_NAME)
     with open(FILE_PATH, 'w') as f:
         # 取得所有指令與其說明，並存入陣列中
         logging.info('寫入指令同步資料')
-        slash = []
-        for command in bot.tree.walk_commands():
-            logging.debug(f'指令名稱：{command.name}，指令說明：{command.description}')
-            slash.append({
-                'name': command.name,
-                'description': command.description
-            })
-        
+        slash = bot.command_catalog.slash_data()
         logging.debug(f'指令同步資料：{slash}')
         json.dump(slash, f, indent = 4)
         logging.info('指令同步資料寫入成功')
 
+async def check_update():
+    """於背景檢查更新，結果只寫入日誌"""
+    update_cfg = cfg.get('update_check', {})
+    logging.info('檢查更新中...')
+    try:
+        version = await const_codes.check_version(
+            ttl = update_cfg.get('cache_ttl', 3600),
+            timeout = update_cfg.get('timeout', 5),
+            session = bot.http_service.session
+        )
+        if version['source'] == 'cache':
+            logging.info('使用快取的更新檢查結果')
+        if version['latest'] != VERSION:
+            logging.warning('檢查到新版本！')
+            logging.warning(f'最新版本：{version["latest"]}')
+            logging.warning(f'請前往 {version["zip"]} 下載最新版本')
+        else:
+            logging.info('已是最新版本')
+    except asyncio.TimeoutError:
+        logging.error('檢查更新逾時，略過此次檢查')
+    except Exception as e:
+        logging.error(f'檢查更新失敗：{e}')
+
 # Cogs Slash Command
 @bot.event
 async def on_ready():
@@ -139,6 +231,7 @@ ____________________________________________________
         for line in ASCII_CODE.split('\n'):
             logging.info(line)
     logging.info('------')
+    logging.info(IntentPolicy.cache_usage(bot))
     for guild in bot.guilds:
         logging.info(f'{guild.name} (ID: {guild.id})')
     logging.info('------')
@@ -161,31 +254,32 @@ ____________________________________________________
     else:
         logging.info('配置檔案版本正確，繼續啟動')
         logging.info(f'配置檔案版本：{cfg["version"]}，機器人版本：{VERSION}')
-    # 檢查更新
+    # 檢查更新（於背景執行，不阻塞指令同步與事件處理）
     if cfg['check_update']:
-        logging.info('檢查更新中...')
-        try:
-            version = await const_codes.check_version()
-            if version['latest'] != VERSION:
-                logging.warning('檢查到新版本！')
-                logging.warning(f'最新版本：{version["latest"]}')
-                logging.warning(f'請前往 {version["zip"]} 下載最新版本')
-            else:
-                logging.info('已是最新版本')
-        except Exception as e:
-            logging.error(f'檢查更新失敗：{e}')
+        if bot.update_task is None or bot.update_task.done():
+            bot.update_task = asyncio.create_task(check_update())
     else:
         logging.info('已關閉檢查更新，繼續啟動')
-    # 同步指令
+    # 同步指令（指令樹沒有變更時會跳過，以節省指令同步的速率限制）
     logging.info('同步指令中...')
-    slash = await bot.tree.sync()
-    if slash:
-        logging.info(f'指令同步完成：{slash}')
-        await write_slash_synced(slash)
-    else:
-        logging.error('指令同步失敗')
+    try:
+        results = await bot.sync_manager.sync_all()
+    except Exception as e:
+        logging.error(f'指令同步失敗：{e}')
+        return
+    for result in results:
+        if result['synced']:
+            logging.info(f'指令同步完成（{result["scope"]}）：{result["reason"]}')
+        else:
+            logging.info(f'指令同步跳過（{result["scope"]}）：{result["reason"]}')
+    if any(result['synced'] for result in results) or not os.path.exists(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'slash.json')):
+        await write_slash_synced()
 
 # Error Handler
+@bot.event
+async def on_message(message):
+    await bot.message_router.dispatch(message)
+
 @bot.event
 async def on_command_error(ctx, error):
     if isinstance(error, CommandNotFound):
@@ -202,37 +296,24 @@ async def cog_list(ctx):
     if ctx.user.id not in BOT_ADMIN:
         await ctx.response.send_message('你沒有權限使用此機器人', ephemeral=True)
         return
-    # 檢查目前已啟用的Cog
-    cogs = []
-    for cog in bot.cogs:
-        cogs.append(cog)
-    # 檢查Cogs資料夾中的所有檔案，walk指令最多走入第一層子資料夾
-    cogs_files = []
-    for root, _, files in os.walk("./Cogs"):
-        for filename in files:
-            if filename.endswith(".py") and not filename.startswith("nl"):
-                relative_path = os.path.relpath(os.path.join(root, filename), "./")
-                module_name = relative_path.replace(os.sep, '.')[:-3]
-                cogs_files.append(module_name)
-    # 檢查Cogs資料夾中的子資料夾
-    cogs_folders = []
-    for root, dirs, _ in os.walk("./Cogs"):
-        for folder in dirs:
-            cogs_folders.append(folder)
-    # 合併所有Cogs
-    cogs_all = cogs + cogs_files + cogs_folders
-    # 輸出Cogs
+    # Cogs資料夾中的所有Cog與載入狀態，由指令目錄提供
+    cogs = bot.command_catalog.cogs()
     embed = discord.Embed(
         title='Cogs列表',
         description='以下為所有Cogs',
         color=discord.Color.green()
     )
-    for cog in cogs_all:
+    for cog in cogs[:25]:
+        status = '已啟用' if cog['loaded'] else '未啟用'
+        if cog['cogs']:
+            status += f'（{"、".join(cog["cogs"])}）'
         embed.add_field(
-            name=cog,
-            value='已啟用' if cog in cogs else '未啟用',
+            name=f'{cog["key"]}：{cog["title"]}',
+            value=status,
             inline=False
         )
+    if len(cogs) > 25:
+        embed.set_footer(text=f'只顯示前 25 個，共 {len(cogs)} 個Cogs')
     await ctx.response.send_message(embed=embed)
 
 # Enable Cog Command
@@ -260,6 +341,10 @@ async def enable_cog(ctx, cog: str):
         logging.error(f'發生錯誤：{e}')
         await ctx.followup.send(f'發生錯誤：{e}')
 
+@enable_cog.autocomplete('cog')
+async def enable_cog_autocomplete(ctx, current: str):
+    return bot.command_catalog.cog_choices(current, loaded=False)
+
 # Disable Cog Command
 @bot.tree.command(
     name='停用齒輪',
@@ -274,7 +359,7 @@ async def disable_cog(ctx, cog: str):
         return
     try:
         # 檢查是否有該Cog
-        if os.path.isfile(f'./Cogs/{cog}.py') == False:
+        if not bot.command_catalog.has_cog(cog):
             await ctx.followup.send('找不到該Cog')
             return
         
@@ -285,6 +370,10 @@ async def disable_cog(ctx, cog: str):
         logging.error(f'發生錯誤：{e}')
         await ctx.followup.send(f'發生錯誤：{e}')
 
+@disable_cog.autocomplete('cog')
+async def disable_cog_autocomplete(ctx, current: str):
+    return bot.command_catalog.cog_choices(current, loaded=True)
+
 # Reload Cog Command
 @bot.tree.command(
     name='重新載入齒輪',
@@ -304,6 +393,10 @@ async def reload_cog(ctx, cog: str):
         logging.error(f'發生錯誤：{e}')
         await ctx.followup.send(f'發生錯誤：{e}')
 
+@reload_cog.autocomplete('cog')
+async def reload_cog_autocomplete(ctx, current: str):
+    return bot.command_catalog.cog_choices(current, loaded=True)
+
 # Reload Admin Command
 @bot.tree.command(
     name='重新載入管理員',
@@ -312,38 +405,39 @@ async def reload_cog(ctx, cog: str):
 async def reload_admin(ctx):
     logging.info('熱重載管理員')
     logging.info(f'請求發起人：{ctx.user}')
-    # 重新讀取配置檔案
-    with open('cfg.yml', 'r', encoding='utf-8') as f:
-        cfg = yaml.load(f, Loader=yaml.FullLoader)
-        logging.info('讀取cfg.yml成功！')
-    # 重新讀取管理員ID
-    NEW_ADMIN = cfg["admin_id"]
-    if ctx.user.id not in BOT_ADMIN and ctx.user.id not in NEW_ADMIN:
+    # 先確認權限：只讀取設定檔，不替換設定也不重新載入任何Cog
+    try:
+        new_config = await asyncio.to_thread(cfg.peek)
+    except Exception as e:
+        logging.error(f'發生錯誤：{e}')
+        await ctx.response.send_message(f'發生錯誤：{e}', ephemeral=True)
+        return
+    if ctx.user.id not in BOT_ADMIN and ctx.user.id not in new_config.get("admin_id", ()):
         await ctx.response.send_message('你沒有權限使用此機器人', ephemeral=True)
         return
+    await ctx.response.defer()
+    OLD_ADMIN = list(BOT_ADMIN)
+    # 重新讀取配置檔案，只有變動的區塊會觸發對應的Cog重新載入
+    try:
+        changed = await asyncio.to_thread(cfg.reload)
+        # 更新管理員ID並重新載入受影響的Cog
+        reloaded = await cfg.apply(bot, changed)
+    except Exception as e:
+        logging.error(f'發生錯誤：{e}')
+        await ctx.followup.send(f'發生錯誤：{e}')
+        return
+    NEW_ADMIN = cfg["admin_id"]
     # 尋找哪些管理員是新增的、哪些被移除了
-    new_admin = []
-    removed_admin = []
-    for admin in NEW_ADMIN:
-        if admin not in BOT_ADMIN:
-            new_admin.append(admin)
-        if admin not in NEW_ADMIN:
-            removed_admin.append(admin)
-    # 更新管理員ID
-    BOT_ADMIN = NEW_ADMIN
+    new_admin = [admin for admin in NEW_ADMIN if admin not in OLD_ADMIN]
+    removed_admin = [admin for admin in OLD_ADMIN if admin not in NEW_ADMIN]
     logging.info(f'新增的管理員：{new_admin}')
     logging.info(f'被移除的管理員：{removed_admin}')
     # 把更新與移除的管理員合併，並透過+與-號分別顯示，存成一個多行字串
     new_admin_str = '\n'.join([f'+ {admin}' for admin in new_admin])
     removed_admin_str = '\n'.join([f'- {admin}' for admin in removed_admin])
     admin_str = new_admin_str + '\n' + removed_admin_str
-    try:
-        # 重新載入管理員指令
-        await bot.reload_extension('admin')
-        await ctx.response.send_message(f'已重新載入管理員，以下為更新的管理員：\n{admin_str}')
-    except Exception as e:
-        logging.error(f'發生錯誤：{e}')
-        await ctx.response.send_message(f'發生錯誤：{e}')
+    reloaded_str = '、'.join(reloaded) if reloaded else '無'
+    await ctx.followup.send(f'已重新載入管理員，以下為更新的管理員：\n{admin_str}\n重新載入的Cog：{reloaded_str}')
 
 # Help Command
 @bot.tree.command(
@@ -353,76 +447,131 @@ async def reload_admin(ctx):
 async def help(ctx):
     logging.info('取得指令說明')
     logging.info(f'請求發起人：{ctx.user}')
-    embed = discord.Embed(
-        title='指令說明',
-        description='以下為機器人指令的說明',
-        color=discord.Color.green()
-    )
-    for command in bot.tree.walk_commands():
-        embed.add_field(
-            name=command.name,
-            value=command.description,
-            inline=False
-        )
-    await ctx.response.send_message(embed=embed)
+    # 說明頁面由指令目錄預先建立，指令超過一頁時加上翻頁按鈕
+    pages = bot.command_catalog.help_pages()
+    if len(pages) == 1:
+        await ctx.response.send_message(embed=pages[0])
+        return
+    await ctx.response.send_message(embed=pages[0], view=HelpPaginator(pages, ctx.user.id))
 
 # Sync Slash Command
 @bot.command(
     name='sync',
-    description='同步指令'
+    description='同步指令，可加上 force 強制同步，或加上 guild 只同步到目前的伺服器'
 )
-async def sync(ctx):
+async def sync(ctx, *options: str):
     logging.info('同步指令中...')
     if ctx.author.id not in BOT_ADMIN:
         await ctx.send('你沒有權限使用此機器人')
         return
+    force = 'force' in options
     mes = await ctx.send('同步指令中...')
-    slash = await bot.tree.sync()
-    if not slash:
-        await ctx.send('指令同步失敗')
+    try:
+        if 'guild' in options and ctx.guild is not None:
+            bot.tree.copy_global_to(guild=ctx.guild)
+            results = [await bot.sync_manager.sync(guild=ctx.guild, force=force)]
+        else:
+            results = await bot.sync_manager.sync_all(force=force)
+    except Exception as e:
+        logging.error(f'指令同步失敗：{e}')
+        await mes.edit(content=f'指令同步失敗：{e}')
         return
+    if any(result['synced'] for result in results):
+        await write_slash_synced()
     embed = discord.Embed(
         title='指令同步',
         description='指令同步完成',
         color=discord.Color.green()
     )
-    for slash_sl in slash:
-        name = slash_sl.name
-        description = slash_sl.description
+    for result in results:
+        if not result['synced']:
+            embed.add_field(
+                name=f'範圍：{result["scope"]}',
+                value=f'已跳過：{result["reason"]}（可使用 `sh!sync force` 強制同步）',
+                inline=False
+            )
+            continue
         embed.add_field(
-            name=name,
-            value=description,
+            name=f'範圍：{result["scope"]}',
+            value=f'已同步：{result["reason"]}，共 {len(result["commands"])} 個指令',
             inline=False
         )
+        for slash_sl in result['commands']:
+            name = slash_sl.name
+            description = slash_sl.description
+            embed.add_field(
+                name=name,
+                value=description,
+                inline=False
+            )
     embed.set_thumbnail(url="https://gravatar.com/avatar/f7598bd8d4aba38d7219341f81a162fc842376b3b556b1995cbb97271d9e2915?s=256")
     await mes.edit(content="完成同步！", embed=embed)
 
+# HTTP Pool Stats
+@bot.command(
+    name='http',
+    description='顯示共用 HTTP 連線池的統計'
+)
+async def http_stats(ctx):
+    if ctx.author.id not in BOT_ADMIN:
+        await ctx.send('你沒有權限使用此機器人')
+        return
+    stats = bot.http_service.stats()
+    embed = discord.Embed(
+        title='HTTP 連線池',
+        description='連線池已開啟' if stats['open'] else '連線池尚未建立',
+        color=discord.Color.blue()
+    )
+    embed.add_field(name='連線數', value=f'使用中 {stats["in_use"]}，閒置 {stats["idle"]}（上限 {stats["limit"]}，每個主機 {stats["limit_per_host"]}）', inline=False)
+    embed.add_field(name='請求', value=f'共 {stats["requests"]} 次，重試 {stats["retries"]} 次，失敗 {stats["failures"]} 次', inline=False)
+    embed.add_field(name='連線重用', value=f'新建 {stats["connections_created"]}，重用 {stats["connections_reused"]}', inline=False)
+    embed.add_field(name='DNS 快取', value=f'命中 {stats["dns_cache_hits"]}，未命中 {stats["dns_cache_misses"]}', inline=False)
+    await ctx.send(embed=embed)
+
+# Message Router Stats
+@bot.command(
+    name='router',
+    description='顯示訊息分派器中各訂閱者的耗時統計'
+)
+async def router_stats(ctx):
+    if ctx.author.id not in BOT_ADMIN:
+        await ctx.send('你沒有權限使用此機器人')
+        return
+    stats = bot.message_router.stats()
+    embed = discord.Embed(
+        title='訊息分派統計',
+        description=f'共分派 {stats["messages"]} 則訊息，其中 {stats["unrouted"]} 則沒有訂閱者處理',
+        color=discord.Color.blue()
+    )
+    subscribers = sorted(stats['subscribers'].items(), key=lambda item: item[1]['total'], reverse=True)
+    for name, record in subscribers:
+        embed.add_field(
+            name=name,
+            value=f'呼叫 {record["calls"]} 次，錯誤 {record["errors"]} 次\n'
+                  f'總計 {record["total"] * 1000:.1f}ms，平均 {record["avg"] * 1000:.2f}ms，最長 {record["max"] * 1000:.2f}ms',
+            inline=False
+        )
+    await ctx.send(embed=embed)
+
 # 一開始bot開機需載入全部程式檔案，並且跳過nl開頭的檔案。
-# 載入範圍包含Cogs資料夾與其子資料夾，但不包含子資料夾中的子資料夾。
+# 載入範圍包含Cogs資料夾與其子資料夾，彼此沒有相依的Cog會並行載入。
 async def load_extensions(bot):
     """Loads cogs from the 'Cogs' directory and its subdirectories, skipping files starting with 'nl'."""
-    logging.info(os.walk("./Cogs").__next__())
-    for root, _, files in os.walk("./Cogs"):
-        for filename in files:
-            if filename.endswith(".py") and not filename.startswith("nl"):
-                relative_path = os.path.relpath(os.path.join(root, filename), "./")  # Get the path relative to the root directory.
-                module_name = relative_path.replace(os.sep, '.')[:-3]  # Convert to module path, and remove ".py".
-                try:
-                    logging.info(f"載入 {relative_path} 中...")
-                    logging.getLogger(module_name).setLevel(logging.INFO)
-                    await bot.load_extension(module_name)
-                    logging.info(f"載入 {relative_path} 成功")
-                except NoEntryPointError as e:
-                    logging.error(f"載入 {relative_path} 失敗，原因：無子程式加載切入點")
-                    continue
-                except Exception as e:
-                    logging.error(f"載入 {relative_path} 失敗：{e}")
-                    continue
-            else:
-                if filename.startswith("nl"):
-                    logging.info(f"跳過 {filename}，原因：採用nl方式跳過載入")
-                else:
-                    logging.info(f"跳過 {filename}")
+    loader = CogLoader(bot, "./Cogs")
+    loader.discover()
+    # 部分Cog載入時會切換工作目錄，因此先把報告路徑轉成絕對路徑
+    report_path = cfg.get('cog_loader', {}).get('timing_report', '')
+    if report_path:
+        report_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), report_path)
+    await loader.load_all()
+    # 輸出每個Cog的引入、設定與總耗時
+    for line in loader.report().split('\n'):
+        logging.info(line)
+    if report_path:
+        try:
+            loader.write_report(report_path)
+        except OSError as e:
+            logging.error(f'寫入Cog載入計時失敗：{e}')
 
 # Start Bot
 try:
@@ -449,6 +598,20 @@ except FileNotFoundError:
 async def main():
     async with bot:
         await load_extensions(bot)
+        # 監看cfg.yml，變更時只重新載入受影響的Cog
+        watch_cfg = cfg.get('config_watch', {})
+        if watch_cfg.get('enabled', False):
+            cfg.start_watching(bot, watch_cfg.get('interval', 5))
+        # 本機效能指標端點
+        metrics_server = None
+        metrics_cfg = cfg.get('metrics', {})
+        if metrics_cfg.get('enabled', False):
+            metrics_server = MetricsServer(metrics_cfg.get('host', '127.0.0.1'), metrics_cfg.get('port', 9464))
+            try:
+                await metrics_server.start()
+            except OSError as e:
+                logging.error(f'效能指標端點啟動失敗：{e}')
+                metrics_server = None
         try:
             await bot.start(TOKEN)
         except KeyboardInterrupt:
@@ -470,9 +633,14 @@ async def main():
         except Exception as e:
             logging.error(f'Bot發生錯誤：{e}')
             logging.error('請前往 https://github.com/510208/yunyubot-dc-annou/?tab=readme-ov-file#-%E9%81%87%E5%88%B0%E5%95%8F%E9%A1%8C 回報錯誤')
+        finally:
+            await bot.http_service.close()
+            if metrics_server is not None:
+                await metrics_server.stop()
 
 # 確定執行此py檔才會執行
 async def close_bot():
+    cfg.stop_watching()
     # 卸載全部Cog
     logging.info('卸載全部Cogs')
     for cog in bot.cogs:
@@ -484,6 +652,7 @@ async def close_bot():
             logging.error(f'卸載{cog}失敗：{e}')
     logging.info('Bot關閉中...')
     await bot.close()
+    await bot.http_service.close()
     logging.info('Bot已關閉，謝謝使用！')
 
 if __name__ == "__main__":
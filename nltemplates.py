@@ -1,12 +1,58 @@
 import datetime
-import yaml
 import logging
+from plugins.config_service import get_config
+from plugins.templates import compile_template
 
 logger = logging.getLogger(__name__)
 
-with open('cfg.yml', 'r', encoding='utf-8') as f:
-    cfg = yaml.load(f, Loader=yaml.FullLoader)
-    logger.info('讀取cfg.yml成功！')
+# 公告格式可以使用的佔位符，cfg.yml 中的 {self.intro} 與 {intro} 都可以使用
+UPDATE_PLACEHOLDERS = ("self", "intro", "content", "timestamp", "starter")
+FIX_PLACEHOLDERS = ("self", "intro", "reason", "start", "end", "content", "timestamp", "starter")
+
+DEFAULT_UPDATE_FORMAT = """
+## 伺服器更新
+
+{intro}
+
+### 更新內容
+{content}
+
+
+最後，祝各位 **<:gousthappy:1194802726442381312>在本服中遊玩愉快！**
+期待各位的新進度，掰掰！
+
+📢 雲羽生存服 管理團隊 - <@{starter}> 敬上
+<t:{timestamp}:F>
+
+[ ||<@&1190290928112517212>||  |  ||<@&1190291336750960773>||  |  ||<@&1190298140692185128>||  |  ||<@&1186541054514704434>||]
+"""
+
+DEFAULT_FIX_FORMAT = """
+## 伺服器維修
+
+{intro}
+
+### 維修原因
+{reason}
+
+### 維修預計時間
+- **<a:928961403749019649:1198243923915718706> 開始**：{start}
+- **<a:928961427685904385:1198243930731458651> 結束**：{end}
+
+### 維修造成影響
+{content}
+
+### 維修狀態
+<:dangerous:1254019093900558397> 還未開始
+
+
+很抱歉打擾各位的生活了，希望各位見諒
+為了維持完美的遊戲體驗，讓我們一起共創更美好的伺服器！<a:yeees:1197923046149853195> 
+
+📢 雲羽生存服 管理團隊 - <@{starter}> 敬上
+
+[ ||<@&1190290928112517212>||  |  ||<@&1190291336750960773>||  |  ||<@&1190298140692185128>||  |  ||<@&1186541054514704434>||]
+"""
 
 class UpdateMsgGen():
     def __init__(
@@ -45,33 +91,15 @@ class UpdateMsgGen():
 
 # [ ||<@&1190290928112517212>||  |  ||<@&1190291336750960773>||  |  ||<@&1190298140692185128>||  |  ||<@&1186541054514704434>||]
 # """
-        try:
-            self.text = cfg["update_format"].format(
-                intro=self.intro,
-                content=self.content,
-                timestamp=self.timestamp,
-                starter=self.starter
-            )
-        # 在格式化中找不到佔位符時會報錯，這時就回報錯誤
-        except KeyError:
-            logger.warning("找不到佔位符，將使用預設訊息")
-            self.text = f"""
-## 伺服器更新
-
-{self.intro}
-
-### 更新內容
-{self.content}
-
-
-最後，祝各位 **<:gousthappy:1194802726442381312>在本服中遊玩愉快！**
-期待各位的新進度，掰掰！
-
-📢 雲羽生存服 管理團隊 - <@{self.starter}> 敬上
-<t:{self.timestamp}:F>
-
-[ ||<@&1190290928112517212>||  |  ||<@&1190291336750960773>||  |  ||<@&1190298140692185128>||  |  ||<@&1186541054514704434>||]
-"""
+        # 樣板在第一次使用時解析並快取，佔位符無效時改用預設訊息
+        template = compile_template(get_config()["update_format"], UPDATE_PLACEHOLDERS, fallback=DEFAULT_UPDATE_FORMAT, name="update_format")
+        self.text = template.render({
+            "self": self,
+            "intro": self.intro,
+            "content": self.content,
+            "timestamp": self.timestamp,
+            "starter": self.starter
+        })
 
 class FixMsgGen():
     def __init__(
@@ -126,41 +154,15 @@ class FixMsgGen():
 
 # [ ||<@&1190290928112517212>||  |  ||<@&1190291336750960773>||  |  ||<@&1190298140692185128>||  |  ||<@&1186541054514704434>||]
 # """
-        try:
-            self.text = cfg["fix_format"].format(
-                intro=self.intro,
-                reason=self.reason,
-                start=self.start,
-                end=self.end,
-                content=self.content,
-                starter=self.starter
-            )
-        # 在格式化中找不到佔位符時會報錯，這時就回報錯誤
-        except KeyError:
-            logger.warning("找不到佔位符，將使用預設訊息")
-            self.text = f"""
-## 伺服器維修
-
-{self.intro}
-
-### 維修原因
-{self.reason}
-
-### 維修預計時間
-- **<a:928961403749019649:1198243923915718706> 開始**：{self.start}
-- **<a:928961427685904385:1198243930731458651> 結束**：{self.end}
-
-### 維修造成影響
-{self.content}
-
-### 維修狀態
-<:dangerous:1254019093900558397> 還未開始
-
-
-很抱歉打擾各位的生活了，希望各位見諒
-為了維持完美的遊戲體驗，讓我們一起共創更美好的伺服器！<a:yeees:1197923046149853195> 
-
-📢 雲羽生存服 管理團隊 - <@{self.starter}> 敬上
-
-[ ||<@&1190290928112517212>||  |  ||<@&1190291336750960773>||  |  ||<@&1190298140692185128>||  |  ||<@&1186541054514704434>||]
-"""
\ No newline at end of file
+        # 樣板在第一次使用時解析並快取，佔位符無效時改用預設訊息
+        template = compile_template(get_config()["fix_format"], FIX_PLACEHOLDERS, fallback=DEFAULT_FIX_FORMAT, name="fix_format")
+        self.text = template.render({
+            "self": self,
+            "intro": self.intro,
+            "reason": self.reason,
+            "start": self.start,
+            "end": self.end,
+            "content": self.content,
+            "timestamp": self.timestamp,
+            "starter": self.starter
+        })
@@ -0,0 +1,226 @@
+# 附件封存模組
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from collections import OrderedDict
+
+import aiohttp
+
+from plugins.http_service import get_http
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILE = "index.jsonl"
+
+# 下載附件的逾時：不限制總時間，只限制連線與兩次讀取之間的等待
+DOWNLOAD_TIMEOUT = aiohttp.ClientTimeout(total=None, sock_connect=10, sock_read=30)
+
+def url_key(url: str) -> str:
+    # Discord CDN 網址的查詢參數（ex、is、hm）會隨時間改變，只以路徑比對
+    return url.split("?", 1)[0]
+
+class ArchiveTooLarge(Exception):
+    def __init__(self, message):
+        self.message = message
+        super().__init__(self.message)
+
+class AttachmentArchive:
+    """
+    以 SHA-256 內容定址的附件封存：相同內容的附件只保存一份，
+    下載時分段寫入暫存檔並同時計算雜湊，大檔案不會整個讀進記憶體。
+
+    檔案存放在 root/前兩碼/完整雜湊+副檔名，網址與雜湊的對應記錄在 root/index.jsonl。
+    總大小超過 max_total_bytes 時，從最久沒有被使用的檔案開始刪除。
+
+    Attributes
+    ----------
+    root : str
+        封存資料夾
+    max_file_bytes : int
+        單一附件的大小上限，超過的附件不封存
+    max_total_bytes : int
+        封存資料夾的總大小上限
+    concurrency : int
+        同時下載的附件數
+    chunk_size : int
+        每次讀取與寫入的位元組數
+    max_index : int
+        記憶體中保留的網址對應數
+    """
+    def __init__(self, root: str = "databases/attachments", max_file_bytes: int = 25 * 1024 * 1024,
+                 max_total_bytes: int = 2 * 1024 * 1024 * 1024, concurrency: int = 4, chunk_size: int = 256 * 1024,
+                 max_index: int = 50000):
+        self.root = root
+        self.max_file_bytes = max_file_bytes
+        self.max_total_bytes = max_total_bytes
+        self.chunk_size = chunk_size
+        self.max_index = max_index
+        self._semaphore = asyncio.Semaphore(concurrency)
+        # 雜湊 -> [相對路徑, 大小]，依最後使用時間排序
+        self._files: OrderedDict = OrderedDict()
+        self.total_bytes = 0
+        # 網址路徑 -> {"sha256", "size", "path", "filename"}
+        self._urls: OrderedDict = OrderedDict()
+        # 下載中的網址，避免同一個附件同時下載兩次
+        self._pending: dict = {}
+        self._tasks: set = set()
+
+    # 啟動
+    def _scan(self) -> tuple:
+        files = []
+        for directory, _, filenames in os.walk(self.root):
+            if os.path.abspath(directory) == os.path.abspath(os.path.join(self.root, "tmp")):
+                continue
+            for filename in filenames:
+                if filename == INDEX_FILE:
+                    continue
+                path = os.path.join(directory, filename)
+                stat = os.stat(path)
+                files.append((stat.st_mtime, filename.split(".", 1)[0], os.path.relpath(path, self.root), stat.st_size))
+        entries = []
+        index_path = os.path.join(self.root, INDEX_FILE)
+        if os.path.exists(index_path):
+            with open(index_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entries.append(json.loads(line))
+                    except ValueError:
+                        continue
+        entries = entries[-self.max_index:]
+        # 索引太大時只保留最新的部分
+        with open(index_path, "w", encoding="utf-8") as f:
+            for entry in entries:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        return sorted(files), entries
+
+    async def start(self):
+        os.makedirs(os.path.join(self.root, "tmp"), exist_ok=True)
+        files, entries = await asyncio.to_thread(self._scan)
+        for _, sha256, path, size in files:
+            self._files[sha256] = [path, size]
+            self.total_bytes += size
+        for entry in entries:
+            self._remember(entry)
+        logger.info(f"附件封存 {self.root}：{len(self._files)} 個檔案，共 {self.total_bytes / 1024 / 1024:.1f} MB")
+
+    async def close(self):
+        """等待下載中的附件完成"""
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    # 查詢
+    def _remember(self, entry: dict):
+        self._urls[entry["url"]] = entry
+        self._urls.move_to_end(entry["url"])
+        while len(self._urls) > self.max_index:
+            self._urls.popitem(last=False)
+
+    def lookup(self, url: str):
+        """
+        取得附件的封存紀錄，並把檔案標記為最近使用
+
+        Returns
+        -------
+        dict | None
+            {"url", "sha256", "size", "path": 相對於 root 的路徑, "filename"}，沒有封存或已被刪除時為 None
+        """
+        entry = self._urls.get(url_key(url))
+        if entry is None or entry["sha256"] not in self._files:
+            return None
+        self._files.move_to_end(entry["sha256"])
+        # 修改時間決定重新啟動後的刪除順序，在背景執行緒更新，不阻塞事件迴圈
+        task = asyncio.create_task(asyncio.to_thread(self._touch, os.path.join(self.root, entry["path"])))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return entry
+
+    @staticmethod
+    def _touch(path: str):
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+    # 封存
+    def archive(self, url: str, filename: str, size: int = None):
+        """在背景封存附件，不會等待下載完成"""
+        key = url_key(url)
+        if key in self._urls or key in self._pending:
+            return
+        if size is not None and size > self.max_file_bytes:
+            logger.debug(f"附件 {filename} 大小 {size} 超過上限，不封存")
+            return
+        task = asyncio.create_task(self._archive(url, filename), name=f"attachment-archive:{filename}")
+        self._pending[key] = task
+        self._tasks.add(task)
+        task.add_done_callback(lambda _: (self._pending.pop(key, None), self._tasks.discard(task)))
+
+    async def _download(self, url: str, temp) -> tuple:
+        sha256 = hashlib.sha256()
+        size = 0
+        # 共用工作階段的總逾時是為一般 API 請求設計的，接近大小上限的附件需要更久
+        async with get_http().session.get(url, timeout=DOWNLOAD_TIMEOUT) as response:
+            response.raise_for_status()
+            async for chunk in response.content.iter_chunked(self.chunk_size):
+                size += len(chunk)
+                if size > self.max_file_bytes:
+                    raise ArchiveTooLarge(f"超過 {self.max_file_bytes} 位元組")
+                sha256.update(chunk)
+                await asyncio.to_thread(temp.write, chunk)
+        return sha256.hexdigest(), size
+
+    async def _archive(self, url: str, filename: str):
+        async with self._semaphore:
+            temp = tempfile.NamedTemporaryFile(dir=os.path.join(self.root, "tmp"), delete=False)
+            try:
+                try:
+                    sha256, size = await self._download(url, temp)
+                finally:
+                    temp.close()
+            except (aiohttp.ClientError, asyncio.TimeoutError, OSError, ArchiveTooLarge) as e:
+                self._remove([temp.name])
+                # asyncio.TimeoutError 沒有訊息，改記錄例外類型
+                logger.warning(f"封存附件 {filename} 失敗：{e or type(e).__name__}")
+                return
+            extension = os.path.splitext(filename)[1].lower()[:16]
+            path = os.path.join(sha256[:2], sha256 + extension)
+            if sha256 in self._files:
+                # 內容相同的附件已經封存過
+                os.remove(temp.name)
+                path = self._files[sha256][0]
+                self._files.move_to_end(sha256)
+            else:
+                os.makedirs(os.path.join(self.root, sha256[:2]), exist_ok=True)
+                os.replace(temp.name, os.path.join(self.root, path))
+                self._files[sha256] = [path, size]
+                self.total_bytes += size
+                await self._evict()
+            entry = {"url": url_key(url), "sha256": sha256, "size": size, "path": path, "filename": filename}
+            self._remember(entry)
+            await asyncio.to_thread(self._append_index, entry)
+
+    def _append_index(self, entry: dict):
+        with open(os.path.join(self.root, INDEX_FILE), "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+    async def _evict(self):
+        removed = []
+        while self.total_bytes > self.max_total_bytes and len(self._files) > 1:
+            sha256, (path, size) = self._files.popitem(last=False)
+            self.total_bytes -= size
+            removed.append(os.path.join(self.root, path))
+        if removed:
+            await asyncio.to_thread(self._remove, removed)
+            logger.info(f"附件封存超過 {self.max_total_bytes / 1024 / 1024:.0f} MB，已刪除 {len(removed)} 個最久沒有使用的檔案")
+
+    @staticmethod
+    def _remove(paths: list):
+        for path in paths:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
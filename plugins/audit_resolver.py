@@ -0,0 +1,133 @@
+# 審核日誌執行者查詢模組
+
+import asyncio
+import logging
+import time
+
+import discord
+
+logger = logging.getLogger(__name__)
+
+# 沒有查看審核日誌的權限時，隔多久（秒）再嘗試
+FORBIDDEN_RETRY = 600
+
+class AuditLogResolver:
+    """
+    查詢管理操作（禁止、解除禁止、踢出、身分組變更）的執行者。
+
+    同一個伺服器在 window 秒內的查詢合併成一次審核日誌請求，取得的紀錄依 (動作, 對象 ID) 快取 ttl 秒；
+    收到 on_audit_log_entry_create 時也會直接放進快取，大部分查詢不需要發送請求。
+    每筆紀錄只對應一次管理操作，用過之後同一個對象只接受比它更新的紀錄，
+    例如成員被踢出、重新加入後又自行離開時，不會再次被記錄為踢出。
+    大量禁止 N 位成員大約只需要一次審核日誌請求，而不是 N 次。
+
+    Attributes
+    ----------
+    window : float
+        收集查詢的時間窗（秒），也是等待審核日誌事件的時間
+    ttl : float
+        快取的紀錄保留秒數，也是紀錄與事件之間允許的最大時間差
+    limit : int
+        每次請求最多取得的紀錄數
+    """
+    def __init__(self, window: float = 1.5, ttl: float = 60, limit: int = 100):
+        self.window = window
+        self.ttl = ttl
+        self.limit = limit
+        # (伺服器 ID, 動作, 對象 ID) -> (執行者, 紀錄時間戳記, 原因)
+        self._entries: dict = {}
+        # (伺服器 ID, 動作, 對象 ID) -> 最後一筆已使用紀錄的時間戳記
+        self._used: dict = {}
+        # 伺服器 ID -> [(動作, 對象 ID, Future)]
+        self._pending: dict = {}
+        self._tasks: dict = {}
+        # 伺服器 ID -> 收到 Forbidden 的時間，10 分鐘內不再請求
+        self._forbidden: dict = {}
+        self.requests = 0
+
+    def add_entry(self, entry: discord.AuditLogEntry):
+        """放入一筆審核日誌紀錄（來自 on_audit_log_entry_create 或請求結果），並完成等待中的查詢"""
+        target_id = getattr(entry.target, "id", None)
+        if target_id is None or entry.user is None:
+            return
+        key = (entry.guild.id, entry.action, target_id)
+        created = entry.created_at.timestamp()
+        current = self._entries.get(key)
+        if current is None or current[1] <= created:
+            self._entries[key] = (entry.user, created, entry.reason)
+        for action, pending_target, future in self._pending.get(entry.guild.id, ()):
+            if action == entry.action and pending_target == target_id and not future.done():
+                # 一筆紀錄只完成一個查詢，其他同一對象的查詢等待更新的紀錄
+                taken = self._take(entry.guild.id, action, target_id)
+                if taken is not None:
+                    future.set_result(taken)
+                break
+
+    def _take(self, guild_id: int, action: discord.AuditLogAction, target_id: int):
+        """取得還沒用過且未過期的紀錄，並標記為已使用"""
+        key = (guild_id, action, target_id)
+        entry = self._entries.get(key)
+        if entry is None or time.time() - entry[1] > self.ttl or entry[1] <= self._used.get(key, 0):
+            return None
+        self._used[key] = entry[1]
+        return entry
+
+    def _prune(self):
+        expired = time.time() - self.ttl
+        for key in [key for key, entry in self._entries.items() if entry[1] < expired]:
+            del self._entries[key]
+        for key in [key for key, created in self._used.items() if created < expired]:
+            del self._used[key]
+
+    async def resolve(self, guild: discord.Guild, action: discord.AuditLogAction, target_id: int) -> dict:
+        """
+        查詢執行者
+
+        Returns
+        -------
+        dict | None
+            {"user": 執行者, "reason": 原因}，找不到或沒有權限時為 None
+        """
+        entry = self._take(guild.id, action, target_id)
+        if entry is None:
+            if time.time() - self._forbidden.get(guild.id, 0) < FORBIDDEN_RETRY:
+                return None
+            future = asyncio.get_running_loop().create_future()
+            self._pending.setdefault(guild.id, []).append((action, target_id, future))
+            if guild.id not in self._tasks:
+                self._tasks[guild.id] = asyncio.create_task(self._fetch_later(guild), name=f"audit-resolver:{guild.id}")
+            entry = await future
+        if entry is None:
+            return None
+        return {"user": entry[0], "reason": entry[2]}
+
+    async def _fetch_later(self, guild: discord.Guild):
+        try:
+            # 先等待審核日誌事件，時間窗內沒有收到的才發送請求
+            await asyncio.sleep(self.window)
+            pending = [item for item in self._pending.get(guild.id, []) if not item[2].done()]
+            if pending:
+                await self._fetch(guild, [item[2] for item in pending])
+        finally:
+            del self._tasks[guild.id]
+            for action, target_id, future in self._pending.pop(guild.id, []):
+                if not future.done():
+                    future.set_result(self._take(guild.id, action, target_id))
+            self._prune()
+
+    async def _fetch(self, guild: discord.Guild, pending: list):
+        self.requests += 1
+        oldest = time.time() - self.ttl
+        try:
+            # 每次請求最多 100 筆，等待中的查詢都有結果後就不再取得下一頁
+            async for entry in guild.audit_logs(limit=max(self.limit, len(pending))):
+                if entry.created_at.timestamp() < oldest:
+                    break
+                self.add_entry(entry)
+                if all(future.done() for future in pending):
+                    break
+        except discord.Forbidden:
+            self._forbidden[guild.id] = time.time()
+            logger.warning(f"沒有查看伺服器 {guild.id} 審核日誌的權限，無法取得管理操作的執行者")
+        except discord.HTTPException as e:
+            logger.warning(f"取得伺服器 {guild.id} 的審核日誌失敗：{e}")
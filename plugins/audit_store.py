@@ -0,0 +1,293 @@
+# 稽核事件儲存模組
+
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import time
+
+from plugins import metrics
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY,
+    time REAL NOT NULL,
+    type TEXT NOT NULL,
+    guild_id INTEGER,
+    user_id INTEGER,
+    channel_id INTEGER,
+    target_id INTEGER,
+    message_id INTEGER,
+    content TEXT,
+    extra TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_events_time ON events(time);
+CREATE INDEX IF NOT EXISTS idx_events_user ON events(user_id, time);
+CREATE INDEX IF NOT EXISTS idx_events_channel ON events(channel_id, time);
+CREATE INDEX IF NOT EXISTS idx_events_type ON events(type, time);
+CREATE VIRTUAL TABLE IF NOT EXISTS events_fts USING fts5(content, content='events', content_rowid='id', tokenize='trigram');
+CREATE TRIGGER IF NOT EXISTS events_ai AFTER INSERT ON events WHEN new.content IS NOT NULL BEGIN
+    INSERT INTO events_fts(rowid, content) VALUES (new.id, new.content);
+END;
+CREATE TRIGGER IF NOT EXISTS events_ad AFTER DELETE ON events WHEN old.content IS NOT NULL BEGIN
+    INSERT INTO events_fts(events_fts, rowid, content) VALUES ('delete', old.id, old.content);
+END;
+"""
+
+COLUMNS = ("id", "time", "type", "guild_id", "user_id", "channel_id", "target_id", "message_id", "content", "extra")
+
+# 每次清除的筆數，避免一次刪除太多筆而長時間鎖住資料庫
+PRUNE_CHUNK = 5000
+
+# trigram 分詞器以每 3 個字元建立索引，較短的搜尋文字無法使用全文索引
+FTS_MIN_LENGTH = 3
+
+def _fts_phrase(text: str) -> str:
+    # 把使用者輸入當成一個片語，避免 FTS5 語法（AND、*、引號等）造成錯誤
+    return '"' + text.replace('"', '""') + '"'
+
+def _like_pattern(text: str) -> str:
+    # 跳脫 LIKE 的萬用字元，搜尋文字只比對字面內容
+    return "%" + text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
+class AuditStore:
+    """
+    DcLogging 的稽核事件資料庫：SQLite（WAL 模式），訊息內容以 FTS5 的 trigram 分詞器建立全文索引（需要 SQLite 3.34 以上），
+    中文等不以空白分詞的內容也能以任意子字串搜尋；少於 3 個字的搜尋文字改用 LIKE。
+
+    事件先放在記憶體中，累積 batch_size 筆或每 flush_interval 秒在背景執行緒以單一交易寫入；
+    超過 retention_days 天的事件定期在背景清除。
+
+    Attributes
+    ----------
+    path : str
+        資料庫檔案路徑
+    retention_days : float
+        保留天數，0 代表永久保留
+    batch_size : int
+        累積多少筆事件時立即寫入
+    flush_interval : float
+        最多每隔幾秒寫入一次
+    prune_interval : float
+        每隔幾秒清除一次過期的事件
+    """
+    def __init__(self, path: str = "databases/audit.db", retention_days: float = 90, batch_size: int = 200,
+                 flush_interval: float = 2, prune_interval: float = 3600):
+        self.path = path
+        self.retention_days = retention_days
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.prune_interval = prune_interval
+        self._pending: list = []
+        self._writer = None
+        self._reader = None
+        # 寫入與查詢各使用一個連線，WAL 模式下查詢不會被寫入擋住
+        self._write_lock = asyncio.Lock()
+        self._read_lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+        self._tasks: list = []
+
+    # 連線
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _open(self):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        self._writer = self._connect()
+        row = self._writer.execute("SELECT sql FROM sqlite_master WHERE name = 'events_fts'").fetchone()
+        # 舊版資料庫的全文索引使用預設分詞器，中文整段會被當成一個詞，改用 trigram 重建
+        rebuild = row is not None and "trigram" not in row[0]
+        if rebuild:
+            logger.info("以 trigram 分詞器重建稽核事件的全文索引")
+            self._writer.execute("DROP TABLE events_fts")
+        self._writer.executescript(SCHEMA)
+        if rebuild:
+            self._writer.execute("INSERT INTO events_fts(events_fts) VALUES ('rebuild')")
+        self._writer.commit()
+        self._reader = self._connect()
+
+    async def start(self):
+        await asyncio.to_thread(self._open)
+        self._tasks = [
+            asyncio.create_task(self._flush_loop(), name="audit-store:flush"),
+            asyncio.create_task(self._prune_loop(), name="audit-store:prune")
+        ]
+        logger.info(f"稽核事件資料庫 {self.path} 已開啟")
+
+    async def close(self):
+        """寫入剩下的事件並關閉資料庫"""
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+        await self.flush()
+        async with self._write_lock, self._read_lock:
+            for conn in (self._writer, self._reader):
+                if conn is not None:
+                    await asyncio.to_thread(conn.close)
+            self._writer = self._reader = None
+
+    # 寫入
+    def record(self, type: str, guild_id: int = None, user_id: int = None, channel_id: int = None, target_id: int = None,
+               message_id: int = None, content: str = None, extra: dict = None, timestamp: float = None):
+        """
+        記錄一筆事件，不會等待寫入
+
+        Parameters
+        ----------
+        type : str
+            事件類型，與 cfg.yml 的 log_events 名稱相同（例如 msg_delete）
+        user_id : int
+            事件的主角（訊息發送者、加入的成員等）
+        target_id : int
+            事件的對象或執行者（例如執行禁止的管理員）
+        content : str
+            訊息內容，會建立全文索引
+        extra : dict
+            其他資料，以 JSON 儲存
+        """
+        self._pending.append((
+            timestamp if timestamp is not None else time.time(), type, guild_id, user_id, channel_id, target_id,
+            message_id, content, json.dumps(extra, ensure_ascii=False) if extra else None
+        ))
+        if len(self._pending) >= self.batch_size:
+            self._wakeup.set()
+
+    def _insert(self, rows: list):
+        with metrics.SQLITE_SECONDS.time(store="audit", query="insert"):
+            with self._writer:
+                self._writer.executemany(
+                    "INSERT INTO events (time, type, guild_id, user_id, channel_id, target_id, message_id, content, extra) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    rows
+                )
+
+    async def flush(self):
+        if not self._pending or self._writer is None:
+            return
+        rows, self._pending = self._pending, []
+        async with self._write_lock:
+            try:
+                await asyncio.to_thread(self._insert, rows)
+            except sqlite3.Error as e:
+                logger.error(f"寫入 {len(rows)} 筆稽核事件失敗：{e}")
+
+    async def _flush_loop(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    # 清除
+    def _prune(self, before: float) -> int:
+        removed = 0
+        with metrics.SQLITE_SECONDS.time(store="audit", query="prune"):
+            while True:
+                with self._writer:
+                    cursor = self._writer.execute(
+                        "DELETE FROM events WHERE id IN (SELECT id FROM events WHERE time < ? LIMIT ?)",
+                        (before, PRUNE_CHUNK)
+                    )
+                removed += cursor.rowcount
+                if cursor.rowcount < PRUNE_CHUNK:
+                    break
+        return removed
+
+    async def prune(self) -> int:
+        """清除超過保留天數的事件，回傳清除的筆數"""
+        if not self.retention_days or self._writer is None:
+            return 0
+        before = time.time() - self.retention_days * 86400
+        async with self._write_lock:
+            removed = await asyncio.to_thread(self._prune, before)
+        if removed:
+            logger.info(f"已清除 {removed} 筆超過 {self.retention_days} 天的稽核事件")
+        return removed
+
+    async def _prune_loop(self):
+        while True:
+            try:
+                await self.prune()
+            except sqlite3.Error as e:
+                logger.error(f"清除過期的稽核事件失敗：{e}")
+            await asyncio.sleep(self.prune_interval)
+
+    # 查詢
+    def _search(self, sql: str, params: list) -> list:
+        with metrics.SQLITE_SECONDS.time(store="audit", query="search"):
+            return self._reader.execute(sql, params).fetchall()
+
+    async def search(self, user_id: int = None, channel_id: int = None, type: str = None, since: float = None,
+                     until: float = None, text: str = None, before_id: int = None, limit: int = 10) -> dict:
+        """
+        查詢事件，由新到舊排序
+
+        Parameters
+        ----------
+        since, until : float
+            時間範圍（時間戳記），包含 since、不包含 until
+        text : str
+            在訊息內容中搜尋的文字
+        before_id : int
+            只列出 ID 小於此值的事件，用來取得下一頁（上一頁結果的 next_before_id）
+        limit : int
+            每頁筆數
+
+        Returns
+        -------
+        dict
+            {"results": list[dict], "next_before_id": 下一頁的 before_id，沒有下一頁時為 None}
+        """
+        # 查詢前先寫入記憶體中的事件，才找得到剛發生的事件
+        await self.flush()
+        clauses = []
+        params = []
+        sql = "SELECT " + ", ".join(f"e.{column}" for column in COLUMNS) + " FROM events e"
+        if text and len(text) >= FTS_MIN_LENGTH:
+            sql += " JOIN events_fts f ON f.rowid = e.id"
+            clauses.append("events_fts MATCH ?")
+            params.append(_fts_phrase(text))
+        elif text:
+            clauses.append("e.content LIKE ? ESCAPE '\\'")
+            params.append(_like_pattern(text))
+        for column, value in (("user_id", user_id), ("channel_id", channel_id), ("type", type)):
+            if value is not None:
+                clauses.append(f"e.{column} = ?")
+                params.append(value)
+        if since is not None:
+            clauses.append("e.time >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("e.time < ?")
+            params.append(until)
+        if before_id is not None:
+            clauses.append("e.id < ?")
+            params.append(before_id)
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        # 多取一筆判斷是否還有下一頁
+        sql += " ORDER BY e.id DESC LIMIT ?"
+        params.append(limit + 1)
+        async with self._read_lock:
+            rows = await asyncio.to_thread(self._search, sql, params)
+        results = [dict(zip(COLUMNS, row)) for row in rows[:limit]]
+        for result in results:
+            result["extra"] = json.loads(result["extra"]) if result["extra"] else {}
+        return {
+            "results": results,
+            "next_before_id": results[-1]["id"] if len(rows) > limit else None
+        }
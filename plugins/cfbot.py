@@ -0,0 +1,156 @@
+# 機器人主體
+
+import contextvars
+import functools
+import logging
+import time
+
+import aiohttp
+from discord import app_commands
+from discord.ext import commands
+from discord.utils import MISSING
+
+from plugins import metrics
+from plugins.perf import PerfRecorder
+
+logger = logging.getLogger(__name__)
+
+# 目前正在進行的 REST 請求：[方法, 路由, 實際連線耗時]，供 aiohttp 追蹤事件回報給對應的請求
+_current_request = contextvars.ContextVar("cfbot_current_request", default=None)
+
+class CFTree(app_commands.CommandTree):
+    """記錄每次應用程式指令（斜線指令與右鍵選單）執行時間的指令樹"""
+    async def _call(self, interaction):
+        start = time.perf_counter()
+        try:
+            await self.client.perf.run("/" + interaction.data.get("name", "?"), super()._call(interaction))
+        finally:
+            command = interaction.command
+            name = command.qualified_name if command is not None else interaction.data.get("name", "?")
+            metrics.LISTENER_SECONDS.observe(time.perf_counter() - start, cog="app_commands", event=name)
+
+class CFBot(commands.Bot):
+    """
+    加上效能量測的 commands.Bot。
+
+    - 每個事件監聽器（包含齒輪的 commands.Cog.listener）與應用程式指令都會記錄執行時間，
+      並交給 PerfRecorder 保留最近的紀錄與檢查時間預算
+    - 每個 Gateway 事件都會依類型計數
+    - 每個 Discord REST 請求都會依路由記錄次數、耗時、429 次數與等待速率限制的時間
+    - 載入、停用或重新載入齒輪時，讓指令目錄（bot.command_catalog）失效
+    """
+    def __init__(self, *args, perf: PerfRecorder = None, **kwargs):
+        kwargs.setdefault("http_trace", self._http_trace())
+        kwargs.setdefault("tree_cls", CFTree)
+        self.perf = perf or PerfRecorder()
+        super().__init__(*args, **kwargs)
+        # (原本的函式, 事件名稱) -> 包裝後的函式，取消註冊時需要找回包裝後的函式
+        self._instrumented: dict = {}
+        self.http.request = self._instrument_request(self.http.request)
+
+    # 齒輪
+    def _extensions_changed(self):
+        catalog = getattr(self, "command_catalog", None)
+        if catalog is not None:
+            catalog.invalidate()
+
+    async def load_extension(self, name: str, *, package: str = None) -> None:
+        try:
+            await super().load_extension(name, package=package)
+        finally:
+            self._extensions_changed()
+
+    async def unload_extension(self, name: str, *, package: str = None) -> None:
+        try:
+            await super().unload_extension(name, package=package)
+        finally:
+            self._extensions_changed()
+
+    async def reload_extension(self, name: str, *, package: str = None) -> None:
+        try:
+            await super().reload_extension(name, package=package)
+        finally:
+            self._extensions_changed()
+
+    # 事件監聽器
+    @staticmethod
+    def _owner(func) -> str:
+        owner = getattr(func, "__self__", None)
+        if isinstance(owner, commands.Cog):
+            return owner.qualified_name
+        return getattr(func, "__module__", None) or "bot"
+
+    def _instrument_listener(self, func, name: str):
+        owner = self._owner(func)
+        key = f"{owner}.{name}"
+
+        @functools.wraps(func)
+        async def listener(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await self.perf.run(key, func(*args, **kwargs))
+            finally:
+                metrics.LISTENER_SECONDS.observe(time.perf_counter() - start, cog=owner, event=name)
+        return listener
+
+    def add_listener(self, func, /, name: str = MISSING) -> None:
+        name = func.__name__ if name is MISSING else name
+        wrapped = self._instrumented.get((func, name))
+        if wrapped is None:
+            wrapped = self._instrumented[(func, name)] = self._instrument_listener(func, name)
+        super().add_listener(wrapped, name)
+
+    def remove_listener(self, func, /, name: str = MISSING) -> None:
+        name = func.__name__ if name is MISSING else name
+        wrapped = self._instrumented.pop((func, name), func)
+        super().remove_listener(wrapped, name)
+
+    def dispatch(self, event_name: str, /, *args, **kwargs) -> None:
+        # 在這裡同步計數，而不是註冊 on_socket_event_type，避免每個 Gateway 事件都多建立一個工作
+        if event_name == "socket_event_type":
+            metrics.GATEWAY_EVENTS.inc(event=args[0])
+        super().dispatch(event_name, *args, **kwargs)
+
+    # REST 請求
+    @staticmethod
+    def _http_trace() -> aiohttp.TraceConfig:
+        trace = aiohttp.TraceConfig()
+
+        async def on_request_start(session, context, params):
+            context.start = time.perf_counter()
+
+        async def on_request_end(session, context, params):
+            current = _current_request.get()
+            if current is None:
+                return
+            current[2] += time.perf_counter() - context.start
+            if params.response.status == 429:
+                metrics.REST_RATELIMITED.inc(method=current[0], route=current[1])
+
+        trace.on_request_start.append(on_request_start)
+        trace.on_request_end.append(on_request_end)
+        return trace
+
+    @staticmethod
+    def _instrument_request(request):
+        @functools.wraps(request)
+        async def instrumented(route, **kwargs):
+            current = [route.method, route.path, 0.0]
+            token = _current_request.set(current)
+            start = time.perf_counter()
+            status = "error"
+            try:
+                response = await request(route, **kwargs)
+                status = "ok"
+                return response
+            except Exception as e:
+                status = str(getattr(e, "status", "error"))
+                raise
+            finally:
+                _current_request.reset(token)
+                elapsed = time.perf_counter() - start
+                metrics.REST_REQUESTS.inc(method=route.method, route=route.path, status=status)
+                metrics.REST_SECONDS.observe(elapsed, method=route.method, route=route.path)
+                # 總耗時扣除實際連線的時間，就是等待速率限制（含 429 重試）的時間
+                metrics.REST_RATELIMIT_WAIT.observe(max(elapsed - current[2], 0.0), method=route.method, route=route.path)
+        return instrumented
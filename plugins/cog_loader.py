@@ -0,0 +1,212 @@
+# 齒輪載入模組
+
+import ast
+import asyncio
+import importlib
+import json
+import logging
+import os
+import sys
+import time
+
+from discord.ext import commands
+from discord.ext.commands import NoEntryPointError
+
+from plugins import metrics
+
+logger = logging.getLogger(__name__)
+
+class CogLoader:
+    """
+    一次找出所有齒輪、分析彼此的引入關係，再依照相依層級載入。
+
+    每個齒輪的載入分為兩段：
+    1. 引入：在背景執行緒中預先引入齒輪共用的模組（第三方函式庫、nltemplates、plugins 等），
+       讓不同齒輪的引入 I/O 能同時進行；全部引入完成後才進入下一段，避免齒輪切換工作目錄時影響引入。
+       main 與正在執行的腳本不會預先引入，否則會在背景執行緒中重新執行一次機器人的初始化
+    2. 設定：呼叫 bot.load_extension 執行齒輪本身並呼叫其 setup()。執行齒輪模組是同步的，
+       同一層級以 asyncio.gather 排程時只有 setup() 中的 await 會互相重疊
+
+    Attributes
+    ----------
+    bot : commands.Bot
+        機器人實例
+    root : str
+        齒輪資料夾，預設為 ./Cogs
+    cogs : list[str]
+        找到的齒輪模組名稱，例如 Cogs.annou.annou
+    timings : dict
+        每個齒輪的計時結果，{模組名稱: {"import": 秒, "setup": 秒, "total": 秒, "status": 狀態}}
+    """
+    def __init__(self, bot: commands.Bot, root: str = "./Cogs"):
+        self.bot = bot
+        self.root = root
+        self.cogs: list = []
+        self._paths: dict = {}
+        self._imports: dict = {}
+        self.timings: dict = {}
+        self.boot_time = 0.0
+
+    # 載入範圍包含Cogs資料夾與其子資料夾，並且跳過nl開頭的檔案。
+    def discover(self) -> list:
+        """走訪齒輪資料夾一次，記錄所有要載入的齒輪"""
+        self.cogs = []
+        self._paths = {}
+        for root, _, files in os.walk(self.root):
+            for filename in files:
+                if filename.endswith(".py") and not filename.startswith("nl"):
+                    relative_path = os.path.relpath(os.path.join(root, filename), "./")
+                    module_name = relative_path.replace(os.sep, '.')[:-3]
+                    self.cogs.append(module_name)
+                    self._paths[module_name] = relative_path
+                elif filename.startswith("nl"):
+                    logger.info(f"跳過 {filename}，原因：採用nl方式跳過載入")
+                else:
+                    logger.info(f"跳過 {filename}")
+        return self.cogs
+
+    def _scan_imports(self, module_name: str) -> set:
+        """以 AST 取得齒輪在模組層級引入的所有模組名稱，不會執行齒輪本身"""
+        try:
+            with open(self._paths[module_name], "r", encoding="utf-8") as f:
+                tree = ast.parse(f.read(), filename=self._paths[module_name])
+        except (OSError, SyntaxError) as e:
+            logger.warning(f"分析 {module_name} 的引入失敗：{e}")
+            return set()
+        package = module_name.rpartition(".")[0]
+        names = set()
+        for node in tree.body:
+            if isinstance(node, ast.Import):
+                names.update(alias.name for alias in node.names)
+            elif isinstance(node, ast.ImportFrom):
+                if node.level:
+                    base = package.rsplit(".", node.level - 1)[0] if node.level > 1 else package
+                    module = f"{base}.{node.module}" if node.module else base
+                else:
+                    module = node.module
+                names.add(module)
+                # from Cogs.annou import annou 這類寫法引入的是子模組，若為其他齒輪也要記錄
+                names.update(
+                    f"{module}.{alias.name}" for alias in node.names
+                    if f"{module}.{alias.name}" in self.cogs
+                )
+        return names
+
+    def dependency_layers(self) -> list:
+        """
+        依照齒輪之間的引入關係排出載入層級
+
+        Returns
+        -------
+        list[list[str]]
+            每一層內的齒輪彼此沒有相依，可以並行載入；後面的層級依賴前面的層級
+        """
+        self._imports = {cog: self._scan_imports(cog) for cog in self.cogs}
+        depends = {
+            cog: {other for other in self.cogs if other != cog and other in self._imports[cog]}
+            for cog in self.cogs
+        }
+        layers = []
+        done = set()
+        remaining = list(self.cogs)
+        while remaining:
+            layer = [cog for cog in remaining if depends[cog] <= done]
+            if not layer:
+                # 循環引入，剩下的齒輪就依照原本的順序逐一載入
+                logger.warning(f"齒輪之間有循環引入，將依序載入：{remaining}")
+                layers.extend([cog] for cog in remaining)
+                break
+            layers.append(layer)
+            done.update(layer)
+            remaining = [cog for cog in remaining if cog not in done]
+        return layers
+
+    @staticmethod
+    def _is_script(name: str) -> bool:
+        """main、__main__，或目前正在執行的腳本（以其他檔名啟動機器人時）"""
+        top = name.split(".", 1)[0]
+        if top in ("main", "__main__"):
+            return True
+        script = getattr(sys.modules.get("__main__"), "__file__", None)
+        return script is not None and os.path.splitext(os.path.basename(script))[0] == top
+
+    def _shared_modules(self, cog: str) -> list:
+        """齒輪需要預先引入的模組：排除同樣由本載入器負責的齒輪，以及根目錄的腳本"""
+        return sorted(
+            name for name in self._imports.get(cog, ())
+            if name not in self.cogs and not self._is_script(name)
+        )
+
+    @staticmethod
+    def _import_all(names: list) -> float:
+        start = time.perf_counter()
+        for name in names:
+            try:
+                importlib.import_module(name)
+            except Exception:
+                # 引入失敗時交給 load_extension 回報真正的錯誤
+                pass
+        return time.perf_counter() - start
+
+    async def _load(self, cog: str):
+        record = self.timings[cog]
+        setup_start = time.perf_counter()
+        try:
+            logger.info(f"載入 {self._paths[cog]} 中...")
+            logging.getLogger(cog).setLevel(logging.INFO)
+            await self.bot.load_extension(cog)
+            logger.info(f"載入 {self._paths[cog]} 成功")
+        except NoEntryPointError:
+            record["status"] = "no_entry_point"
+            logger.error(f"載入 {self._paths[cog]} 失敗，原因：無子程式加載切入點")
+        except Exception as e:
+            record["status"] = "failed"
+            logger.error(f"載入 {self._paths[cog]} 失敗：{e}")
+        record["setup"] = time.perf_counter() - setup_start
+        record["total"] = record["import"] + record["setup"]
+
+    async def load_all(self) -> dict:
+        """找出並載入所有齒輪，回傳計時結果"""
+        if not self.cogs:
+            self.discover()
+        layers = self.dependency_layers()
+        logger.debug(f"齒輪載入層級：{layers}")
+        boot_start = time.perf_counter()
+        # 所有齒輪的共用模組在背景執行緒中同時引入
+        import_times = await asyncio.gather(*(
+            asyncio.to_thread(self._import_all, self._shared_modules(cog)) for cog in self.cogs
+        ))
+        self.timings = {
+            cog: {"import": elapsed, "setup": 0.0, "total": 0.0, "status": "ok"}
+            for cog, elapsed in zip(self.cogs, import_times)
+        }
+        for layer in layers:
+            await asyncio.gather(*(self._load(cog) for cog in layer))
+        self.boot_time = time.perf_counter() - boot_start
+        for cog, record in self.timings.items():
+            for phase in ("import", "setup", "total"):
+                metrics.COG_LOAD_SECONDS.set(record[phase], cog=cog, phase=phase)
+        metrics.BOOT_SECONDS.set(self.boot_time)
+        return self.timings
+
+    def report(self) -> str:
+        """將計時結果整理成表格字串"""
+        width = max([len(cog) for cog in self.timings] + [len("齒輪")])
+        lines = [f"{'齒輪'.ljust(width)}  {'引入':>8}  {'設定':>8}  {'總計':>8}  狀態"]
+        for cog, record in sorted(self.timings.items(), key=lambda item: item[1]["total"], reverse=True):
+            lines.append(
+                f"{cog.ljust(width)}  {record['import'] * 1000:>7.1f}ms  {record['setup'] * 1000:>7.1f}ms"
+                f"  {record['total'] * 1000:>7.1f}ms  {record['status']}"
+            )
+        lines.append(f"共 {len(self.timings)} 個齒輪，載入總耗時 {self.boot_time * 1000:.1f}ms")
+        return "\n".join(lines)
+
+    def write_report(self, path: str):
+        """將計時結果寫成 JSON，方便追蹤啟動時間的變化"""
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({
+                "generated_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+                "boot_time": self.boot_time,
+                "cogs": self.timings
+            }, f, indent=4, ensure_ascii=False)
+        logger.info(f"已將齒輪載入計時寫入 {path}")
@@ -0,0 +1,199 @@
+# 指令與齒輪目錄模組
+
+import logging
+import os
+
+import discord
+from discord import app_commands
+
+from plugins.intents_policy import read_cog_intro
+
+logger = logging.getLogger(__name__)
+
+class HelpPaginator(discord.ui.View):
+    """以上一頁／下一頁按鈕切換說明頁面，只有發出指令的使用者可以操作"""
+    def __init__(self, pages: list, user_id: int, timeout: float = 180):
+        super().__init__(timeout=timeout)
+        self.pages = pages
+        self.user_id = user_id
+        self.index = 0
+        self._refresh()
+
+    def _refresh(self):
+        self.previous_page.disabled = self.index == 0
+        self.next_page.disabled = self.index >= len(self.pages) - 1
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        if interaction.user.id != self.user_id:
+            await interaction.response.send_message("只有發出指令的人可以翻頁", ephemeral=True)
+            return False
+        return True
+
+    async def _show(self, interaction: discord.Interaction, index: int):
+        self.index = index
+        self._refresh()
+        await interaction.response.edit_message(embed=self.pages[self.index], view=self)
+
+    @discord.ui.button(label="上一頁", style=discord.ButtonStyle.secondary)
+    async def previous_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self._show(interaction, self.index - 1)
+
+    @discord.ui.button(label="下一頁", style=discord.ButtonStyle.secondary)
+    async def next_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self._show(interaction, self.index + 1)
+
+class CommandCatalog:
+    """
+    指令與齒輪目錄：第一次使用時走訪指令樹與齒輪資料夾，之後直接使用結果，
+    直到載入、停用或重新載入齒輪時才失效並在下次使用時重建。
+
+    /說明、/齒輪列表、slash.json 與齒輪指令的自動完成都使用同一份目錄。
+
+    Attributes
+    ----------
+    bot : commands.Bot
+        機器人實例
+    root : str
+        齒輪資料夾
+    page_size : int
+        說明每頁顯示的指令數（上限 25，為嵌入訊息的欄位上限）
+    """
+    def __init__(self, bot, root: str = "./Cogs", page_size: int = 10):
+        self.bot = bot
+        self.root = os.path.abspath(root)
+        self.page_size = max(1, min(page_size, 25))
+        self._commands = None
+        self._files = None
+        self._cogs = None
+        self._pages = None
+
+    def invalidate(self):
+        """指令樹或已載入的齒輪變更時呼叫，下次使用時重建"""
+        self._commands = None
+        self._files = None
+        self._cogs = None
+        self._pages = None
+
+    # 指令
+    @property
+    def commands(self) -> list:
+        """
+        指令樹中所有的指令與群組
+
+        Returns
+        -------
+        list[dict]
+            {"name", "qualified_name", "description", "group": 是否為指令群組, "module": 定義指令的模組}
+        """
+        if self._commands is None:
+            self._commands = [
+                {
+                    "name": command.name,
+                    "qualified_name": command.qualified_name,
+                    "description": command.description,
+                    "group": isinstance(command, app_commands.Group),
+                    "module": command.module
+                }
+                for command in self.bot.tree.walk_commands()
+            ]
+            logger.debug(f"已重建指令目錄，共 {len(self._commands)} 個指令")
+        return self._commands
+
+    def slash_data(self) -> list:
+        """寫入 slash.json 的內容：每個指令與群組的名稱與說明"""
+        return [{"name": command["name"], "description": command["description"]} for command in self.commands]
+
+    def help_pages(self) -> list:
+        """說明的嵌入訊息，每頁 page_size 個指令（不含指令群組本身）"""
+        if self._pages is None:
+            commands = [command for command in self.commands if not command["group"]]
+            chunks = [commands[i:i + self.page_size] for i in range(0, len(commands), self.page_size)] or [[]]
+            self._pages = []
+            for number, chunk in enumerate(chunks, start=1):
+                embed = discord.Embed(
+                    title="指令說明",
+                    description="以下為機器人指令的說明",
+                    color=discord.Color.green()
+                )
+                for command in chunk:
+                    embed.add_field(name=f"/{command['qualified_name']}", value=command["description"] or "（沒有說明）", inline=False)
+                embed.set_footer(text=f"第 {number}／{len(chunks)} 頁，共 {len(commands)} 個指令")
+                self._pages.append(embed)
+        return self._pages
+
+    # 齒輪
+    @property
+    def files(self) -> list:
+        """
+        齒輪資料夾中的所有齒輪，規則與 CogLoader.discover 相同（跳過 nl 開頭的檔案）
+
+        Returns
+        -------
+        list[dict]
+            {"module": 模組名稱（例如 Cogs.annou.annou）, "key": 指令使用的名稱（例如 annou.annou）, "title": COG_INTRO 的名稱}
+        """
+        if self._files is None:
+            base = os.path.dirname(self.root)
+            files = []
+            for root, _, filenames in os.walk(self.root):
+                for filename in filenames:
+                    if filename.endswith(".py") and not filename.startswith("nl"):
+                        path = os.path.join(root, filename)
+                        module = os.path.relpath(path, base).replace(os.sep, ".")[:-3]
+                        files.append({
+                            "module": module,
+                            "key": module.split(".", 1)[1],
+                            "title": read_cog_intro(path).get("name", module)
+                        })
+            self._files = sorted(files, key=lambda item: item["module"])
+        return self._files
+
+    def cogs(self) -> list:
+        """
+        齒輪清單與目前的載入狀態
+
+        Returns
+        -------
+        list[dict]
+            files 的每一項加上 "loaded": 模組是否已載入、"cogs": 模組註冊的 Cog 類別名稱
+        """
+        if self._cogs is None:
+            by_module = {}
+            for name, cog in self.bot.cogs.items():
+                by_module.setdefault(cog.__module__, []).append(name)
+            extensions = self.bot.extensions
+            self._cogs = [
+                dict(item, loaded=item["module"] in extensions, cogs=by_module.get(item["module"], []))
+                for item in self.files
+            ]
+        return self._cogs
+
+    def has_cog(self, key: str) -> bool:
+        return any(item["key"] == key for item in self.files)
+
+    def cog_choices(self, current: str, loaded: bool = None) -> list:
+        """
+        齒輪參數的自動完成選項
+
+        Parameters
+        ----------
+        current : str
+            使用者目前輸入的文字，比對模組名稱與 COG_INTRO 的名稱
+        loaded : bool | None
+            只列出已載入（True）或未載入（False）的齒輪，None 代表全部
+
+        Returns
+        -------
+        list[app_commands.Choice[str]]
+        """
+        current = current.lower()
+        choices = []
+        for item in self.cogs():
+            if loaded is not None and item["loaded"] != loaded:
+                continue
+            if current and current not in item["key"].lower() and current not in item["title"].lower():
+                continue
+            choices.append(app_commands.Choice(name=f"{item['key']}（{item['title']}）"[:100], value=item["key"]))
+            if len(choices) == 25:
+                break
+        return choices
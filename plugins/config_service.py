@@ -0,0 +1,215 @@
+# 設定檔服務模組
+
+import asyncio
+import logging
+import os
+import sys
+from collections.abc import Mapping
+
+import yaml
+from discord.ext import commands, tasks
+
+logger = logging.getLogger(__name__)
+
+# 目前使用中的設定服務，供不是齒輪的模組（如 nltemplates、plugins）取用
+_current = None
+
+def get_config() -> "ConfigService":
+    """
+    取得目前使用中的設定服務
+
+    Returns
+    -------
+    ConfigService
+        main.py 建立並掛在 bot.config 上的設定服務
+    """
+    if _current is None:
+        raise RuntimeError("設定服務尚未建立，請先由 main.py 建立 ConfigService")
+    return _current
+
+def freeze(value):
+    """將 YAML 解析結果轉為不可變的快照：字典轉為 FrozenConfig，清單轉為 tuple"""
+    if isinstance(value, Mapping):
+        return FrozenConfig(value)
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    return value
+
+class FrozenConfig(Mapping):
+    """
+    不可變的設定區塊快照，用法與 dict 相同（[]、get、in、items），但無法修改。
+    """
+    __slots__ = ("_data",)
+
+    def __init__(self, data: Mapping):
+        object.__setattr__(self, "_data", {key: freeze(value) for key, value in data.items()})
+
+    def __getitem__(self, key):
+        return self._data[key]
+
+    def __iter__(self):
+        return iter(self._data)
+
+    def __len__(self):
+        return len(self._data)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("設定快照為唯讀，請修改 cfg.yml")
+
+    def __eq__(self, other):
+        if isinstance(other, FrozenConfig):
+            return self._data == other._data
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(tuple(sorted(self._data.items(), key=lambda item: str(item[0]))))
+
+    def __repr__(self):
+        return repr(self._data)
+
+class ConfigService(Mapping):
+    """
+    整個機器人共用的設定服務，只解析一次 cfg.yml，並以 bot.config 提供給所有齒輪。
+
+    齒輪取得的是不可變的區塊快照；設定檔變更時，服務會比對出有變動的頂層區塊，
+    並只重新載入在 COG_INTRO["config_sections"] 中宣告使用這些區塊的齒輪。
+
+    Attributes
+    ----------
+    path : str
+        設定檔路徑
+    mtime : float
+        最後一次載入時設定檔的修改時間
+    """
+    def __init__(self, path: str):
+        global _current
+        self.path = os.path.abspath(path)
+        self.mtime = 0.0
+        self._listeners = []
+        self._watch = None
+        self._data = freeze(self._parse())
+        _current = self
+
+    def _read(self) -> dict:
+        with open(self.path, "r", encoding="utf-8") as f:
+            data = yaml.safe_load(f)
+        return data or {}
+
+    def _parse(self) -> dict:
+        self.mtime = os.path.getmtime(self.path)
+        return self._read()
+
+    def peek(self) -> FrozenConfig:
+        """讀取設定檔目前的內容，不會替換快照、更新修改時間或觸發齒輪重新載入"""
+        return freeze(self._read())
+
+    # Mapping 介面，讓 bot.config["x"]、bot.config.get("x", {}) 維持原本的用法
+    def __getitem__(self, key):
+        return self._data[key]
+
+    def __iter__(self):
+        return iter(self._data)
+
+    def __len__(self):
+        return len(self._data)
+
+    def section(self, name: str, default = None):
+        """取得單一頂層區塊的快照"""
+        return self._data.get(name, default)
+
+    def diff(self, new_data: FrozenConfig) -> set:
+        """比對新舊設定，回傳有變動的頂層區塊名稱"""
+        keys = set(self._data) | set(new_data)
+        return {key for key in keys if self._data.get(key) != new_data.get(key)}
+
+    def reload(self) -> set:
+        """
+        重新解析設定檔並替換快照
+
+        Returns
+        -------
+        set[str]
+            有變動的頂層區塊名稱
+        """
+        new_data = freeze(self._parse())
+        changed = self.diff(new_data)
+        self._data = new_data
+        if changed:
+            logger.info(f"設定檔已重新載入，變動的區塊：{sorted(changed)}")
+        return changed
+
+    def subscribe(self, sections, callback):
+        """
+        註冊設定變更的回呼
+
+        Parameters
+        ----------
+        sections : Iterable[str]
+            關注的頂層區塊
+        callback : Callable[[set], Awaitable | None]
+            區塊變動時呼叫，參數為有變動的區塊名稱
+        """
+        self._listeners.append((frozenset(sections), callback))
+
+    def affected_extensions(self, bot: commands.Bot, changed: set) -> list:
+        """找出宣告使用了變動區塊的已載入齒輪"""
+        affected = []
+        for name in list(bot.extensions):
+            module = sys.modules.get(name)
+            sections = getattr(module, "COG_INTRO", {}).get("config_sections", ())
+            if changed & set(sections):
+                affected.append(name)
+        return affected
+
+    async def apply(self, bot: commands.Bot, changed: set) -> list:
+        """通知訂閱者並重新載入受影響的齒輪，回傳已重新載入的齒輪"""
+        for sections, callback in self._listeners:
+            if sections & changed:
+                result = callback(changed)
+                if asyncio.iscoroutine(result):
+                    await result
+        reloaded = []
+        for name in self.affected_extensions(bot, changed):
+            try:
+                await bot.reload_extension(name)
+                reloaded.append(name)
+                logger.info(f"設定變更，已重新載入 {name}")
+            except Exception as e:
+                logger.error(f"設定變更後重新載入 {name} 失敗：{e}")
+        return reloaded
+
+    async def check(self, bot: commands.Bot) -> list:
+        """檢查設定檔的修改時間，有變更才重新解析並套用"""
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError as e:
+            logger.warning(f"無法讀取設定檔狀態：{e}")
+            return []
+        if mtime == self.mtime:
+            return []
+        try:
+            changed = await asyncio.to_thread(self.reload)
+        except Exception as e:
+            # 解析失敗時保留舊設定，並記錄此次修改時間以免重複報錯
+            self.mtime = mtime
+            logger.error(f"重新解析設定檔失敗，將繼續使用舊設定：{e}")
+            return []
+        if not changed:
+            return []
+        return await self.apply(bot, changed)
+
+    def start_watching(self, bot: commands.Bot, interval: float = 5):
+        """開始以修改時間監看設定檔"""
+        if self._watch is not None and self._watch.is_running():
+            return
+
+        async def _watch():
+            await self.check(bot)
+
+        self._watch = tasks.loop(seconds=interval)(_watch)
+        self._watch.start()
+        logger.info(f"開始監看設定檔 {self.path}，每 {interval} 秒檢查一次")
+
+    def stop_watching(self):
+        if self._watch is not None and self._watch.is_running():
+            self._watch.cancel()
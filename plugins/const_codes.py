@@ -1,18 +1,90 @@
 # 常數代碼
 
-import requests
+import asyncio
+import json
+import logging
+import os
+import time
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
 
 # 專案常數
 REPO_NAME = 'yunyubot-dc-annou'
 
+# 檢查更新的快取檔案，放在專案根目錄
+CACHE_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'update_cache.json')
+
+def _read_cache(path: str) -> dict:
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            cache = json.load(f)
+        return cache if isinstance(cache, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+def _write_cache(path: str, cache: dict):
+    try:
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(cache, f, indent = 4)
+    except OSError as e:
+        logger.warning(f'寫入檢查更新快取失敗：{e}')
+
 # 定義代碼
 # 開啟 async 檢查專案最新版本
-async def check_version():
-    """檢查專案最新版本"""
+async def check_version(cache_path: str = CACHE_FILE, ttl: float = 3600, timeout: float = 5, session: aiohttp.ClientSession = None):
+    """檢查專案最新版本
+
+    在快取有效期限內直接回傳上次的結果，不發送任何請求；
+    過期後以 If-None-Match 發送條件式請求，GitHub 回應 304 時沿用快取內容。
+
+    Parameters
+    -----------
+    cache_path: str
+        快取檔案路徑
+    ttl: float
+        快取有效秒數
+    timeout: float
+        請求的總逾時秒數
+    session: aiohttp.ClientSession
+        要使用的連線，未提供時會建立一個臨時連線
+
+    Returns
+    -----------
+    dict
+        {'latest': 最新版本, 'zip': zip 下載網址, 'tar': tar 下載網址, 'source': 'cache' | 'not_modified' | 'network'}
+    """
+    cache = await asyncio.to_thread(_read_cache, cache_path)
+    result = cache.get('result')
+    if result and time.time() - cache.get('checked_at', 0) < ttl:
+        return {**result, 'source': 'cache'}
+
     url = f"https://api.github.com/repos/510208/{REPO_NAME}/tags"
-    response = requests.get(url)
-    tags = response.json()
-    latest_tag = tags[0]['name']
-    zip_url = tags[0]['zipball_url']
-    tar_url = tags[0]['tarball_url']
-    return {'latest': latest_tag, 'zip': zip_url, 'tar': tar_url}
\ No newline at end of file
+    headers = {'Accept': 'application/vnd.github+json'}
+    if result and cache.get('etag'):
+        headers['If-None-Match'] = cache['etag']
+
+    owns_session = session is None
+    if owns_session:
+        session = aiohttp.ClientSession()
+    try:
+        async with session.get(url, headers = headers, timeout = aiohttp.ClientTimeout(total = timeout)) as response:
+            if response.status == 304 and result:
+                source = 'not_modified'
+            else:
+                response.raise_for_status()
+                tags = await response.json()
+                result = {
+                    'latest': tags[0]['name'],
+                    'zip': tags[0]['zipball_url'],
+                    'tar': tags[0]['tarball_url']
+                }
+                source = 'network'
+            etag = response.headers.get('ETag', cache.get('etag'))
+    finally:
+        if owns_session:
+            await session.close()
+
+    await asyncio.to_thread(_write_cache, cache_path, {'checked_at': time.time(), 'etag': etag, 'result': result})
+    return {**result, 'source': source}
@@ -0,0 +1,122 @@
+# 訊息批次刪除模組
+
+import asyncio
+import datetime
+import logging
+
+import discord
+
+from plugins import metrics
+
+logger = logging.getLogger(__name__)
+
+# 批量刪除 API 的限制：一次 2～100 則，且只能刪除 14 天內的訊息
+BULK_MAX = 100
+BULK_MAX_AGE = datetime.timedelta(days=14)
+
+class DeleteQueue:
+    """
+    依頻道收集要刪除的訊息，在時間窗內合併成一次批量刪除請求（每次最多 100 則），
+    洗版時只需要少量 REST 請求，不會每則訊息各刪除一次。
+    超過 14 天的訊息與只有一則的批次改用單則刪除；批量刪除失敗時也會逐則重試。
+
+    Attributes
+    ----------
+    bot : commands.Bot
+        機器人實例
+    name : str
+        名稱，用於日誌與指標
+    window : float
+        頻道中第一則訊息排入後最多等待幾秒再刪除
+    """
+    def __init__(self, bot, name: str, window: float = 1.0):
+        self.bot = bot
+        self.name = name
+        self.window = window
+        # 頻道 ID -> 等待刪除的訊息 ID
+        self._pending: dict = {}
+        self._wakeups: dict = {}
+        self._tasks: dict = {}
+        self._closing = False
+
+    @property
+    def depth(self) -> int:
+        return sum(len(ids) for ids in self._pending.values())
+
+    def put(self, message: discord.Message):
+        """將訊息排入所在頻道的刪除佇列"""
+        channel_id = message.channel.id
+        ids = self._pending.setdefault(channel_id, [])
+        ids.append(message.id)
+        metrics.DELETE_QUEUE_DEPTH.set(self.depth, queue=self.name)
+        if channel_id not in self._tasks:
+            self._wakeups[channel_id] = asyncio.Event()
+            self._tasks[channel_id] = asyncio.create_task(self._run(channel_id), name=f"delete-queue:{self.name}:{channel_id}")
+        elif len(ids) >= BULK_MAX:
+            # 已經湊滿一次批量刪除，不需要等到時間窗結束
+            self._wakeups[channel_id].set()
+
+    async def close(self, timeout: float = 10):
+        """立即刪除佇列中剩下的訊息"""
+        self._closing = True
+        for wakeup in self._wakeups.values():
+            wakeup.set()
+        if not self._tasks:
+            return
+        done, pending = await asyncio.wait(list(self._tasks.values()), timeout=timeout)
+        if pending:
+            logger.warning(f"{self.name} 關閉時仍有 {self.depth} 則訊息未刪除")
+
+    async def _run(self, channel_id: int):
+        wakeup = self._wakeups[channel_id]
+        try:
+            while self._pending.get(channel_id):
+                if len(self._pending[channel_id]) < BULK_MAX and not self._closing:
+                    wakeup.clear()
+                    try:
+                        await asyncio.wait_for(wakeup.wait(), self.window)
+                    except asyncio.TimeoutError:
+                        pass
+                ids = self._pending[channel_id][:BULK_MAX]
+                del self._pending[channel_id][:BULK_MAX]
+                metrics.DELETE_QUEUE_DEPTH.set(self.depth, queue=self.name)
+                try:
+                    await self._delete(channel_id, ids)
+                except Exception as e:
+                    logger.error(f"{self.name} 刪除頻道 {channel_id} 的 {len(ids)} 則訊息時發生未預期錯誤：{e}", exc_info=e)
+        finally:
+            del self._tasks[channel_id]
+            del self._wakeups[channel_id]
+            if not self._pending.get(channel_id):
+                self._pending.pop(channel_id, None)
+
+    async def _delete(self, channel_id: int, ids: list):
+        # 保留一分鐘的誤差，避免送出時剛好超過 14 天
+        cutoff = discord.utils.time_snowflake(discord.utils.utcnow() - BULK_MAX_AGE + datetime.timedelta(minutes=1))
+        recent = list(dict.fromkeys(message_id for message_id in ids if message_id > cutoff))
+        single = [message_id for message_id in ids if message_id <= cutoff]
+        if len(recent) >= 2:
+            try:
+                await self.bot.http.delete_messages(channel_id, recent)
+                metrics.DELETES_PER_REQUEST.observe(len(recent), queue=self.name, mode="bulk")
+                logger.info(f"{self.name} 已批量刪除頻道 {channel_id} 中的 {len(recent)} 則訊息")
+            except discord.Forbidden:
+                logger.error(f"無法刪除頻道 {channel_id} 中的訊息，機器人可能缺乏「管理訊息」權限。")
+                return
+            except discord.HTTPException as e:
+                # 例如其中有訊息已被刪除，改為逐則刪除
+                logger.warning(f"{self.name} 批量刪除頻道 {channel_id} 中的 {len(recent)} 則訊息失敗，改為逐則刪除：{e}")
+                single += recent
+        else:
+            single += recent
+        for message_id in single:
+            try:
+                await self.bot.http.delete_message(channel_id, message_id)
+                metrics.DELETES_PER_REQUEST.observe(1, queue=self.name, mode="single")
+            except discord.NotFound:
+                logger.warning(f"嘗試刪除訊息 (ID: {message_id}) 時未找到該訊息，可能已被手動刪除。")
+            except discord.Forbidden:
+                logger.error(f"無法刪除頻道 {channel_id} 中的訊息，機器人可能缺乏「管理訊息」權限。")
+                return
+            except discord.HTTPException as e:
+                logger.error(f"刪除訊息 (ID: {message_id}) 失敗：{e}")
@@ -3,21 +3,18 @@
 import logging
 import sqlite3
 from pydactyl import PterodactylClient
-import aiohttp
 # 解析 Base64 的模組
 import base64
 import json
-import yaml
 import time
 import asyncio
 from plugins.pprint_formatter import PPrintFormatter
+from plugins.config_service import get_config
+from plugins.http_service import get_http
+from plugins import metrics
 
 logger = logging.getLogger(__name__)
 
-with open('cfg.yml', "r", encoding="utf-8") as file:
-    config = yaml.safe_load(file)["ptersearch"]
-    server_id = config["server_id"]
-
 # 用 Discord ID 查詢玩家的 Minecraft 資訊的類別
 class dcSearcher:
     """
@@ -29,8 +26,10 @@ class dcSearcher:
         Pterodactyl API 客戶端。
     db_path : str
         SQLite 資料庫的路徑。
+    server_id : str
+        Pterodactyl 伺服器 ID。
     """
-    def __init__(self, pt_url: str, pt_key: str, db_path: str):
+    def __init__(self, pt_url: str, pt_key: str, db_path: str, server_id: str = None):
         """
         初始化 dcSearcher 類別。
 
@@ -42,9 +41,12 @@ class dcSearcher:
             Pterodactyl API 的密鑰。
         db_path : str
             SQLite 資料庫的路徑。
+        server_id : str
+            Pterodactyl 伺服器 ID，未提供時使用 cfg.yml 中 ptersearch 的設定。
         """
         self.api = PterodactylClient(pt_url, pt_key)
         self.db_path = db_path
+        self.server_id = server_id or get_config()["ptersearch"]["server_id"]
 
     def __getServerStat(self):
         """
@@ -56,7 +58,7 @@ class dcSearcher:
             DiscordSRV 資料
         """
         try:
-            ct_response_item = self.api.client.servers.files.get_file_contents(server_id, "/plugins/DiscordSRV/accounts.aof")
+            ct_response_item = self.api.client.servers.files.get_file_contents(self.server_id, "/plugins/DiscordSRV/accounts.aof")
             ct = ct_response_item.text
             # 若取得資料為空，則引起錯誤
             if ct == "":
@@ -87,28 +89,29 @@ class dcSearcher:
         # 調用getServerStat並將字典記錄到map變數中
         map = self.__getServerStat()
 
-        # 取得資料庫中現有的資料
-        cursor.execute("SELECT dc_id, mc_uuid FROM player_discord_mapping")
-        existing_data = cursor.fetchall()
+        with metrics.SQLITE_SECONDS.time(store="playermapping", query="sync"):
+            # 取得資料庫中現有的資料
+            cursor.execute("SELECT dc_id, mc_uuid FROM player_discord_mapping")
+            existing_data = cursor.fetchall()
 
-        # 將資料庫中的資料轉換成字典以便處理
-        db_map = {mc_uuid: dc_id for dc_id, mc_uuid in existing_data}
+            # 將資料庫中的資料轉換成字典以便處理
+            db_map = {mc_uuid: dc_id for dc_id, mc_uuid in existing_data}
 
-        # 刪除資料庫中 map 中沒有的紀錄
-        for mc_uuid in db_map:
-            if mc_uuid not in map.values():
-                cursor.execute("DELETE FROM player_discord_mapping WHERE mc_uuid = ?", (mc_uuid,))
+            # 刪除資料庫中 map 中沒有的紀錄
+            for mc_uuid in db_map:
+                if mc_uuid not in map.values():
+                    cursor.execute("DELETE FROM player_discord_mapping WHERE mc_uuid = ?", (mc_uuid,))
 
-        # 新增 map 中有但資料庫中沒有的紀錄，或是更新不一致的紀錄
-        for dc_id, mc_uuid in map.items():
-            if mc_uuid not in db_map:
-                cursor.execute("INSERT INTO player_discord_mapping (dc_id, mc_uuid) VALUES (?, ?)", (dc_id, mc_uuid))
-            elif db_map[mc_uuid] != dc_id:
-                cursor.execute("UPDATE player_discord_mapping SET dc_id = ? WHERE mc_uuid = ?", (dc_id, mc_uuid))
+            # 新增 map 中有但資料庫中沒有的紀錄，或是更新不一致的紀錄
+            for dc_id, mc_uuid in map.items():
+                if mc_uuid not in db_map:
+                    cursor.execute("INSERT INTO player_discord_mapping (dc_id, mc_uuid) VALUES (?, ?)", (dc_id, mc_uuid))
+                elif db_map[mc_uuid] != dc_id:
+                    cursor.execute("UPDATE player_discord_mapping SET dc_id = ? WHERE mc_uuid = ?", (dc_id, mc_uuid))
 
-        # 提交變更並關閉資料庫連接
-        conn.commit()
-        conn.close()
+            # 提交變更並關閉資料庫連接
+            conn.commit()
+            conn.close()
 
     # 調用 syncDcsrv 函數進行同步
     # syncDcsrv()
@@ -124,22 +127,24 @@ class dcSearcher:
         mc_uuid: str
             要查詢的 Minecraft UUID
         """
-        conn = sqlite3.connect('databases/playermapping.db')
-        cursor = conn.cursor()
-        cursor.execute("SELECT dc_id FROM player_discord_mapping WHERE mc_uuid = ?", (mc_uuid,))
-        dc_id = cursor.fetchone()
-        conn.close()
+        with metrics.SQLITE_SECONDS.time(store="playermapping", query="get_discord_id"):
+            conn = sqlite3.connect('databases/playermapping.db')
+            cursor = conn.cursor()
+            cursor.execute("SELECT dc_id FROM player_discord_mapping WHERE mc_uuid = ?", (mc_uuid,))
+            dc_id = cursor.fetchone()
+            conn.close()
         if dc_id == None:
             return dc_id
         return dc_id[0]
     
     # 藉由 Discord ID 取得對應的 Minecraft UUID
     def getMinecraftUUID(self, dc_id: str):
-        conn = sqlite3.connect('databases/playermapping.db')
-        cursor = conn.cursor()
-        cursor.execute("SELECT mc_uuid FROM player_discord_mapping WHERE dc_id = ?", (dc_id,))
-        mc_uuid = cursor.fetchone()
-        conn.close()
+        with metrics.SQLITE_SECONDS.time(store="playermapping", query="get_minecraft_uuid"):
+            conn = sqlite3.connect('databases/playermapping.db')
+            cursor = conn.cursor()
+            cursor.execute("SELECT mc_uuid FROM player_discord_mapping WHERE dc_id = ?", (dc_id,))
+            mc_uuid = cursor.fetchone()
+            conn.close()
         if mc_uuid == None:
             return mc_uuid
         return mc_uuid[0]
@@ -175,11 +180,12 @@ class dcSearcher:
             return d
 
     def excuteDbCmd(self, cmd: str):
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        r = cursor.execute(cmd)
-        conn.commit()
-        conn.close()
+        with metrics.SQLITE_SECONDS.time(store="playermapping", query="execute"):
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+            r = cursor.execute(cmd)
+            conn.commit()
+            conn.close()
         return r.fetchall()
 
     # 自訂錯誤：找不到 Discord ID 或 Minecraft UUID
@@ -201,14 +207,13 @@ class playerInfo:
         self.isometricAvatarUrl = None
     
     async def __getInfo(self):
-        async with aiohttp.ClientSession() as session:
-            base_url = "https://sessionserver.mojang.com/session/minecraft/profile/"
-            if self.playerTimeStamps != None:
-                args = f"?at={self.playerTimeStamps}"
-            else:
-                args = ""
-            async with session.get(f"{base_url}{self.playerUUID}{args}") as response:
-                return await response.json()
+        base_url = "https://sessionserver.mojang.com/session/minecraft/profile/"
+        if self.playerTimeStamps != None:
+            args = f"?at={self.playerTimeStamps}"
+        else:
+            args = ""
+        response = await get_http().get(f"{base_url}{self.playerUUID}{args}")
+        return response["data"]
             
     def __getPlayerProperties(self, basedText: str):
         # 將 base64 解碼
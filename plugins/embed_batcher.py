@@ -0,0 +1,223 @@
+# 嵌入訊息批次發送模組
+
+import asyncio
+import logging
+import time
+from collections import Counter, deque
+
+import discord
+
+from plugins import metrics
+
+logger = logging.getLogger(__name__)
+
+# Discord 單則訊息的限制
+MAX_EMBEDS = 10
+MAX_EMBED_CHARS = 6000
+
+OVERFLOW_POLICIES = ("summarize", "drop", "block")
+
+def _close(file: discord.File):
+    # discord.File 不會關閉外部傳入的檔案物件（例如暫存檔），發送後要自己關閉
+    file.close()
+    file.fp.close()
+
+class EmbedBatcher:
+    """
+    將要發送到同一個頻道的嵌入訊息排入佇列，在時間窗內合併成一則最多 10 個嵌入的訊息，
+    大量事件只會產生少量 REST 請求，不容易觸發頻道的速率限制。
+    附帶檔案的嵌入會是該則訊息的最後一個嵌入，每則訊息最多一個檔案。
+
+    佇列已滿時依 overflow 處理：
+    - summarize：略過新的嵌入，並在下一則訊息附上被略過的事件數摘要
+    - drop：略過新的嵌入，只記錄在日誌與指標
+    - block：等待佇列有空間，讓產生事件的處理器慢下來
+
+    Attributes
+    ----------
+    bot : commands.Bot
+        機器人實例
+    channel_id : int
+        目標頻道 ID
+    name : str
+        名稱，用於日誌與指標
+    max_embeds : int
+        每則訊息最多的嵌入數
+    window : float
+        第一個嵌入排入後最多等待幾秒再發送
+    max_queue : int
+        佇列上限
+    overflow : str
+        佇列已滿時的處理方式
+    """
+    def __init__(self, bot, channel_id: int, name: str, max_embeds: int = MAX_EMBEDS, window: float = 2.0,
+                 max_queue: int = 500, overflow: str = "summarize"):
+        if overflow not in OVERFLOW_POLICIES:
+            logger.warning(f"{name} 的 overflow 設定 {overflow} 無效，改用 summarize")
+            overflow = "summarize"
+        self.bot = bot
+        self.channel_id = channel_id
+        self.name = name
+        self.max_embeds = max(1, min(max_embeds, MAX_EMBEDS))
+        self.window = window
+        self.max_queue = max_queue
+        self.overflow = overflow
+        # (排入時間, 嵌入, 檔案)
+        self._queue: deque = deque()
+        # {事件說明: 被略過的次數}
+        self._dropped = Counter()
+        self._wakeup = asyncio.Event()
+        self._space = asyncio.Event()
+        self._space.set()
+        self._closing = False
+        self._task = None
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._closing = False
+            self._task = asyncio.create_task(self._run(), name=f"embed-batcher:{self.name}")
+
+    async def close(self, timeout: float = 10):
+        """停止接收新的嵌入，並在 timeout 秒內送出佇列中剩下的嵌入"""
+        self._closing = True
+        self._wakeup.set()
+        if self._task is None:
+            return
+        try:
+            await asyncio.wait_for(self._task, timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"{self.name} 關閉時仍有 {len(self._queue)} 個嵌入未送出")
+        self._task = None
+
+    @property
+    def depth(self) -> int:
+        return len(self._queue)
+
+    async def put(self, embed: discord.Embed, file: discord.File = None) -> bool:
+        """
+        將嵌入（與附帶的檔案）排入佇列
+
+        Returns
+        -------
+        bool
+            是否成功排入，佇列已滿且 overflow 不是 block 時為 False
+        """
+        while len(self._queue) >= self.max_queue and not self._closing:
+            if self.overflow != "block":
+                self._dropped[embed.description or embed.title or "未知事件"] += 1
+                metrics.LOG_QUEUE_DROPPED.inc(sink=self.name, policy=self.overflow)
+                if file is not None:
+                    _close(file)
+                return False
+            self._space.clear()
+            await self._space.wait()
+        self._queue.append((time.monotonic(), embed, file))
+        metrics.LOG_QUEUE_DEPTH.set(len(self._queue), sink=self.name)
+        self._wakeup.set()
+        return True
+
+    async def _run(self):
+        while True:
+            if not self._queue and not self._dropped:
+                if self._closing:
+                    return
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            # 第一個嵌入排入後等待時間窗，湊滿一則訊息或關閉時提早發送
+            deadline = (self._queue[0][0] if self._queue else time.monotonic()) + self.window
+            while len(self._queue) < self.max_embeds and not self._closing:
+                delay = deadline - time.monotonic()
+                if delay <= 0:
+                    break
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    break
+            try:
+                await self._flush()
+            except Exception as e:
+                logger.error(f"{self.name} 發送紀錄時發生未預期錯誤：{e}", exc_info=e)
+
+    def _take(self) -> tuple:
+        """
+        取出一則訊息能容納的嵌入：數量不超過 max_embeds、字數總和不超過 6000、最多一個檔案
+
+        Returns
+        -------
+        tuple
+            ([(嵌入, 檔案), ...], 最早的排入時間)
+        """
+        items = []
+        oldest = None
+        chars = 0
+        while self._queue and len(items) < self.max_embeds:
+            queued_at, embed, file = self._queue[0]
+            size = len(embed)
+            if items and chars + size > MAX_EMBED_CHARS:
+                break
+            self._queue.popleft()
+            items.append((embed, file))
+            chars += size
+            oldest = queued_at if oldest is None else oldest
+            if file is not None:
+                break
+        if self._dropped and len(items) < self.max_embeds:
+            summary = self._summary()
+            if not items or chars + len(summary) <= MAX_EMBED_CHARS:
+                # 摘要放在附帶檔案的嵌入之前
+                items.insert(len(items) - 1 if items and items[-1][1] is not None else len(items), (summary, None))
+                self._dropped.clear()
+        metrics.LOG_QUEUE_DEPTH.set(len(self._queue), sink=self.name)
+        if len(self._queue) < self.max_queue:
+            self._space.set()
+        return items, oldest
+
+    def _summary(self) -> discord.Embed:
+        total = sum(self._dropped.values())
+        embed = discord.Embed(
+            title="紀錄摘要",
+            description=f"事件過多，已略過 {total} 筆紀錄",
+            color=0xfff4e0
+        )
+        for description, count in self._dropped.most_common(25):
+            embed.add_field(name=description[:256], value=f"{count} 筆")
+        logger.warning(f"{self.name} 佇列已滿，略過 {total} 筆紀錄")
+        return embed
+
+    async def _flush(self):
+        items, oldest = self._take()
+        if not items:
+            return
+        embeds = [embed for embed, _ in items]
+        files = [file for _, file in items if file is not None]
+        channel = self.bot.get_channel(self.channel_id)
+        if channel is None:
+            logger.warning(f"找不到頻道 {self.channel_id}，略過 {len(embeds)} 筆紀錄")
+            for file in files:
+                _close(file)
+            return
+        try:
+            await channel.send(embeds=embeds, files=files)
+        except discord.Forbidden:
+            logger.warning(f"無法發送訊息到頻道 {self.channel_id}，請檢查機器人權限")
+        except discord.HTTPException as e:
+            if e.status != 400 or len(embeds) == 1:
+                logger.error(f"發送紀錄到頻道 {self.channel_id} 失敗：{e}")
+            else:
+                # 其中一個嵌入不合規定時整則訊息都會被拒絕，改為逐一發送，只略過有問題的嵌入
+                for embed, file in items:
+                    try:
+                        if file is not None:
+                            file.reset()
+                            await channel.send(embed=embed, file=file)
+                        else:
+                            await channel.send(embed=embed)
+                    except discord.HTTPException as e:
+                        logger.error(f"發送紀錄到頻道 {self.channel_id} 失敗：{e}")
+        finally:
+            for file in files:
+                _close(file)
+            if oldest is not None:
+                metrics.LOG_FLUSH_SECONDS.observe(time.monotonic() - oldest, sink=self.name)
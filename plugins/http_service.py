@@ -0,0 +1,203 @@
+# 共用 HTTP 連線服務模組
+
+import asyncio
+import logging
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+# 目前使用中的 HTTP 服務，供不是齒輪的模組（如 discordcore、mcsm_client）取用
+_current = None
+
+# 會重試的 HTTP 狀態碼
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+def get_http() -> "HttpService":
+    """
+    取得目前使用中的 HTTP 服務
+
+    Returns
+    -------
+    HttpService
+        main.py 建立並掛在 bot.http_service 上的 HTTP 服務
+    """
+    if _current is None:
+        raise RuntimeError("HTTP 服務尚未建立，請先由 main.py 建立 HttpService")
+    return _current
+
+class HttpService:
+    """
+    整個機器人共用的 aiohttp 連線池，所有對外的 HTTP 請求都經由這裡發送。
+
+    連線會保持 keep-alive 並重複使用，DNS 查詢結果會被快取，
+    避免每次查詢玩家資訊都重新進行 TCP、TLS 交握與 DNS 查詢。
+
+    Attributes
+    ----------
+    limit : int
+        連線池的總連線上限
+    limit_per_host : int
+        對同一個主機的連線上限
+    dns_ttl : int
+        DNS 快取秒數
+    keepalive : float
+        閒置連線保留秒數
+    timeout : float
+        預設的請求總逾時秒數
+    retries : int
+        連線失敗、逾時或收到 429/5xx 時的重試次數
+    backoff : float
+        第一次重試前等待的秒數，之後每次加倍
+    """
+    def __init__(self, limit: int = 100, limit_per_host: int = 10, dns_ttl: int = 300,
+                 keepalive: float = 30, timeout: float = 10, retries: int = 2, backoff: float = 0.5):
+        global _current
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.dns_ttl = dns_ttl
+        self.keepalive = keepalive
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self._session = None
+        self._counters = {
+            "requests": 0,
+            "retries": 0,
+            "failures": 0,
+            "connections_created": 0,
+            "connections_reused": 0,
+            "dns_cache_hits": 0,
+            "dns_cache_misses": 0
+        }
+        _current = self
+
+    def _trace_config(self) -> aiohttp.TraceConfig:
+        """以 aiohttp 的追蹤事件統計連線重用與 DNS 快取命中"""
+        trace = aiohttp.TraceConfig()
+
+        def count(key):
+            async def _count(session, context, params):
+                self._counters[key] += 1
+            return _count
+
+        trace.on_connection_create_end.append(count("connections_created"))
+        trace.on_connection_reuseconn.append(count("connections_reused"))
+        trace.on_dns_cache_hit.append(count("dns_cache_hits"))
+        trace.on_dns_cache_miss.append(count("dns_cache_misses"))
+        return trace
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        """共用的 ClientSession，第一次使用時才在目前的事件迴圈中建立"""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit = self.limit,
+                limit_per_host = self.limit_per_host,
+                ttl_dns_cache = self.dns_ttl,
+                use_dns_cache = True,
+                keepalive_timeout = self.keepalive
+            )
+            self._session = aiohttp.ClientSession(
+                connector = connector,
+                timeout = aiohttp.ClientTimeout(total = self.timeout),
+                trace_configs = [self._trace_config()]
+            )
+        return self._session
+
+    async def request(self, method: str, url: str, read: str = "json", retries: int = None, **kwargs) -> dict:
+        """
+        發送請求並讀取回應內容，連線失敗、逾時或收到 429/5xx 時會重試
+
+        Parameters
+        ----------
+        method : str
+            HTTP 方法，例如 GET、POST
+        url : str
+            請求網址
+        read : str
+            讀取回應的方式：json、text 或 bytes
+        retries : int
+            重試次數，未提供時使用服務的預設值
+        **kwargs
+            直接傳給 aiohttp 的參數，例如 params、json、headers、timeout
+
+        Returns
+        -------
+        dict
+            {"status": 狀態碼, "headers": 回應標頭, "data": 回應內容}
+
+        Raises
+        ------
+        aiohttp.ClientResponseError
+            重試後仍收到 4xx/5xx 時
+        """
+        retries = self.retries if retries is None else retries
+        # 沒有指定時不傳入 timeout，讓工作階段預設的 ClientTimeout(total = self.timeout) 生效
+        if isinstance(kwargs.get("timeout"), (int, float)):
+            kwargs["timeout"] = aiohttp.ClientTimeout(total = kwargs["timeout"])
+        elif kwargs.get("timeout", ...) is None:
+            del kwargs["timeout"]
+        self._counters["requests"] += 1
+        for attempt in range(retries + 1):
+            delay = self.backoff * (2 ** attempt)
+            try:
+                async with self.session.request(method, url, **kwargs) as response:
+                    if response.status in RETRY_STATUS and attempt < retries:
+                        retry_after = response.headers.get("Retry-After", "")
+                        if retry_after.isdigit():
+                            delay = float(retry_after)
+                        logger.warning(f"{method} {url} 回應 {response.status}，{delay:.1f} 秒後重試")
+                    else:
+                        response.raise_for_status()
+                        if read == "json":
+                            data = await response.json(content_type = None)
+                        elif read == "text":
+                            data = await response.text()
+                        else:
+                            data = await response.read()
+                        return {"status": response.status, "headers": response.headers, "data": data}
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                if attempt >= retries:
+                    self._counters["failures"] += 1
+                    raise
+                logger.warning(f"{method} {url} 連線失敗（{type(e).__name__}），{delay:.1f} 秒後重試")
+            except aiohttp.ClientResponseError:
+                self._counters["failures"] += 1
+                raise
+            self._counters["retries"] += 1
+            await asyncio.sleep(delay)
+
+    async def get(self, url: str, **kwargs) -> dict:
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url: str, **kwargs) -> dict:
+        return await self.request("POST", url, **kwargs)
+
+    def stats(self) -> dict:
+        """
+        取得連線池統計
+
+        Returns
+        -------
+        dict
+            連線池設定、目前使用中與閒置的連線數，以及請求、重試、連線重用與 DNS 快取的累計次數
+        """
+        connector = self._session.connector if self._session is not None and not self._session.closed else None
+        in_use = len(getattr(connector, "_acquired", ())) if connector else 0
+        idle = sum(len(conns) for conns in getattr(connector, "_conns", {}).values()) if connector else 0
+        return {
+            "open": connector is not None,
+            "limit": self.limit,
+            "limit_per_host": self.limit_per_host,
+            "in_use": in_use,
+            "idle": idle,
+            **self._counters
+        }
+
+    async def close(self):
+        """關閉連線池，重複呼叫不會出錯"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+            logger.info("HTTP 連線池已關閉")
+        self._session = None
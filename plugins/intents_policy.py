@@ -0,0 +1,183 @@
+# Gateway Intents 計算模組
+
+import ast
+import logging
+import os
+
+import discord
+
+logger = logging.getLogger(__name__)
+
+# 主程式本身需要的 Intents：頻道與身分組快取，以及 sh! 前綴指令
+BASE_INTENTS = {
+    "guilds": "主程式（頻道與身分組快取）",
+    "guild_messages": "主程式（sh! 前綴指令）",
+    "dm_messages": "主程式（sh! 前綴指令）",
+    "message_content": "主程式（sh! 前綴指令）"
+}
+
+# 關閉各 Intent 後不會再收到的事件，僅用於啟動時的說明
+INTENT_EVENTS = {
+    "members": "on_member_join、on_member_remove、on_member_update 與成員分塊載入",
+    "moderation": "on_member_ban、on_member_unban、on_audit_log_entry_create",
+    "emojis_and_stickers": "on_guild_emojis_update、on_guild_stickers_update",
+    "integrations": "on_integration_create、on_integration_update",
+    "webhooks": "on_webhooks_update",
+    "invites": "on_invite_create、on_invite_delete",
+    "voice_states": "on_voice_state_update",
+    "presences": "on_presence_update（通常是流量最大的事件）",
+    "guild_messages": "伺服器內的 on_message、on_message_edit、on_message_delete",
+    "dm_messages": "私訊的 on_message、on_message_edit、on_message_delete",
+    "guild_reactions": "伺服器內的 on_reaction_add、on_raw_reaction_add 等反應事件",
+    "dm_reactions": "私訊的反應事件",
+    "guild_typing": "伺服器內的 on_typing",
+    "dm_typing": "私訊的 on_typing",
+    "message_content": "訊息內容、附件與嵌入內容",
+    "guild_scheduled_events": "on_scheduled_event_create 等活動事件",
+    "auto_moderation_configuration": "on_automod_rule_create 等自動管理規則事件",
+    "auto_moderation_execution": "on_automod_action"
+}
+
+def read_cog_intro(path: str) -> dict:
+    """以 AST 讀取齒輪的 COG_INTRO，不會執行齒輪本身"""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            tree = ast.parse(f.read(), filename=path)
+    except (OSError, SyntaxError) as e:
+        logger.warning(f"讀取 {path} 的 COG_INTRO 失敗：{e}")
+        return {}
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and any(
+            isinstance(target, ast.Name) and target.id == "COG_INTRO" for target in node.targets
+        ):
+            try:
+                return ast.literal_eval(node.value)
+            except ValueError:
+                logger.warning(f"{path} 的 COG_INTRO 不是常數，無法分析")
+                return {}
+    return {}
+
+class IntentPolicy:
+    """
+    依照已啟用的齒輪在 COG_INTRO 中宣告的需求，計算最小的 Gateway Intents 與成員快取策略。
+
+    齒輪以下列欄位宣告需求，條件可以是 True、cfg.yml 中以點分隔的設定路徑，
+    或設定路徑的清單（任一為真即成立）：
+
+    - enabled_by：齒輪是否啟用，與 setup() 檢查的設定相同，未宣告代表一律載入
+    - intents：{Intent 名稱: 條件}
+    - chunk_members：是否需要在啟動時載入完整的成員清單
+
+    啟用精簡成員索引（member_index）時，需要完整成員清單的齒輪改由索引提供，
+    discord.py 不會在啟動時載入成員，也不會快取加入事件中的成員。
+
+    Attributes
+    ----------
+    config : Mapping
+        設定服務
+    root : str
+        齒輪資料夾
+    reasons : dict
+        {Intent 名稱: [需要它的來源]}
+    chunk_reasons : list[str]
+        需要完整成員清單的齒輪
+    """
+    def __init__(self, config, root: str = "./Cogs"):
+        self.config = config
+        self.root = root
+        self.reasons: dict = {}
+        self.chunk_reasons: list = []
+        self.use_index = bool(self._lookup("member_index.enabled"))
+
+    def _lookup(self, path: str):
+        value = self.config
+        for key in path.split("."):
+            if not hasattr(value, "get"):
+                return None
+            value = value.get(key)
+        return value
+
+    def _check(self, condition) -> bool:
+        if isinstance(condition, bool):
+            return condition
+        if isinstance(condition, str):
+            return bool(self._lookup(condition))
+        if isinstance(condition, (list, tuple)):
+            return any(self._check(item) for item in condition)
+        return False
+
+    def _intros(self):
+        # 與 CogLoader.discover 相同的規則：跳過 nl 開頭的檔案
+        for root, _, files in os.walk(self.root):
+            for filename in files:
+                if filename.endswith(".py") and not filename.startswith("nl"):
+                    path = os.path.join(root, filename)
+                    module_name = os.path.relpath(path, "./").replace(os.sep, ".")[:-3]
+                    yield module_name, read_cog_intro(path)
+
+    def compute(self) -> discord.Intents:
+        """計算 Intents，並記錄每個 Intent 的來源"""
+        self.reasons = {name: [source] for name, source in BASE_INTENTS.items()}
+        self.chunk_reasons = []
+        for module_name, intro in self._intros():
+            enabled_by = intro.get("enabled_by")
+            if enabled_by is not None and not self._check(enabled_by):
+                continue
+            for name, condition in intro.get("intents", {}).items():
+                if self._check(condition):
+                    self.reasons.setdefault(name, []).append(module_name)
+            if self._check(intro.get("chunk_members", False)):
+                self.chunk_reasons.append(module_name)
+        if self.use_index:
+            self.reasons.setdefault("members", []).append("精簡成員索引")
+        intents = discord.Intents.none()
+        for name in self.reasons:
+            setattr(intents, name, True)
+        return intents
+
+    def bot_options(self) -> dict:
+        """
+        取得建立 commands.Bot 時要傳入的 Intents 與成員快取參數
+
+        Returns
+        -------
+        dict
+            {"intents", "member_cache_flags", "chunk_guilds_at_startup"}
+        """
+        intents = self.compute()
+        member_cache_flags = discord.MemberCacheFlags.from_intents(intents)
+        if self.use_index:
+            member_cache_flags.joined = False
+        return {
+            "intents": intents,
+            "member_cache_flags": member_cache_flags,
+            # 只有需要完整成員清單的齒輪啟用、且沒有成員索引時才在啟動時分塊載入成員
+            "chunk_guilds_at_startup": intents.members and bool(self.chunk_reasons) and not self.use_index
+        }
+
+    def describe(self, intents: discord.Intents) -> list:
+        """整理啟用與關閉的 Intents，回傳要輸出到日誌的文字"""
+        lines = []
+        for name, enabled in intents:
+            if enabled:
+                lines.append(f"啟用 {name}：{'、'.join(self.reasons.get(name, []))}")
+        disabled = [name for name, enabled in intents if not enabled and name in INTENT_EVENTS]
+        for name in disabled:
+            lines.append(f"關閉 {name}：不再接收 {INTENT_EVENTS[name]}")
+        lines.append(f"共啟用 {len(self.reasons)} 個 Intent，關閉 {len(disabled)} 個")
+        if not intents.members:
+            lines.append("成員快取：關閉（沒有已啟用的齒輪需要成員事件）")
+        elif self.use_index:
+            lines.append("成員快取：由精簡成員索引取代，discord.py 不快取成員")
+        elif self.chunk_reasons:
+            lines.append(f"成員快取：啟動時載入完整成員清單（{'、'.join(self.chunk_reasons)}）")
+        else:
+            lines.append("成員快取：只快取事件中出現的成員，啟動時不載入完整成員清單")
+        return lines
+
+    @staticmethod
+    def cache_usage(bot) -> str:
+        """比較已快取的成員數與伺服器實際成員數，於 on_ready 時輸出"""
+        cached = sum(len(guild.members) for guild in bot.guilds)
+        total = sum(guild.member_count or 0 for guild in bot.guilds)
+        return f"成員快取：已快取 {cached} 位成員，伺服器共有 {total} 位成員"
@@ -0,0 +1,260 @@
+# 非同步日誌輸出模組
+
+import atexit
+import copy
+import glob
+import gzip
+import json
+import logging
+import os
+import queue
+import shutil
+import time
+from datetime import datetime, timezone
+from logging.handlers import BaseRotatingHandler, QueueHandler, QueueListener
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FORMAT = '%(lineno)d: [%(asctime)s][%(levelname)s] - [%(module)s] %(message)s'
+
+class SamplingFilter(logging.Filter):
+    """
+    依模組抽樣高頻率的日誌：設定的模組（及其子模組）每 N 筆 WARNING 以下的日誌只保留第一筆，
+    WARNING 以上的日誌一律保留
+
+    Attributes
+    ----------
+    rates : dict
+        {模組名稱: N}
+    suppressed : dict
+        {模組名稱: 被略過的筆數}
+    """
+    def __init__(self, rates: dict = None):
+        super().__init__()
+        self.suppressed: dict = {}
+        self._counts: dict = {}
+        self.set_rates(rates or {})
+
+    def set_rates(self, rates: dict):
+        self.rates = {name: int(rate) for name, rate in rates.items() if int(rate) > 1}
+        # 日誌名稱 -> 套用的 N，避免每筆日誌都比對一次前綴
+        self._resolved: dict = {}
+
+    def _rate(self, name: str) -> int:
+        rate = self._resolved.get(name)
+        if rate is None:
+            rate = 1
+            matched = ""
+            for prefix, value in self.rates.items():
+                if (name == prefix or name.startswith(prefix + ".")) and len(prefix) > len(matched):
+                    matched, rate = prefix, value
+            self._resolved[name] = rate
+        return rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or not self.rates:
+            return True
+        rate = self._rate(record.name)
+        if rate == 1:
+            return True
+        count = self._counts.get(record.name, 0)
+        self._counts[record.name] = count + 1
+        if count % rate == 0:
+            return True
+        self.suppressed[record.name] = self.suppressed.get(record.name, 0) + 1
+        return False
+
+class JsonFormatter(logging.Formatter):
+    """每筆日誌輸出為一行 JSON"""
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "module": record.module,
+            "line": record.lineno,
+            "thread": record.threadName,
+            "message": record.getMessage()
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            data["exception"] = record.exc_text
+        if record.stack_info:
+            data["stack"] = record.stack_info
+        return json.dumps(data, ensure_ascii=False)
+
+class RotatingJsonFileHandler(BaseRotatingHandler):
+    """
+    依檔案大小或時間輪替的日誌檔，輪替後的檔案以時間命名並可壓縮為 gzip
+
+    Attributes
+    ----------
+    max_bytes : int
+        檔案超過此大小時輪替，0 代表不依大小輪替
+    interval : float
+        每隔多少秒輪替一次，0 代表不依時間輪替
+    backup_count : int
+        保留的舊檔數量，0 代表全部保留
+    compress : bool
+        是否將輪替後的檔案壓縮為 gzip
+    """
+    def __init__(self, filename: str, max_bytes: int = 0, interval: float = 0, backup_count: int = 0, compress: bool = True):
+        directory = os.path.dirname(os.path.abspath(filename))
+        os.makedirs(directory, exist_ok=True)
+        super().__init__(filename, "a", encoding="utf-8", delay=True)
+        self.max_bytes = max_bytes
+        self.interval = interval
+        self.backup_count = backup_count
+        self.compress = compress
+        start = os.path.getmtime(filename) if os.path.exists(filename) else time.time()
+        self.rollover_at = start + interval if interval else None
+
+    def shouldRollover(self, record: logging.LogRecord) -> bool:
+        if self.rollover_at is not None and record.created >= self.rollover_at:
+            return True
+        if self.max_bytes > 0:
+            if self.stream is None:
+                self.stream = self._open()
+            # 以字元數估計即將寫入的大小，與 RotatingFileHandler 相同
+            self.stream.seek(0, 2)
+            if self.stream.tell() + len(self.format(record)) + 1 >= self.max_bytes:
+                return True
+        return False
+
+    def _backup_name(self) -> str:
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        suffix = ".gz" if self.compress else ""
+        name = f"{self.baseFilename}.{stamp}{suffix}"
+        index = 1
+        while os.path.exists(name):
+            name = f"{self.baseFilename}.{stamp}-{index}{suffix}"
+            index += 1
+        return name
+
+    def rotate(self, source: str, dest: str):
+        if not os.path.exists(source):
+            return
+        if not self.compress:
+            os.replace(source, dest)
+            return
+        with open(source, "rb") as f_in, gzip.open(dest, "wb") as f_out:
+            shutil.copyfileobj(f_in, f_out)
+        os.remove(source)
+
+    def doRollover(self):
+        if self.stream is not None:
+            self.stream.close()
+            self.stream = None
+        self.rotate(self.baseFilename, self._backup_name())
+        if self.backup_count > 0:
+            backups = sorted(glob.glob(glob.escape(self.baseFilename) + ".*"), key=os.path.getmtime)
+            for old in backups[:-self.backup_count]:
+                try:
+                    os.remove(old)
+                except OSError:
+                    pass
+        if self.interval:
+            self.rollover_at = time.time() + self.interval
+        self.stream = self._open()
+
+class _QueueHandler(QueueHandler):
+    # QueueHandler 預設會把例外的堆疊併入訊息，這裡改為分開保存，JSON 輸出時才能放在獨立欄位
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+class LogPipeline:
+    """
+    整個機器人的日誌輸出：所有日誌只放進佇列，由背景執行緒寫到控制台與檔案，
+    事件迴圈不會因為控制台或磁碟 I/O 而阻塞
+
+    Attributes
+    ----------
+    sampler : SamplingFilter
+        依模組抽樣的篩選器，在放進佇列前執行
+    console : logging.Handler
+        控制台輸出
+    file : RotatingJsonFileHandler | None
+        JSON Lines 檔案輸出，未啟用時為 None
+    """
+    def __init__(self, level: int = logging.INFO, fmt: str = DEFAULT_FORMAT):
+        self.level = level
+        self.queue = queue.SimpleQueue()
+        self.sampler = SamplingFilter()
+        self.handler = _QueueHandler(self.queue)
+        self.handler.addFilter(self.sampler)
+        self.console = logging.StreamHandler()
+        self.console.setFormatter(logging.Formatter(fmt))
+        self.file = None
+        self._listener = None
+
+    def start(self):
+        """以佇列取代根記錄器原本的輸出，並啟動背景寫入執行緒"""
+        root = logging.getLogger()
+        root.setLevel(self.level)
+        for handler in root.handlers[:]:
+            root.removeHandler(handler)
+        root.addHandler(self.handler)
+        self._start_listener()
+        # 程式結束前把佇列中剩下的日誌寫完
+        atexit.register(self.stop)
+
+    def _start_listener(self):
+        handlers = [self.console] + ([self.file] if self.file is not None else [])
+        self._listener = QueueListener(self.queue, *handlers, respect_handler_level=True)
+        self._listener.start()
+
+    def configure(self, file: str = "", max_mb: float = 0, rotate_hours: float = 0, backup_count: int = 0,
+                  compress: bool = True, sampling: dict = None):
+        """
+        依 cfg.yml 的 logging 區塊設定檔案輸出與抽樣，可重複呼叫，設定檔熱重載時會再次套用
+
+        Parameters
+        ----------
+        file : str
+            JSON Lines 日誌檔路徑，留空則只輸出到控制台
+        max_mb : float
+            檔案超過此大小（MB）時輪替，0 代表不依大小輪替
+        rotate_hours : float
+            每隔多少小時輪替一次，0 代表不依時間輪替
+        backup_count : int
+            保留的舊檔數量，0 代表全部保留
+        compress : bool
+            是否將輪替後的檔案壓縮為 gzip
+        sampling : dict
+            {模組名稱: N}，該模組每 N 筆 WARNING 以下的日誌只保留一筆
+        """
+        self.sampler.set_rates(sampling or {})
+        if self._listener is not None:
+            self._listener.stop()
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+        if file:
+            self.file = RotatingJsonFileHandler(
+                file,
+                max_bytes=int(max_mb * 1024 * 1024),
+                interval=rotate_hours * 3600,
+                backup_count=backup_count,
+                compress=compress
+            )
+            self.file.setFormatter(JsonFormatter())
+        self._start_listener()
+        if self.file is not None:
+            logger.info(f"日誌同時寫入 {self.file.baseFilename}")
+        if self.sampler.rates:
+            logger.info(f"日誌抽樣：{self.sampler.rates}")
+
+    def stop(self):
+        """寫完佇列中的日誌並停止背景執行緒，可重複呼叫"""
+        if self._listener is not None:
+            self._listener.stop()
+            self._listener = None
+        if self.file is not None:
+            self.file.close()
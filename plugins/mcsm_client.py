@@ -1,17 +1,13 @@
 import base64
-import aiohttp
-import yaml
 from plugins.discordcore import IDNotFound, GetDiscordSRVDataFailed
+from plugins.config_service import get_config
+from plugins.http_service import get_http
+from plugins import metrics
 import logging
 import sqlite3
 
 logger = logging.getLogger(__name__)
 
-with open('cfg.yml', "r", encoding="utf-8") as file:
-    config = yaml.safe_load(file)["mcsm"]
-    daemon_id = config["daemon_id"]
-    server_id = config["server_id"]
-
 class mcsmClient:
     def __init__(self, pt_url: str, pt_key: str, db_path: str):
         """
@@ -26,10 +22,11 @@ class mcsmClient:
         db_path : str
             SQLite 資料庫的路徑。
         """
+        config = get_config()["mcsm"]
         self.pt_url = pt_url
         self.pt_key = pt_key
-        self.daemon_id = daemon_id
-        self.server_id = server_id
+        self.daemon_id = config["daemon_id"]
+        self.server_id = config["server_id"]
         self.db_path = db_path
     
     async def __getServerStat(self):
@@ -43,37 +40,35 @@ class mcsmClient:
         """
         TARGET_URL = f"{self.pt_url}/files"
         try:
-            async with aiohttp.ClientSession() as session:
-                # 指定參數
-                params = {
-                    "apikey": self.pt_key,
-                    "daemonId": self.daemon_id,
-                    "uuid": self.server_id
-                }
-
-                # 指定內容（Body）
-                data = {
-                    "target": "/plugins/DiscordSRV/accounts.aof"
-                }
-
-                # 發送請求
-                r = await session.post(TARGET_URL, params=params, json=data)
-                # 將回應轉為JSON
-                ct = await r.json()["data"]
-                if ct == "":
-                    raise GetDiscordSRVDataFailed("取得 DiscordSRV 資料失敗或目前無人綁定：資料為空")
-                # print(f"取得 DiscordSRV 資料成功，內容：\n{ct}")
-                ct = ct.split("\n")
-                # 格式：980016361906524181 ecfedf45-e28a-4533-9d62-597fd8abbff5
-                # 這裡的字典格式為 {Discord ID: Minecraft UUID}
-                d = {}
-                for i in ct:
-                    if i == "":
-                        continue
-                    i = i.split(" ")
-                    ins = {i[0]: i[1]}
-                    d.update(ins)
-                return d
+            # 指定參數
+            params = {
+                "apikey": self.pt_key,
+                "daemonId": self.daemon_id,
+                "uuid": self.server_id
+            }
+
+            # 指定內容（Body）
+            data = {
+                "target": "/plugins/DiscordSRV/accounts.aof"
+            }
+
+            # 發送請求並將回應轉為JSON
+            r = await get_http().post(TARGET_URL, params=params, json=data)
+            ct = r["data"]["data"]
+            if ct == "":
+                raise GetDiscordSRVDataFailed("取得 DiscordSRV 資料失敗或目前無人綁定：資料為空")
+            # print(f"取得 DiscordSRV 資料成功，內容：\n{ct}")
+            ct = ct.split("\n")
+            # 格式：980016361906524181 ecfedf45-e28a-4533-9d62-597fd8abbff5
+            # 這裡的字典格式為 {Discord ID: Minecraft UUID}
+            d = {}
+            for i in ct:
+                if i == "":
+                    continue
+                i = i.split(" ")
+                ins = {i[0]: i[1]}
+                d.update(ins)
+            return d
         except Exception as e:
             logger.error(f"取得 DiscordSRV 資料失敗：{e}")
             raise GetDiscordSRVDataFailed(f"取得 DiscordSRV 資料失敗：{e}")
@@ -86,30 +81,31 @@ class mcsmClient:
         cursor = conn.cursor()
 
         # 調用getServerStat並將字典記錄到map變數中
-        map = self.__getServerStat()
+        map = await self.__getServerStat()
 
-        # 取得資料庫中現有的資料
-        cursor.execute("SELECT dc_id, mc_uuid FROM player_discord_mapping")
-        existing_data = cursor.fetchall()
+        with metrics.SQLITE_SECONDS.time(store="playermapping", query="sync"):
+            # 取得資料庫中現有的資料
+            cursor.execute("SELECT dc_id, mc_uuid FROM player_discord_mapping")
+            existing_data = cursor.fetchall()
 
-        # 將資料庫中的資料轉換成字典以便處理
-        db_map = {mc_uuid: dc_id for dc_id, mc_uuid in existing_data}
+            # 將資料庫中的資料轉換成字典以便處理
+            db_map = {mc_uuid: dc_id for dc_id, mc_uuid in existing_data}
 
-        # 刪除資料庫中 map 中沒有的紀錄
-        for mc_uuid in db_map:
-            if mc_uuid not in map.values():
-                cursor.execute("DELETE FROM player_discord_mapping WHERE mc_uuid = ?", (mc_uuid,))
+            # 刪除資料庫中 map 中沒有的紀錄
+            for mc_uuid in db_map:
+                if mc_uuid not in map.values():
+                    cursor.execute("DELETE FROM player_discord_mapping WHERE mc_uuid = ?", (mc_uuid,))
 
-        # 新增 map 中有但資料庫中沒有的紀錄，或是更新不一致的紀錄
-        for dc_id, mc_uuid in map.items():
-            if mc_uuid not in db_map:
-                cursor.execute("INSERT INTO player_discord_mapping (dc_id, mc_uuid) VALUES (?, ?)", (dc_id, mc_uuid))
-            elif db_map[mc_uuid] != dc_id:
-                cursor.execute("UPDATE player_discord_mapping SET dc_id = ? WHERE mc_uuid = ?", (dc_id, mc_uuid))
+            # 新增 map 中有但資料庫中沒有的紀錄，或是更新不一致的紀錄
+            for dc_id, mc_uuid in map.items():
+                if mc_uuid not in db_map:
+                    cursor.execute("INSERT INTO player_discord_mapping (dc_id, mc_uuid) VALUES (?, ?)", (dc_id, mc_uuid))
+                elif db_map[mc_uuid] != dc_id:
+                    cursor.execute("UPDATE player_discord_mapping SET dc_id = ? WHERE mc_uuid = ?", (dc_id, mc_uuid))
 
-        # 提交變更並關閉資料庫連接
-        conn.commit()
-        conn.close()
+            # 提交變更並關閉資料庫連接
+            conn.commit()
+            conn.close()
 
     def getDiscordID(self, mc_uuid: str):
         """調用 syncDcsrv 函數進行同步
@@ -119,21 +115,23 @@ class mcsmClient:
         mc_uuid: str
             要查詢的 Minecraft UUID
         """
-        conn = sqlite3.connect('databases/playermapping.db')
-        cursor = conn.cursor()
-        cursor.execute("SELECT dc_id FROM player_discord_mapping WHERE mc_uuid = ?", (mc_uuid,))
-        dc_id = cursor.fetchone()
-        conn.close()
+        with metrics.SQLITE_SECONDS.time(store="playermapping", query="get_discord_id"):
+            conn = sqlite3.connect('databases/playermapping.db')
+            cursor = conn.cursor()
+            cursor.execute("SELECT dc_id FROM player_discord_mapping WHERE mc_uuid = ?", (mc_uuid,))
+            dc_id = cursor.fetchone()
+            conn.close()
         if dc_id == None:
             return dc_id
         return dc_id[0]
     
     def getMinecraftUUID(self, dc_id: str):
-        conn = sqlite3.connect('databases/playermapping.db')
-        cursor = conn.cursor()
-        cursor.execute("SELECT mc_uuid FROM player_discord_mapping WHERE dc_id = ?", (dc_id,))
-        mc_uuid = cursor.fetchone()
-        conn.close()
+        with metrics.SQLITE_SECONDS.time(store="playermapping", query="get_minecraft_uuid"):
+            conn = sqlite3.connect('databases/playermapping.db')
+            cursor = conn.cursor()
+            cursor.execute("SELECT mc_uuid FROM player_discord_mapping WHERE dc_id = ?", (dc_id,))
+            mc_uuid = cursor.fetchone()
+            conn.close()
         if mc_uuid == None:
             return mc_uuid
         return mc_uuid[0]
@@ -169,11 +167,12 @@ class mcsmClient:
             return d
         
     def excuteDbCmd(self, cmd: str):
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        r = cursor.execute(cmd)
-        conn.commit()
-        conn.close()
+        with metrics.SQLITE_SECONDS.time(store="playermapping", query="execute"):
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+            r = cursor.execute(cmd)
+            conn.commit()
+            conn.close()
         return r.fetchall()
 
 class playerInfo:
@@ -192,14 +191,13 @@ class playerInfo:
         self.isometricAvatarUrl = None
     
     async def __getInfo(self):
-        async with aiohttp.ClientSession() as session:
-            base_url = "https://sessionserver.mojang.com/session/minecraft/profile/"
-            if self.playerTimeStamps != None:
-                args = f"?at={self.playerTimeStamps}"
-            else:
-                args = ""
-            async with session.get(f"{base_url}{self.playerUUID}{args}") as response:
-                return await response.json()
+        base_url = "https://sessionserver.mojang.com/session/minecraft/profile/"
+        if self.playerTimeStamps != None:
+            args = f"?at={self.playerTimeStamps}"
+        else:
+            args = ""
+        response = await get_http().get(f"{base_url}{self.playerUUID}{args}")
+        return response["data"]
             
     def __getPlayerProperties(self, basedText: str):
         # 將 base64 解碼
@@ -0,0 +1,298 @@
+# 精簡成員索引模組
+
+import logging
+import sys
+from datetime import datetime
+
+import discord
+
+logger = logging.getLogger(__name__)
+
+# 索引會攔截的 Gateway 事件
+INDEXED_EVENTS = (
+    "GUILD_CREATE", "GUILD_DELETE", "GUILD_MEMBER_ADD", "GUILD_MEMBER_UPDATE",
+    "GUILD_MEMBER_REMOVE", "GUILD_MEMBERS_CHUNK", "PRESENCE_UPDATE"
+)
+
+def _parse_status(value) -> discord.Status:
+    try:
+        return discord.Status(value)
+    except ValueError:
+        return discord.Status.offline
+
+def _parse_time(value) -> float:
+    if not value:
+        return 0.0
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        return 0.0
+
+class MemberRecord:
+    """
+    單一成員的精簡紀錄，只保留計數與查詢需要的欄位
+
+    Attributes
+    ----------
+    id : int
+        成員 ID
+    name : str
+        使用者名稱
+    global_name : str | None
+        顯示名稱
+    nick : str | None
+        伺服器暱稱
+    bot : bool
+        是否為機器人
+    status : discord.Status
+        線上狀態，沒有收到狀態時為 offline
+    roles : int
+        身分組位元集合，每個身分組對應 GuildIndex.role_bits 中的一個位元
+    joined_at : float
+        加入伺服器的時間戳記
+    """
+    __slots__ = ("id", "name", "global_name", "nick", "bot", "status", "roles", "joined_at")
+
+    def __init__(self, member_id: int):
+        self.id = member_id
+        self.name = ""
+        self.global_name = None
+        self.nick = None
+        self.bot = False
+        self.status = discord.Status.offline
+        self.roles = 0
+        self.joined_at = 0.0
+
+    def names(self) -> tuple:
+        return tuple(name for name in (self.name, self.global_name, self.nick) if name)
+
+class GuildIndex:
+    """單一伺服器的成員索引：以 ID 與名稱各一個字典達成 O(1) 查詢"""
+    __slots__ = ("members", "by_name", "role_bits")
+
+    def __init__(self):
+        self.members: dict = {}
+        self.by_name: dict = {}
+        self.role_bits: dict = {}
+
+    def _bit(self, role_id: int) -> int:
+        bit = self.role_bits.get(role_id)
+        if bit is None:
+            bit = self.role_bits[role_id] = 1 << len(self.role_bits)
+        return bit
+
+    def upsert(self, data: dict) -> MemberRecord:
+        """以成員資料（GUILD_MEMBER_ADD、GUILD_MEMBER_UPDATE、成員分塊）新增或更新紀錄"""
+        user = data["user"]
+        member_id = int(user["id"])
+        record = self.members.get(member_id)
+        if record is None:
+            record = self.members[member_id] = MemberRecord(member_id)
+        else:
+            self._unindex_names(record)
+        record.name = user.get("username", record.name)
+        record.global_name = user.get("global_name", record.global_name)
+        record.nick = data.get("nick", record.nick)
+        record.bot = user.get("bot", record.bot)
+        if "roles" in data:
+            roles = 0
+            for role_id in data["roles"]:
+                roles |= self._bit(int(role_id))
+            record.roles = roles
+        if "joined_at" in data:
+            record.joined_at = _parse_time(data["joined_at"])
+        for name in record.names():
+            self.by_name[name] = member_id
+        return record
+
+    def _unindex_names(self, record: MemberRecord):
+        for name in record.names():
+            if self.by_name.get(name) == record.id:
+                del self.by_name[name]
+
+    def remove(self, member_id: int):
+        record = self.members.pop(member_id, None)
+        if record is not None:
+            self._unindex_names(record)
+
+    def presence(self, data: dict):
+        record = self.members.get(int(data["user"]["id"]))
+        if record is not None:
+            record.status = _parse_status(data.get("status"))
+
+class MemberIndex:
+    """
+    由 Gateway 事件建立的精簡成員索引，讓計數與查詢不必依賴 discord.py 的完整成員快取。
+
+    索引在 discord.py 解析事件之前讀取原始資料，因此即使成員沒有被 discord.py 快取，
+    加入、離開、更新與狀態變更仍會被記錄。
+
+    Attributes
+    ----------
+    guilds : dict
+        {伺服器 ID: GuildIndex}
+    request_chunks : bool
+        是否由索引自行向 Gateway 要求成員清單（discord.py 沒有在啟動時分塊載入成員時使用）
+    """
+    def __init__(self, request_chunks: bool = True):
+        self.guilds: dict = {}
+        self.request_chunks = request_chunks
+        self.bot = None
+
+    def guild(self, guild_id: int) -> GuildIndex:
+        index = self.guilds.get(guild_id)
+        if index is None:
+            index = self.guilds[guild_id] = GuildIndex()
+        return index
+
+    # Gateway 事件
+    def _on_guild_create(self, data: dict):
+        if data.get("unavailable"):
+            return
+        index = self.guild(int(data["id"]))
+        for member in data.get("members", []):
+            index.upsert(member)
+        for presence in data.get("presences", []):
+            index.presence(presence)
+
+    def _on_guild_delete(self, data: dict):
+        if not data.get("unavailable"):
+            self.guilds.pop(int(data["id"]), None)
+
+    def _on_member(self, data: dict):
+        self.guild(int(data["guild_id"])).upsert(data)
+
+    def _on_member_remove(self, data: dict):
+        self.guild(int(data["guild_id"])).remove(int(data["user"]["id"]))
+
+    def _on_members_chunk(self, data: dict):
+        index = self.guild(int(data["guild_id"]))
+        for member in data.get("members", []):
+            index.upsert(member)
+        for presence in data.get("presences", []):
+            index.presence(presence)
+
+    def _on_presence_update(self, data: dict):
+        guild_id = data.get("guild_id")
+        if guild_id is not None:
+            self.guild(int(guild_id)).presence(data)
+
+    def attach(self, bot):
+        """
+        掛上 Gateway 事件，並在伺服器可用時視需要要求完整成員清單
+
+        Parameters
+        ----------
+        bot : commands.Bot
+            機器人實例
+        """
+        self.bot = bot
+        handlers = {
+            "GUILD_CREATE": self._on_guild_create,
+            "GUILD_DELETE": self._on_guild_delete,
+            "GUILD_MEMBER_ADD": self._on_member,
+            "GUILD_MEMBER_UPDATE": self._on_member,
+            "GUILD_MEMBER_REMOVE": self._on_member_remove,
+            "GUILD_MEMBERS_CHUNK": self._on_members_chunk,
+            "PRESENCE_UPDATE": self._on_presence_update
+        }
+        # discord.py 以 ConnectionState.parsers 解析事件，在原本的解析函式前先更新索引
+        parsers = bot._connection.parsers
+        for event in INDEXED_EVENTS:
+            parsers[event] = self._wrap(handlers[event], parsers[event])
+        bot.add_listener(self._on_guild_available, "on_guild_available")
+        bot.add_listener(self._on_guild_available, "on_guild_join")
+
+    @staticmethod
+    def _wrap(handler, original):
+        def parser(data):
+            try:
+                handler(data)
+            except Exception as e:
+                logger.error(f"更新成員索引失敗：{e}")
+            original(data)
+        return parser
+
+    async def _on_guild_available(self, guild: discord.Guild):
+        if not self.request_chunks or not self.bot.intents.members:
+            return
+        if len(self.guild(guild.id).members) >= (guild.member_count or 0):
+            return
+        logger.info(f"向 Gateway 要求 {guild.name} 的成員清單以建立成員索引")
+        # 使用不對應任何 discord.py 請求的 nonce，成員只會進入索引而不會被 discord.py 快取
+        await self.bot.ws.request_chunks(
+            guild.id, query = "", limit = 0, presences = self.bot.intents.presences, nonce = "member_index"
+        )
+
+    # 查詢
+    def get(self, guild_id: int, member_id: int) -> MemberRecord:
+        return self.guild(guild_id).members.get(member_id)
+
+    def get_named(self, guild_id: int, name: str) -> MemberRecord:
+        """以使用者名稱、顯示名稱或暱稱查詢成員"""
+        index = self.guild(guild_id)
+        member_id = index.by_name.get(name)
+        return index.members.get(member_id) if member_id is not None else None
+
+    def count(self, guild_id: int) -> int:
+        return len(self.guild(guild_id).members)
+
+    def count_status(self, guild_id: int, status: discord.Status) -> int:
+        return sum(1 for record in self.guild(guild_id).members.values() if record.status is status)
+
+    def count_bots(self, guild_id: int, bot: bool = True) -> int:
+        return sum(1 for record in self.guild(guild_id).members.values() if record.bot is bot)
+
+    def count_no_role(self, guild_id: int) -> int:
+        return sum(1 for record in self.guild(guild_id).members.values() if not record.roles)
+
+    def with_role(self, guild_id: int, role_id: int) -> list:
+        """取得擁有指定身分組的成員 ID"""
+        index = self.guild(guild_id)
+        bit = index.role_bits.get(role_id)
+        if bit is None:
+            return []
+        return [record.id for record in index.members.values() if record.roles & bit]
+
+    def count_role(self, guild_id: int, role_id: int) -> int:
+        return len(self.with_role(guild_id, role_id))
+
+    @staticmethod
+    async def resolve(guild: discord.Guild, member_id: int) -> discord.Member:
+        """取得完整的 Member 物件：先查 discord.py 快取，沒有時才呼叫 API"""
+        return guild.get_member(member_id) or await guild.fetch_member(member_id)
+
+    # 記憶體
+    def footprint(self) -> dict:
+        """
+        估計索引佔用的記憶體
+
+        Returns
+        -------
+        dict
+            {"members": 紀錄數, "bytes": 估計位元組數}
+        """
+        size = sys.getsizeof(self.guilds)
+        members = 0
+        for index in self.guilds.values():
+            members += len(index.members)
+            size += sys.getsizeof(index.members) + sys.getsizeof(index.by_name) + sys.getsizeof(index.role_bits)
+            for record in index.members.values():
+                size += sys.getsizeof(record) + sys.getsizeof(record.roles)
+                size += sum(sys.getsizeof(name) for name in record.names())
+        return {"members": members, "bytes": size}
+
+    @staticmethod
+    def discord_footprint(bot) -> dict:
+        """估計 discord.py 成員快取佔用的記憶體，用於與索引比較"""
+        size = 0
+        members = 0
+        for guild in bot.guilds:
+            size += sys.getsizeof(guild._members)
+            for member in guild.members:
+                members += 1
+                user = member._user
+                size += sys.getsizeof(member) + sys.getsizeof(member._roles) + sys.getsizeof(member.activities)
+                size += sys.getsizeof(user) + sys.getsizeof(user.name) + sys.getsizeof(user.global_name)
+                size += sys.getsizeof(member.nick) + sys.getsizeof(member._client_status)
+        return {"members": members, "bytes": size}
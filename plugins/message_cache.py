@@ -0,0 +1,283 @@
+# 訊息內容快取模組
+
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import sys
+from collections import OrderedDict
+
+import discord
+
+from plugins import metrics
+
+logger = logging.getLogger(__name__)
+
+class MessageRecord:
+    """
+    單則訊息的精簡紀錄，只保留刪除與編輯紀錄需要的欄位
+
+    Attributes
+    ----------
+    id : int
+        訊息 ID
+    channel_id : int
+        頻道 ID
+    guild_id : int | None
+        伺服器 ID
+    author_id : int
+        發送者 ID
+    author_bot : bool
+        發送者是否為機器人
+    content : str
+        訊息內容
+    attachments : tuple
+        附件網址
+    """
+    __slots__ = ("id", "channel_id", "guild_id", "author_id", "author_bot", "content", "attachments")
+
+    def __init__(self, id: int, channel_id: int, guild_id: int, author_id: int, author_bot: bool, content: str,
+                 attachments: tuple = ()):
+        self.id = id
+        self.channel_id = channel_id
+        self.guild_id = guild_id
+        self.author_id = author_id
+        self.author_bot = author_bot
+        self.content = content
+        self.attachments = attachments
+
+    @classmethod
+    def from_message(cls, message: discord.Message) -> "MessageRecord":
+        return cls(
+            message.id,
+            message.channel.id,
+            message.guild.id if message.guild else None,
+            message.author.id,
+            message.author.bot,
+            message.content,
+            tuple(attachment.url for attachment in message.attachments)
+        )
+
+    @property
+    def created_at(self):
+        return discord.utils.snowflake_time(self.id)
+
+    def size(self) -> int:
+        """估計佔用的記憶體（位元組），包含快取中字典項目的額外空間"""
+        return (
+            _RECORD_OVERHEAD + sys.getsizeof(self.content)
+            + sys.getsizeof(self.attachments) + sum(sys.getsizeof(url) for url in self.attachments)
+        )
+
+    def dump(self) -> str:
+        return json.dumps([self.id, self.channel_id, self.guild_id, self.author_id, self.author_bot, self.content, self.attachments])
+
+    @classmethod
+    def load(cls, data: str) -> "MessageRecord":
+        values = json.loads(data)
+        values[6] = tuple(values[6])
+        return cls(*values)
+
+# 紀錄本身（不含內容）加上 OrderedDict 項目與 ID 整數的大約大小
+_RECORD_OVERHEAD = sys.getsizeof(MessageRecord(0, 0, 0, 0, False, "")) + 100 + 3 * sys.getsizeof(2 ** 62)
+
+class MessageCache:
+    """
+    依頻道保存最近訊息內容的 LRU 快取，以估計的位元組數而不是訊息數限制大小，
+    讓機器人重新啟動後或忙碌頻道中的訊息被刪除或編輯時，仍能記錄原本的內容，
+    不需要調高 discord.py 全域的 max_messages。
+
+    超過 max_bytes 時從最久沒有新訊息的頻道開始移除最舊的訊息；單一頻道超過 channel_max_bytes 時
+    只移除該頻道的舊訊息，避免一個忙碌的頻道把其他頻道的訊息擠出快取。
+    設定 spill_path 時，被移除的訊息會寫入 SQLite 檔案，查詢時記憶體中找不到再從檔案讀取。
+
+    Attributes
+    ----------
+    max_bytes : int
+        記憶體上限
+    channel_max_bytes : int
+        單一頻道的記憶體上限，0 代表不限制
+    spill_path : str
+        溢出檔案路徑，留空代表不寫入磁碟
+    spill_max_messages : int
+        溢出檔案最多保留的訊息數
+    """
+    def __init__(self, max_bytes: int, channel_max_bytes: int = 0, spill_path: str = "", spill_max_messages: int = 100000):
+        self.max_bytes = max_bytes
+        self.channel_max_bytes = channel_max_bytes
+        self.spill_path = spill_path
+        self.spill_max_messages = spill_max_messages
+        # 頻道 ID -> OrderedDict(訊息 ID -> MessageRecord)，頻道依最後收到訊息的時間排序
+        self._channels: OrderedDict = OrderedDict()
+        self._channel_bytes: dict = {}
+        self.bytes = 0
+        # 等待寫入溢出檔案的訊息
+        self._spilled: dict = {}
+        self._conn = None
+        self._lock = asyncio.Lock()
+        self._task = None
+
+    def __len__(self) -> int:
+        return sum(len(messages) for messages in self._channels.values())
+
+    # 溢出檔案
+    def _open(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.spill_path)), exist_ok=True)
+        self._conn = sqlite3.connect(self.spill_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS messages (id INTEGER PRIMARY KEY, channel_id INTEGER NOT NULL, data TEXT NOT NULL)")
+        self._conn.commit()
+
+    async def start(self, flush_interval: float = 5):
+        if not self.spill_path:
+            return
+        await asyncio.to_thread(self._open)
+        self._task = asyncio.create_task(self._flush_loop(flush_interval), name="message-cache:spill")
+        logger.info(f"訊息快取的溢出檔案 {self.spill_path} 已開啟")
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._conn is not None:
+            await self.flush()
+            async with self._lock:
+                await asyncio.to_thread(self._conn.close)
+            self._conn = None
+
+    def _write(self, records: list):
+        with metrics.SQLITE_SECONDS.time(store="message_cache", query="spill"):
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO messages (id, channel_id, data) VALUES (?, ?, ?)",
+                    [(record.id, record.channel_id, record.dump()) for record in records]
+                )
+                # 訊息 ID 依時間遞增，保留最新的 spill_max_messages 則
+                self._conn.execute(
+                    "DELETE FROM messages WHERE id <= (SELECT id FROM messages ORDER BY id DESC LIMIT 1 OFFSET ?)",
+                    (self.spill_max_messages,)
+                )
+
+    async def flush(self):
+        if not self._spilled or self._conn is None:
+            return
+        records = list(self._spilled.values())
+        async with self._lock:
+            try:
+                await asyncio.to_thread(self._write, records)
+            except sqlite3.Error as e:
+                logger.error(f"寫入 {len(records)} 則訊息到溢出檔案失敗：{e}")
+        # 寫入期間可能有訊息被取回，只移除已經寫入的
+        for record in records:
+            if self._spilled.get(record.id) is record:
+                del self._spilled[record.id]
+
+    async def _flush_loop(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            await self.flush()
+
+    def _read(self, ids: list, remove: bool) -> list:
+        placeholders = ", ".join("?" * len(ids))
+        with metrics.SQLITE_SECONDS.time(store="message_cache", query="read"):
+            rows = self._conn.execute(f"SELECT data FROM messages WHERE id IN ({placeholders})", ids).fetchall()
+            if remove and rows:
+                with self._conn:
+                    self._conn.execute(f"DELETE FROM messages WHERE id IN ({placeholders})", ids)
+        return [MessageRecord.load(data) for data, in rows]
+
+    # 快取
+    def _evict(self, channel_id: int = None):
+        # channel_id 有值時只移除該頻道的舊訊息，否則從最久沒有新訊息的頻道開始移除
+        while self._channels:
+            if channel_id is not None:
+                if self._channel_bytes.get(channel_id, 0) <= self.channel_max_bytes:
+                    return
+                key = channel_id
+            else:
+                if self.bytes <= self.max_bytes:
+                    return
+                key = next(iter(self._channels))
+            messages = self._channels[key]
+            _, record = messages.popitem(last=False)
+            self._account(key, -record.size())
+            if not messages:
+                del self._channels[key]
+                del self._channel_bytes[key]
+            if self._conn is not None:
+                self._spilled[record.id] = record
+
+    def _account(self, channel_id: int, size: int):
+        self.bytes += size
+        self._channel_bytes[channel_id] = self._channel_bytes.get(channel_id, 0) + size
+
+    def put(self, record: MessageRecord):
+        """加入或更新一則訊息"""
+        messages = self._channels.get(record.channel_id)
+        if messages is None:
+            messages = self._channels[record.channel_id] = OrderedDict()
+        else:
+            self._channels.move_to_end(record.channel_id)
+            old = messages.pop(record.id, None)
+            if old is not None:
+                self._account(record.channel_id, -old.size())
+        messages[record.id] = record
+        self._account(record.channel_id, record.size())
+        if self.channel_max_bytes:
+            self._evict(record.channel_id)
+        self._evict()
+
+    def _take(self, channel_id: int, message_id: int, remove: bool):
+        messages = self._channels.get(channel_id)
+        if messages is not None and message_id in messages:
+            if not remove:
+                return messages[message_id]
+            record = messages.pop(message_id)
+            self._account(channel_id, -record.size())
+            if not messages:
+                del self._channels[channel_id]
+                del self._channel_bytes[channel_id]
+            return record
+        if remove:
+            return self._spilled.pop(message_id, None)
+        return self._spilled.get(message_id)
+
+    async def get_many(self, channel_id: int, message_ids, remove: bool = False) -> dict:
+        """
+        取得多則訊息
+
+        Parameters
+        ----------
+        remove : bool
+            是否同時從快取移除（訊息被刪除時）
+
+        Returns
+        -------
+        dict
+            {訊息 ID: MessageRecord}，找不到的訊息不會出現
+        """
+        found = {}
+        missing = []
+        for message_id in message_ids:
+            record = self._take(channel_id, message_id, remove)
+            if record is not None:
+                found[message_id] = record
+            else:
+                missing.append(message_id)
+        if missing and self._conn is not None:
+            async with self._lock:
+                # SQLite 單一查詢的參數數量有上限，分批查詢
+                for i in range(0, len(missing), 500):
+                    for record in await asyncio.to_thread(self._read, missing[i:i + 500], remove):
+                        found[record.id] = record
+        return found
+
+    async def get(self, channel_id: int, message_id: int, remove: bool = False):
+        """取得一則訊息，找不到時回傳 None"""
+        return (await self.get_many(channel_id, (message_id,), remove)).get(message_id)
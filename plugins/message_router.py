@@ -0,0 +1,205 @@
+# 訊息事件分派模組
+
+import asyncio
+import logging
+import time
+
+import discord
+
+from plugins import metrics
+
+logger = logging.getLogger(__name__)
+
+class Route:
+    """
+    單一訂閱者的篩選條件，所有條件在訂閱時就轉為 frozenset，分派時只做集合運算
+
+    Attributes
+    ----------
+    name : str
+        訂閱者名稱，用於統計與取消訂閱
+    handler : Callable[[discord.Message], Awaitable]
+        符合條件時呼叫的協程函式
+    channels : frozenset[int] | None
+        只處理這些頻道的訊息，None 代表所有頻道
+    ignore_channels : frozenset[int]
+        不處理這些頻道的訊息
+    ignore_users : frozenset[int]
+        不處理這些使用者的訊息
+    ignore_roles : frozenset[int]
+        不處理擁有這些身分組的成員的訊息
+    include_bots : bool
+        是否處理其他機器人的訊息
+    include_self : bool
+        是否處理本機器人自己的訊息
+    prefix : str | None
+        只處理以此開頭的訊息
+    """
+    __slots__ = ("name", "handler", "channels", "ignore_channels", "ignore_users", "ignore_roles",
+                 "include_bots", "include_self", "prefix", "calls", "errors", "total", "max")
+
+    def __init__(self, name, handler, channels = None, ignore_channels = (), ignore_users = (), ignore_roles = (),
+                 include_bots = True, include_self = False, prefix = None):
+        self.name = name
+        self.handler = handler
+        self.channels = frozenset(channels) if channels is not None else None
+        self.ignore_channels = frozenset(ignore_channels)
+        self.ignore_users = frozenset(ignore_users)
+        self.ignore_roles = frozenset(ignore_roles)
+        self.include_bots = include_bots
+        self.include_self = include_self
+        self.prefix = prefix
+        self.calls = 0
+        self.errors = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def matches(self, info: dict) -> bool:
+        """以分類結果判斷訊息是否要交給此訂閱者（頻道白名單已由路由表處理）"""
+        if info["is_self"]:
+            if not self.include_self:
+                return False
+        elif info["is_bot"] and not self.include_bots:
+            return False
+        if info["channel_id"] in self.ignore_channels or info["author_id"] in self.ignore_users:
+            return False
+        if self.ignore_roles and not self.ignore_roles.isdisjoint(info["role_ids"]):
+            return False
+        if self.prefix is not None and not info["content"].startswith(self.prefix):
+            return False
+        return True
+
+class MessageRouter:
+    """
+    整個機器人唯一的 on_message 分派點。
+
+    每則訊息只分類一次（發送者類型、頻道、身分組），再依照預先建立的路由表
+    交給頻道、身分組與使用者條件都符合的訂閱者，並記錄每個訂閱者的耗時。
+
+    Attributes
+    ----------
+    bot : commands.Bot
+        機器人實例
+    messages : int
+        已分派的訊息數
+    unrouted : int
+        沒有任何訂閱者符合的訊息數
+    """
+    def __init__(self, bot):
+        self.bot = bot
+        self.messages = 0
+        self.unrouted = 0
+        self._routes: dict = {}
+        # 路由表：指定頻道的訂閱者依頻道 ID 分組，不限頻道的訂閱者另外存放
+        self._by_channel: dict = {}
+        self._any_channel: tuple = ()
+
+    def _rebuild(self):
+        by_channel = {}
+        any_channel = []
+        for route in self._routes.values():
+            if route.channels is None:
+                any_channel.append(route)
+                continue
+            for channel_id in route.channels:
+                by_channel.setdefault(channel_id, []).append(route)
+        self._by_channel = {channel_id: tuple(routes) for channel_id, routes in by_channel.items()}
+        self._any_channel = tuple(any_channel)
+
+    def subscribe(self, name: str, handler, **filters) -> Route:
+        """
+        註冊訂閱者，同名的訂閱者會被取代（齒輪重新載入時不會重複註冊）
+
+        Parameters
+        ----------
+        name : str
+            訂閱者名稱
+        handler : Callable[[discord.Message], Awaitable]
+            處理訊息的協程函式
+        **filters
+            篩選條件，參見 Route
+
+        Returns
+        -------
+        Route
+            建立的路由
+        """
+        route = Route(name, handler, **filters)
+        self._routes[name] = route
+        self._rebuild()
+        logger.debug(f"訊息訂閱者 {name} 已註冊")
+        return route
+
+    def unsubscribe(self, name: str):
+        if self._routes.pop(name, None) is not None:
+            self._rebuild()
+            logger.debug(f"訊息訂閱者 {name} 已取消註冊")
+
+    def classify(self, message: discord.Message) -> dict:
+        """將訊息分類一次，供所有訂閱者共用"""
+        author = message.author
+        return {
+            "author_id": author.id,
+            "is_bot": author.bot,
+            "is_self": self.bot.user is not None and author.id == self.bot.user.id,
+            "channel_id": message.channel.id,
+            # 私訊的發送者是 discord.User，沒有身分組
+            "role_ids": frozenset(role.id for role in getattr(author, "roles", ())),
+            "content": message.content
+        }
+
+    def routes_for(self, info: dict) -> list:
+        """依照分類結果找出要處理此訊息的訂閱者"""
+        candidates = self._any_channel + self._by_channel.get(info["channel_id"], ())
+        return [route for route in candidates if route.matches(info)]
+
+    async def _run(self, route: Route, message: discord.Message):
+        start = time.perf_counter()
+        perf = getattr(self.bot, "perf", None)
+        try:
+            if perf is not None:
+                await perf.run(f"{route.name}.on_message", route.handler(message))
+            else:
+                await route.handler(message)
+        except Exception as e:
+            route.errors += 1
+            logger.error(f"訊息訂閱者 {route.name} 處理訊息 {message.id} 時發生錯誤：{e}", exc_info = e)
+        finally:
+            elapsed = time.perf_counter() - start
+            route.calls += 1
+            route.total += elapsed
+            route.max = max(route.max, elapsed)
+            metrics.LISTENER_SECONDS.observe(elapsed, cog=route.name, event="on_message")
+
+    async def dispatch(self, message: discord.Message):
+        """分派訊息給符合條件的訂閱者，彼此並行執行"""
+        self.messages += 1
+        routes = self.routes_for(self.classify(message))
+        if not routes:
+            self.unrouted += 1
+            return
+        await asyncio.gather(*(self._run(route, message) for route in routes))
+
+    def stats(self) -> dict:
+        """
+        取得分派統計
+
+        Returns
+        -------
+        dict
+            {"messages": 訊息數, "unrouted": 未分派數, "subscribers": {名稱: {"calls", "errors", "total", "avg", "max"}}}
+        """
+        return {
+            "messages": self.messages,
+            "unrouted": self.unrouted,
+            "subscribers": {
+                route.name: {
+                    "calls": route.calls,
+                    "errors": route.errors,
+                    "total": route.total,
+                    "avg": route.total / route.calls if route.calls else 0.0,
+                    "max": route.max
+                }
+                for route in self._routes.values()
+            }
+        }
@@ -0,0 +1,193 @@
+# 效能指標模組
+
+import bisect
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+_INF_LABEL = 'le="+Inf"'
+
+# 延遲直方圖的預設區間（秒）
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format_number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class _Metric:
+    """指標的共用部分：名稱、說明與標籤，各標籤組合的數值存在 _values"""
+    type = ""
+
+    def __init__(self, name: str, documentation: str, labels: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._values: dict = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(labels.get(name, "") for name in self.labels)
+
+    def expose(self) -> list:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            lines.extend(self._expose_value(key, value))
+        return lines
+
+    def _expose_value(self, key: tuple, value) -> list:
+        return [f"{self.name}{_format_labels(self.labels, key)} {_format_number(value)}"]
+
+class Counter(_Metric):
+    type = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+class Gauge(_Metric):
+    type = "gauge"
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labels: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # [各區間的次數..., 總和, 次數]
+                state = self._values[key] = [0] * len(self.buckets) + [0.0, 0]
+            index = bisect.bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                state[index] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """以 with 區塊計時並記錄"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def _expose_value(self, key: tuple, state: list) -> list:
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, state):
+            cumulative += count
+            le = f'le="{_format_number(float(bound))}"'
+            lines.append(f"{self.name}_bucket{_format_labels(self.labels, key, le)} {cumulative}")
+        lines.append(f"{self.name}_bucket{_format_labels(self.labels, key, _INF_LABEL)} {state[-1]}")
+        lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {_format_number(state[-2])}")
+        lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {state[-1]}")
+        return lines
+
+class MetricsRegistry:
+    """保存所有指標，並輸出為 Prometheus 文字格式"""
+    def __init__(self):
+        self._metrics: dict = {}
+
+    def _register(self, cls, name: str, *args, **kwargs):
+        metric = self._metrics.get(name)
+        if metric is None:
+            metric = self._metrics[name] = cls(name, *args, **kwargs)
+        return metric
+
+    def counter(self, name: str, documentation: str, labels: tuple = ()) -> Counter:
+        return self._register(Counter, name, documentation, labels)
+
+    def gauge(self, name: str, documentation: str, labels: tuple = ()) -> Gauge:
+        return self._register(Gauge, name, documentation, labels)
+
+    def histogram(self, name: str, documentation: str, labels: tuple = (), buckets: tuple = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram, name, documentation, labels, buckets)
+
+    def expose(self) -> str:
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.expose())
+        return "\n".join(lines) + "\n"
+
+# 整個程式共用的指標，不論是否啟用 HTTP 端點都會記錄（記錄成本只有一次字典更新）
+REGISTRY = MetricsRegistry()
+
+GATEWAY_EVENTS = REGISTRY.counter("cfbot_gateway_events_total", "收到的 Gateway 事件數", ("event",))
+LISTENER_SECONDS = REGISTRY.histogram("cfbot_listener_seconds", "事件監聽器的執行時間", ("cog", "event"))
+REST_REQUESTS = REGISTRY.counter("cfbot_rest_requests_total", "Discord REST API 請求數", ("method", "route", "status"))
+REST_SECONDS = REGISTRY.histogram("cfbot_rest_request_seconds", "Discord REST API 請求的總耗時（含速率限制等待）", ("method", "route"))
+REST_RATELIMITED = REGISTRY.counter("cfbot_rest_ratelimited_total", "收到 429 的 Discord REST API 回應數", ("method", "route"))
+REST_RATELIMIT_WAIT = REGISTRY.histogram("cfbot_rest_ratelimit_wait_seconds", "Discord REST API 請求等待速率限制的時間", ("method", "route"))
+COG_LOAD_SECONDS = REGISTRY.gauge("cfbot_cog_load_seconds", "齒輪載入耗時", ("cog", "phase"))
+BOOT_SECONDS = REGISTRY.gauge("cfbot_cog_boot_seconds", "所有齒輪載入的總耗時")
+UPDATE_STATUS_SECONDS = REGISTRY.histogram("cfbot_serverstats_update_seconds", "serverstats 更新伺服器狀態的耗時")
+SQLITE_SECONDS = REGISTRY.histogram("cfbot_sqlite_query_seconds", "SQLite 查詢耗時", ("store", "query"))
+LOG_QUEUE_DEPTH = REGISTRY.gauge("cfbot_log_queue_depth", "等待發送到紀錄頻道的嵌入數", ("sink",))
+LOG_QUEUE_DROPPED = REGISTRY.counter("cfbot_log_queue_dropped_total", "紀錄佇列已滿而略過的嵌入數", ("sink", "policy"))
+LOG_FLUSH_SECONDS = REGISTRY.histogram("cfbot_log_flush_seconds", "紀錄從排入佇列到發送完成的時間", ("sink",))
+AUTO_REPLY_REGEX_TIMEOUTS = REGISTRY.counter("cfbot_auto_reply_regex_timeouts_total", "自動回覆正規表示式超過時間預算的次數", ("rule",))
+DELETE_QUEUE_DEPTH = REGISTRY.gauge("cfbot_delete_queue_depth", "等待刪除的訊息數", ("queue",))
+DELETES_PER_REQUEST = REGISTRY.histogram(
+    "cfbot_deletes_per_request", "每次刪除請求刪除的訊息數", ("queue", "mode"), buckets=(1, 2, 5, 10, 25, 50, 75, 100)
+)
+AUTO_REPLY_THROTTLED = REGISTRY.counter("cfbot_auto_reply_throttled_total", "因為限流或合併而沒有回覆的自動回覆次數", ("scope",))
+
+class MetricsServer:
+    """
+    在本機提供 /metrics 端點的 aiohttp 伺服器
+
+    Attributes
+    ----------
+    host : str
+        綁定的位址，預設只允許本機連線
+    port : int
+        連接埠
+    """
+    def __init__(self, host: str = "127.0.0.1", port: int = 9464, registry: MetricsRegistry = REGISTRY):
+        self.host = host
+        self.port = port
+        self.registry = registry
+        self._runner = None
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        return web.Response(text=self.registry.expose(), content_type="text/plain", charset="utf-8")
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get("/metrics", self._handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        logger.info(f"效能指標端點已啟動：http://{self.host}:{self.port}/metrics")
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
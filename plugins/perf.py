@@ -0,0 +1,158 @@
+# 處理器效能紀錄模組
+
+import asyncio
+import logging
+import math
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+def coroutine_stack(coro) -> list:
+    """沿著 cr_await 取得協程目前停在哪裡，回傳「檔案:行號 函式」的清單（由外而內）"""
+    frames = []
+    while coro is not None:
+        frame = getattr(coro, "cr_frame", None) or getattr(coro, "gi_frame", None)
+        if frame is not None:
+            frames.append(f"{frame.f_code.co_filename}:{frame.f_lineno} {frame.f_code.co_name}")
+        coro = getattr(coro, "cr_await", None) or getattr(coro, "gi_yieldfrom", None)
+    return frames
+
+def percentile(values: list, q: float) -> float:
+    """以最近排名法計算百分位數，values 需已排序"""
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, max(0, math.ceil(q / 100 * len(values)) - 1))
+    return values[index]
+
+class _Timed:
+    """
+    逐步執行協程，記錄第一次讓出控制權（第一個真正的 await）前花費的時間。
+
+    在第一次 await 之前的程式碼會直接佔用事件迴圈，這段時間過長代表處理器有同步阻塞。
+    """
+    __slots__ = ("coro", "start", "first_await")
+
+    def __init__(self, coro):
+        self.coro = coro
+        self.start = time.perf_counter()
+        self.first_await = None
+
+    def __await__(self):
+        coro = self.coro
+        value, error = None, None
+        while True:
+            try:
+                if error is not None:
+                    yielded = coro.throw(error)
+                else:
+                    yielded = coro.send(value)
+            except StopIteration as e:
+                if self.first_await is None:
+                    self.first_await = time.perf_counter() - self.start
+                return e.value
+            if self.first_await is None:
+                self.first_await = time.perf_counter() - self.start
+            try:
+                value, error = (yield yielded), None
+            except GeneratorExit:
+                coro.close()
+                raise
+            except BaseException as e:
+                value, error = None, e
+
+class PerfRecorder:
+    """
+    記錄每個事件監聽器與應用程式指令的執行時間。
+
+    每個處理器保留最近 ring_size 筆紀錄（時間戳記、總耗時、第一次 await 前的耗時），
+    執行超過 budget 秒時會輸出警告，並附上處理器當下停在哪裡的堆疊摘要。
+
+    Attributes
+    ----------
+    budget : float
+        單次執行的時間預算（秒），超過時輸出警告
+    ring_size : int
+        每個處理器保留的紀錄筆數
+    """
+    def __init__(self, budget_ms: float = 500, ring_size: int = 1000):
+        self.budget = budget_ms / 1000
+        self.ring_size = ring_size
+        self._records: dict = {}
+
+    def _watchdog(self, name: str, timed: _Timed, reported: list):
+        reported.append(True)
+        stack = coroutine_stack(timed.coro)
+        summary = "\n".join(f"  {line}" for line in stack[-5:]) or "  （無法取得堆疊）"
+        logger.warning(f"處理器 {name} 已執行超過 {self.budget * 1000:.0f}ms，目前停在：\n{summary}")
+
+    async def run(self, name: str, coro):
+        """
+        執行並記錄一個處理器
+
+        Parameters
+        ----------
+        name : str
+            處理器名稱，例如「齒輪.事件」或「/指令」
+        coro : Coroutine
+            要執行的協程
+        """
+        timed = _Timed(coro)
+        reported = []
+        # 處理器還在執行時就觸發的看門狗，能指出是卡在哪一個 await
+        handle = asyncio.get_running_loop().call_later(self.budget, self._watchdog, name, timed, reported)
+        try:
+            return await timed
+        finally:
+            handle.cancel()
+            wall = time.perf_counter() - timed.start
+            first_await = timed.first_await if timed.first_await is not None else wall
+            self.record(name, wall, first_await)
+            if wall > self.budget and not reported:
+                # 看門狗沒有機會執行，代表事件迴圈被同步程式碼佔住
+                logger.warning(
+                    f"處理器 {name} 耗時 {wall * 1000:.0f}ms（預算 {self.budget * 1000:.0f}ms），"
+                    f"其中 {first_await * 1000:.0f}ms 在第一次 await 前，可能有同步阻塞"
+                )
+
+    def record(self, name: str, wall: float, first_await: float):
+        ring = self._records.get(name)
+        if ring is None:
+            ring = self._records[name] = deque(maxlen=self.ring_size)
+        ring.append((time.time(), wall, first_await))
+
+    def top(self, minutes: float = 10, limit: int = 10) -> list:
+        """
+        取得最近一段時間內最慢的處理器
+
+        Parameters
+        ----------
+        minutes : float
+            統計的時間範圍（分鐘）
+        limit : int
+            回傳的處理器數量
+
+        Returns
+        -------
+        list[dict]
+            依 p99 由大到小排序，每筆為 {"name", "calls", "p50", "p95", "p99", "max", "first_await_p95"}
+        """
+        since = time.time() - minutes * 60
+        results = []
+        for name, ring in list(self._records.items()):
+            samples = [(wall, first) for ts, wall, first in ring if ts >= since]
+            if not samples:
+                continue
+            walls = sorted(wall for wall, _ in samples)
+            firsts = sorted(first for _, first in samples)
+            results.append({
+                "name": name,
+                "calls": len(walls),
+                "p50": percentile(walls, 50),
+                "p95": percentile(walls, 95),
+                "p99": percentile(walls, 99),
+                "max": walls[-1],
+                "first_await_p95": percentile(firsts, 95)
+            })
+        results.sort(key=lambda item: item["p99"], reverse=True)
+        return results[:limit]
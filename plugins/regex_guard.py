@@ -0,0 +1,148 @@
+# 正規表示式執行保護模組
+
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+from collections import deque
+
+from plugins import metrics
+
+logger = logging.getLogger(__name__)
+
+# 專案根目錄，子程序從這裡以 -m plugins.regex_worker 啟動
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+class RegexTimeout(Exception):
+    def __init__(self, message):
+        self.message = message
+        super().__init__(self.message)
+
+class _Worker:
+    """
+    一個執行正規表示式的子程序，超時時直接結束並在下次使用時重新啟動。
+
+    子程序以 python -m plugins.regex_worker 啟動並透過 stdin/stdout 溝通，
+    不使用 multiprocessing 的 spawn，避免子程序重新匯入 main.py 而再次執行機器人的初始化。
+    """
+    def __init__(self):
+        self._process = None
+
+    async def _spawn(self):
+        self._process = await asyncio.create_subprocess_exec(
+            sys.executable, "-m", "plugins.regex_worker",
+            stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE, cwd=_ROOT,
+        )
+
+    async def _kill(self):
+        process, self._process = self._process, None
+        if process is None:
+            return
+        if process.returncode is None:
+            process.kill()
+        await process.wait()
+
+    async def search(self, pattern: str, content: str, timeout: float) -> bool:
+        if self._process is None or self._process.returncode is not None:
+            await self._spawn()
+        try:
+            self._process.stdin.write(json.dumps([pattern, content]).encode() + b"\n")
+            await self._process.stdin.drain()
+            line = await asyncio.wait_for(self._process.stdout.readline(), timeout)
+        except asyncio.TimeoutError:
+            await self._kill()
+            raise RegexTimeout(f"超過 {timeout * 1000:.0f} 毫秒")
+        except BaseException:
+            # 回應還沒讀取，不能留給下一次比對
+            await asyncio.shield(self._kill())
+            raise
+        if not line:
+            await self._kill()
+            raise RuntimeError("正規表示式子程序意外結束")
+        return line == b"1\n"
+
+    async def close(self):
+        await self._kill()
+
+class RegexGuard:
+    """
+    自動回覆正規表示式的執行保護。
+
+    Python 的 re 在比對期間不會釋放 GIL，執行緒無法中斷比對，所以容易回溯的規則改在子程序中執行，
+    超過時間預算就結束子程序；其他規則仍在事件迴圈上直接執行，但會量測耗時。
+    同一條規則在 strike_window 秒內超過預算 strikes 次就會被停用，並呼叫 on_quarantine 通知。
+
+    Attributes
+    ----------
+    budget : float
+        每次比對的時間預算（秒）
+    isolate : str
+        "risky" 只有分析後容易回溯的規則在子程序中執行，"all" 所有正規表示式規則都在子程序中執行
+    strikes : int
+        停用規則前允許超過預算的次數
+    strike_window : float
+        計算超過預算次數的時間範圍（秒）
+    on_quarantine : Callable[[Rule, str], None] | None
+        規則被停用時呼叫
+    """
+    def __init__(self, budget: float = 0.05, isolate: str = "risky", workers: int = 1, strikes: int = 3,
+                 strike_window: float = 600, on_quarantine=None):
+        self.budget = budget
+        self.isolate = isolate
+        self.strikes = strikes
+        self.strike_window = strike_window
+        self.on_quarantine = on_quarantine
+        self._workers = [_Worker() for _ in range(max(1, workers))]
+        self._idle = asyncio.Queue()
+        for worker in self._workers:
+            self._idle.put_nowait(worker)
+        # 規則順序 -> 超過預算的時間
+        self._strikes: dict = {}
+
+    async def close(self):
+        for worker in self._workers:
+            await worker.close()
+
+    def isolated(self, rule) -> bool:
+        return self.isolate == "all" or rule.risk is not None
+
+    async def search(self, rule, content: str) -> bool:
+        """執行規則的正規表示式，超時視為不符合"""
+        if rule.quarantined:
+            return False
+        if not self.isolated(rule):
+            start = time.perf_counter()
+            found = rule.regex.search(content) is not None
+            elapsed = time.perf_counter() - start
+            if elapsed > self.budget:
+                # 已經執行完畢無法中斷，記錄後讓規則之後改在子程序中執行
+                rule.risk = rule.risk or f"比對耗時 {elapsed * 1000:.0f} 毫秒"
+                self._strike(rule, f"在事件迴圈上比對耗時 {elapsed * 1000:.0f} 毫秒")
+            return found
+        worker = await self._idle.get()
+        try:
+            return await worker.search(rule.trigger, content, self.budget)
+        except RegexTimeout as e:
+            self._strike(rule, e.message)
+            return False
+        finally:
+            self._idle.put_nowait(worker)
+
+    def _strike(self, rule, reason: str):
+        metrics.AUTO_REPLY_REGEX_TIMEOUTS.inc(rule=str(rule.index + 1))
+        now = time.monotonic()
+        strikes = self._strikes.setdefault(rule.index, deque())
+        strikes.append(now)
+        while strikes and now - strikes[0] > self.strike_window:
+            strikes.popleft()
+        logger.warning(f"自動回覆規則 {rule.index + 1}（{rule.trigger}）{reason}（{len(strikes)}/{self.strikes}）")
+        if len(strikes) < self.strikes:
+            return
+        rule.quarantined = True
+        del self._strikes[rule.index]
+        message = f"{self.strike_window:.0f} 秒內 {self.strikes} 次超過 {self.budget * 1000:.0f} 毫秒的時間預算"
+        logger.error(f"自動回覆規則 {rule.index + 1}（{rule.trigger}）{message}，已停用")
+        if self.on_quarantine is not None:
+            self.on_quarantine(rule, message)
@@ -0,0 +1,23 @@
+# 正規表示式子程序
+#
+# 由 plugins.regex_guard 以 `python -m plugins.regex_worker` 啟動，不會匯入 main.py。
+# 每行從 stdin 讀取一個 JSON 陣列 [正規表示式, 文字]，比對後在 stdout 寫出一行 1（符合）或 0（不符合）。
+
+import json
+import re
+import sys
+
+def main():
+    cache = {}
+    for line in sys.stdin:
+        pattern, content = json.loads(line)
+        regex = cache.get(pattern)
+        if regex is None:
+            if len(cache) > 1000:
+                cache.clear()
+            regex = cache[pattern] = re.compile(pattern)
+        sys.stdout.write("1\n" if regex.search(content) is not None else "0\n")
+        sys.stdout.flush()
+
+if __name__ == "__main__":
+    main()
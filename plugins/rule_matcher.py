@@ -0,0 +1,339 @@
+# 關鍵字規則比對模組
+
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+# 規則數量不超過這個值時直接依序檢查，比掃描自動機快
+LINEAR_THRESHOLD = 16
+
+try:
+    from re import _parser as sre_parse
+except ImportError:
+    import sre_parse
+
+def _required_literal(pattern: str) -> tuple:
+    """
+    找出正規表示式符合時一定會出現的最長連續字面字串，用來在執行正規表示式之前先過濾
+
+    Returns
+    -------
+    tuple[str, bool]
+        (字面字串, 是否不分大小寫)，找不到時字面字串為空字串
+    """
+    try:
+        parsed = sre_parse.parse(pattern)
+    except (re.error, OverflowError, RecursionError):
+        return "", False
+    ignorecase = bool(parsed.state.flags & re.IGNORECASE)
+    best = ""
+
+    def walk(items):
+        nonlocal best, ignorecase
+        run = []
+        # 只看一定會依序出現的項目：字面字元與群組，遇到分支、重複、字元類別等就中斷目前的字串
+        for op, av in list(items) + [(None, None)]:
+            if op is sre_parse.LITERAL:
+                run.append(chr(av))
+                continue
+            if len(run) > len(best):
+                best = "".join(run)
+            run = []
+            if op is sre_parse.SUBPATTERN:
+                add_flags = av[1]
+                if add_flags & re.IGNORECASE:
+                    ignorecase = True
+                walk(av[3])
+
+    walk(parsed)
+    return best, ignorecase
+
+def backtracking_risk(pattern: str):
+    """
+    分析正規表示式是否容易發生災難性回溯
+
+    Returns
+    -------
+    str | None
+        原因，看起來安全時為 None
+    """
+    try:
+        parsed = sre_parse.parse(pattern)
+    except (re.error, OverflowError, RecursionError):
+        return None
+    repeats = (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT)
+
+    def unbounded(av) -> bool:
+        return av[1] is sre_parse.MAXREPEAT or av[1] > 100
+
+    def contains(items, test) -> bool:
+        for op, av in items:
+            if test(op, av):
+                return True
+            for child in _children(op, av):
+                if contains(child, test):
+                    return True
+        return False
+
+    def walk(items):
+        previous = None
+        for op, av in items:
+            if op in repeats and unbounded(av):
+                body = av[2]
+                if contains(body, lambda op, av: op in repeats and unbounded(av)):
+                    return "巢狀的重複，例如 (a+)+"
+                if contains(body, lambda op, av: op is sre_parse.BRANCH):
+                    return "重複的分支，例如 (a|ab)*"
+                if previous is not None:
+                    return "相鄰的重複，例如 \\d+\\d+"
+                previous = op
+            elif op is sre_parse.GROUPREF or op is sre_parse.GROUPREF_EXISTS:
+                return "反向參照"
+            else:
+                previous = None
+            for child in _children(op, av):
+                reason = walk(child)
+                if reason:
+                    return reason
+        return None
+
+    return walk(parsed)
+
+def _children(op, av) -> list:
+    """取得節點底下的子序列"""
+    if op is sre_parse.SUBPATTERN:
+        return [av[3]]
+    if op in (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT):
+        return [av[2]]
+    if op is sre_parse.BRANCH:
+        return list(av[1])
+    if op in (sre_parse.ASSERT, sre_parse.ASSERT_NOT):
+        return [av[1]]
+    if op is sre_parse.GROUPREF_EXISTS:
+        return [branch for branch in av[1:] if branch is not None]
+    return []
+
+class AhoCorasick:
+    """
+    Aho-Corasick 自動機：一次掃描文字就能找出所有出現的關鍵字，
+    耗時只與文字長度有關，不會隨關鍵字數量增加。
+
+    Attributes
+    ----------
+    size : int
+        狀態數
+    """
+    def __init__(self, patterns: list):
+        """
+        Parameters
+        ----------
+        patterns : list[tuple[str, int]]
+            (關鍵字, 值)，同一個關鍵字可以對應多個值
+        """
+        # 每個狀態的轉移、失敗連結與輸出（由小到大排序的值）
+        self._goto = [{}]
+        self._fail = [0]
+        outputs = [set()]
+        for pattern, value in patterns:
+            state = 0
+            for char in pattern:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = self._goto[state][char] = len(self._goto)
+                    self._goto.append({})
+                    self._fail.append(0)
+                    outputs.append(set())
+                state = next_state
+            outputs[state].add(value)
+        # 以廣度優先建立失敗連結，並把失敗連結上的輸出合併進來
+        queue = list(self._goto[0].values())
+        for state in queue:
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                target = self._goto[fail].get(char, 0)
+                self._fail[next_state] = target if target != next_state else 0
+                outputs[next_state] |= outputs[self._fail[next_state]]
+        self._outputs = [tuple(sorted(values)) if values else None for values in outputs]
+
+    @property
+    def size(self) -> int:
+        return len(self._goto)
+
+    def iter_matches(self, text: str):
+        """依序產生文字中每個位置結束的關鍵字對應的值（每次為一個由小到大排序的 tuple）"""
+        goto = self._goto
+        fail = self._fail
+        outputs = self._outputs
+        if outputs[0]:
+            yield outputs[0]
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if outputs[state]:
+                yield outputs[state]
+
+class Rule:
+    """
+    編譯後的自動回覆規則
+
+    Attributes
+    ----------
+    index : int
+        在 cfg.yml 中的順序，越小越優先
+    trigger : str
+        觸發字串或正規表示式
+    response : str
+        回覆內容
+    regex : re.Pattern | None
+        預先編譯的正規表示式，一般模式時為 None
+    no_reply : bool
+        是否直接傳送訊息而不是回覆
+    channels : frozenset | None
+        只在這些頻道觸發，None 代表所有頻道
+    risk : str | None
+        正規表示式容易回溯的原因
+    quarantined : bool
+        是否因為多次超過時間預算而停用
+    """
+    __slots__ = ("index", "trigger", "response", "regex", "no_reply", "channels", "config", "risk", "quarantined")
+
+    def __init__(self, index: int, config: dict):
+        self.index = index
+        self.config = config
+        self.trigger = str(config.get("trigger", ""))
+        self.response = config.get("response", "")
+        self.no_reply = config.get("no_reply", False)
+        channels = config.get("channels") or None
+        self.channels = frozenset(channels) if channels else None
+        self.regex = re.compile(self.trigger) if config.get("match_regex", False) else None
+        self.risk = backtracking_risk(self.trigger) if self.regex is not None else None
+        self.quarantined = False
+
+    def allowed_in(self, channel_id: int) -> bool:
+        return self.channels is None or channel_id in self.channels
+
+class RuleMatcher:
+    """
+    將自動回覆規則編譯成一個比對器：一般模式的觸發字串合併成一個 Aho-Corasick 自動機，
+    正規表示式預先編譯，並取出每個正規表示式一定會出現的字面字串一起放進自動機，
+    只有字面字串出現時才執行該正規表示式；沒有字面字串的正規表示式依頻道建立索引。
+
+    比對結果與依序檢查每條規則相同：回傳第一條符合的規則。
+    設定 guard 時，正規表示式交給 RegexGuard 在時間預算內執行，已停用的規則不會符合。
+
+    Attributes
+    ----------
+    rules : list[Rule]
+        編譯成功的規則
+    guard : RegexGuard | None
+        正規表示式的執行保護
+    """
+    def __init__(self, rules: list, guard=None):
+        self.guard = guard
+        self.rules = []
+        for index, config in enumerate(rules):
+            try:
+                rule = Rule(index, config)
+            except re.error as e:
+                logger.error(f"自動回覆規則 {index + 1}（{config.get('trigger')}）的正規表示式無效，已略過：{e}")
+                continue
+            if rule.risk:
+                logger.warning(f"自動回覆規則 {index + 1}（{rule.trigger}）的正規表示式容易發生災難性回溯：{rule.risk}")
+            self.rules.append(rule)
+        self._by_index = {rule.index: rule for rule in self.rules}
+        self._linear = len(self.rules) <= LINEAR_THRESHOLD
+        # 一般模式的觸發字串與分大小寫的正規表示式字面字串
+        keywords = [(rule.trigger, rule.index) for rule in self.rules if rule.regex is None]
+        # 不分大小寫的正規表示式字面字串，以小寫比對
+        folded = []
+        # 找不到字面字串，每則訊息都要執行的正規表示式
+        self._ungated = []
+        for rule in self.rules:
+            if rule.regex is None:
+                continue
+            literal, ignorecase = _required_literal(rule.trigger)
+            if not literal:
+                self._ungated.append(rule)
+            elif not ignorecase:
+                keywords.append((literal, rule.index))
+            elif literal.isascii():
+                folded.append((literal.lower(), rule.index))
+            else:
+                self._ungated.append(rule)
+        self._automaton = AhoCorasick(keywords)
+        self._folded = AhoCorasick(folded) if folded else None
+        self._folded_rules = [self._by_index[index] for _, index in folded]
+        # 頻道 ID -> 該頻道適用且沒有字面字串的正規表示式規則
+        self._ungated_by_channel: dict = {}
+        self._restricted = any(rule.channels is not None for rule in self.rules)
+
+    def _ungated_for(self, channel_id: int) -> list:
+        if not self._restricted:
+            return self._ungated
+        rules = self._ungated_by_channel.get(channel_id)
+        if rules is None:
+            rules = self._ungated_by_channel[channel_id] = [rule for rule in self._ungated if rule.allowed_in(channel_id)]
+        return rules
+
+    async def _search(self, rule: Rule, content: str) -> bool:
+        if self.guard is None:
+            return rule.regex.search(content) is not None
+        return await self.guard.search(rule, content)
+
+    async def match(self, content: str, channel_id: int = None):
+        """
+        找出第一條符合的規則
+
+        Returns
+        -------
+        Rule | None
+        """
+        if self._linear:
+            for rule in self.rules:
+                if not rule.allowed_in(channel_id):
+                    continue
+                if rule.regex is not None:
+                    if await self._search(rule, content):
+                        return rule
+                elif rule.trigger in content:
+                    return rule
+            return None
+        best = None
+        # 字面字串有出現、需要執行的正規表示式規則
+        candidates = list(self._ungated_for(channel_id))
+        for values in self._automaton.iter_matches(content):
+            for index in values:
+                if best is not None and index >= best:
+                    break
+                rule = self._by_index[index]
+                if rule.regex is not None:
+                    candidates.append(rule)
+                elif rule.allowed_in(channel_id):
+                    best = index
+                    break
+            if best == 0:
+                return self._by_index[0]
+        if self._folded is not None:
+            if content.isascii():
+                for values in self._folded.iter_matches(content.lower()):
+                    candidates.extend(self._by_index[index] for index in values)
+            else:
+                # 非 ASCII 字元的大小寫對應不一定是一對一，直接執行所有不分大小寫的正規表示式
+                candidates.extend(self._folded_rules)
+        # 只需要檢查順序在目前結果之前的正規表示式規則
+        checked = set()
+        for rule in sorted(candidates, key=lambda rule: rule.index):
+            if best is not None and rule.index >= best:
+                break
+            if rule.index in checked or not rule.allowed_in(channel_id):
+                continue
+            checked.add(rule.index)
+            if await self._search(rule, content):
+                return rule
+        return self._by_index[best] if best is not None else None
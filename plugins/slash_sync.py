@@ -0,0 +1,124 @@
+# 斜線指令同步管理模組
+
+import hashlib
+import json
+import logging
+import os
+
+import discord
+from discord.ext import commands
+
+logger = logging.getLogger(__name__)
+
+# 指令指紋檔名，與 slash.json 放在同一個資料夾
+FINGERPRINT_FILE = 'slash.fingerprint.json'
+
+class SlashSyncManager:
+    """
+    以指紋比對的方式同步斜線指令，只有在指令樹有變更時才呼叫 Discord API。
+
+    Attributes
+    ----------
+    bot : commands.Bot
+        機器人實例
+    state_path : str
+        指紋檔案的路徑
+    guild_ids : list[int]
+        若有設定，則改為只同步到這些伺服器（開發用，同步幾乎即時生效）
+    """
+    def __init__(self, bot: commands.Bot, state_dir: str, guild_ids: list = None):
+        self.bot = bot
+        self.state_path = os.path.join(state_dir, FINGERPRINT_FILE)
+        self.guild_ids = list(guild_ids or [])
+        self._state = self._load_state()
+
+    def _load_state(self) -> dict:
+        """讀取已儲存的指紋，檔案不存在或損毀時回傳空字典"""
+        if not os.path.exists(self.state_path):
+            return {}
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+            return state if isinstance(state, dict) else {}
+        except (OSError, ValueError) as e:
+            logger.warning(f'讀取指令指紋失敗，將視為未同步：{e}')
+            return {}
+
+    def _save_state(self):
+        try:
+            with open(self.state_path, 'w', encoding='utf-8') as f:
+                json.dump(self._state, f, indent = 4)
+        except OSError as e:
+            logger.error(f'寫入指令指紋失敗：{e}')
+
+    @staticmethod
+    def _scope_key(guild: discord.abc.Snowflake = None) -> str:
+        return 'global' if guild is None else str(guild.id)
+
+    def fingerprint(self, guild: discord.abc.Snowflake = None) -> str:
+        """
+        計算指令樹的指紋
+
+        Parameters
+        ----------
+        guild : discord.abc.Snowflake
+            要計算的伺服器，None 代表全域指令
+
+        Returns
+        -------
+        str
+            序列化後指令樹的 SHA-256
+        """
+        payload = [command.to_dict() for command in self.bot.tree.get_commands(guild = guild)]
+        # 依照類型與名稱排序，避免載入順序不同造成指紋不同
+        payload.sort(key = lambda c: (c.get('type', 1), c['name']))
+        raw = json.dumps(payload, sort_keys = True, ensure_ascii = False, separators = (',', ':'))
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    async def sync(self, guild: discord.abc.Snowflake = None, force: bool = False) -> dict:
+        """
+        同步單一範圍（全域或某個伺服器）的指令
+
+        Parameters
+        ----------
+        guild : discord.abc.Snowflake
+            要同步的伺服器，None 代表全域指令
+        force : bool
+            是否忽略指紋強制同步
+
+        Returns
+        -------
+        dict
+            {"scope": 範圍, "synced": 是否有呼叫 API, "reason": 原因, "commands": 已同步的指令}
+        """
+        key = self._scope_key(guild)
+        digest = self.fingerprint(guild)
+        if not force and self._state.get(key) == digest:
+            logger.info(f'指令同步跳過（{key}）：指令樹沒有變更')
+            return {'scope': key, 'synced': False, 'reason': '指令樹沒有變更', 'commands': []}
+
+        reason = '強制同步' if force else ('首次同步' if key not in self._state else '指令樹已變更')
+        slash = await self.bot.tree.sync(guild = guild)
+        self._state[key] = digest
+        self._save_state()
+        logger.info(f'指令同步完成（{key}）：{reason}，共 {len(slash)} 個指令')
+        return {'scope': key, 'synced': True, 'reason': reason, 'commands': slash}
+
+    async def sync_all(self, force: bool = False) -> list:
+        """
+        依照設定同步指令：有設定 guild_ids 時只同步到那些伺服器，否則同步全域指令
+
+        Returns
+        -------
+        list[dict]
+            每個範圍的同步結果，格式同 sync()
+        """
+        if not self.guild_ids:
+            return [await self.sync(force = force)]
+        results = []
+        for guild_id in self.guild_ids:
+            guild = discord.Object(id = guild_id)
+            # 將全域指令複製到伺服器，讓開發時不必等待全域指令生效
+            self.bot.tree.copy_global_to(guild = guild)
+            results.append(await self.sync(guild = guild, force = force))
+        return results
@@ -0,0 +1,139 @@
+# 訊息樣板模組
+
+import functools
+import logging
+import string
+
+logger = logging.getLogger(__name__)
+
+_FORMATTER = string.Formatter()
+
+class TemplateError(Exception):
+    def __init__(self, message):
+        self.message = message
+        super().__init__(self.message)
+
+class Template:
+    """
+    預先解析的訊息樣板，語法與 str.format 相同（{name}、{name.attr}、{name!r}、{name:>10}）。
+
+    載入設定時解析一次並檢查佔位符，之後每次只需要依序接上片段。
+    render 傳入的值可以是函式，只有樣板中實際用到的佔位符才會呼叫，且每次 render 最多呼叫一次。
+
+    Attributes
+    ----------
+    source : str
+        原始樣板
+    fields : frozenset
+        用到的佔位符名稱
+    """
+    __slots__ = ("source", "fields", "_segments")
+
+    def __init__(self, source: str, placeholders=None):
+        """
+        Parameters
+        ----------
+        placeholders : Iterable[str] | None
+            允許的佔位符名稱，None 代表不檢查
+
+        Raises
+        ------
+        TemplateError
+            樣板語法錯誤或使用了不允許的佔位符
+        """
+        self.source = source
+        # 字串為文字片段，tuple 為 (名稱, 屬性, 轉換, 格式)
+        segments = []
+        fields = set()
+        try:
+            parsed = list(_FORMATTER.parse(source))
+        except ValueError as e:
+            raise TemplateError(f"樣板語法錯誤：{e}")
+        for literal, field, spec, conversion in parsed:
+            if literal:
+                if segments and isinstance(segments[-1], str):
+                    segments[-1] += literal
+                else:
+                    segments.append(literal)
+            if field is None:
+                continue
+            if not field or field.isdigit():
+                raise TemplateError("不支援沒有名稱的佔位符 {}，請使用 {名稱}")
+            if "[" in field or "{" in (spec or ""):
+                raise TemplateError(f"不支援的佔位符 {{{field}}}")
+            name, *attributes = field.split(".")
+            if placeholders is not None and name not in placeholders:
+                raise TemplateError(f"未知的佔位符 {{{name}}}，可用的佔位符：{', '.join(sorted(placeholders))}")
+            if conversion not in (None, "r", "s", "a"):
+                raise TemplateError(f"不支援的轉換 !{conversion}")
+            fields.add(name)
+            segments.append((name, tuple(attributes), conversion, spec or ""))
+        self.fields = frozenset(fields)
+        self._segments = tuple(segments)
+
+    @classmethod
+    def literal(cls, text: str) -> "Template":
+        """不含佔位符、原樣輸出的樣板"""
+        return cls(text.replace("{", "{{").replace("}", "}}"), ())
+
+    def render(self, values: dict) -> str:
+        """
+        Parameters
+        ----------
+        values : dict
+            佔位符名稱 -> 值，或是回傳值的函式（只在用到時呼叫）
+        """
+        resolved = {}
+        parts = []
+        for segment in self._segments:
+            if isinstance(segment, str):
+                parts.append(segment)
+                continue
+            name, attributes, conversion, spec = segment
+            if name in resolved:
+                value = resolved[name]
+            else:
+                value = values[name]
+                if callable(value):
+                    value = value()
+                resolved[name] = value
+            for attribute in attributes:
+                value = getattr(value, attribute)
+            if conversion == "r":
+                value = repr(value)
+            elif conversion == "s":
+                value = str(value)
+            elif conversion == "a":
+                value = ascii(value)
+            parts.append(format(value, spec))
+        return "".join(parts)
+
+@functools.lru_cache(maxsize=256)
+def _compile(source: str, placeholders) -> Template:
+    return Template(source, placeholders)
+
+def compile_template(source: str, placeholders=None, fallback: str = None, name: str = "訊息樣板") -> Template:
+    """
+    解析樣板，相同的樣板只解析一次
+
+    Parameters
+    ----------
+    placeholders : Iterable[str] | None
+        允許的佔位符名稱
+    fallback : str | None
+        樣板無效時改用的樣板，None 時直接拋出 TemplateError
+    name : str
+        錯誤訊息中顯示的設定名稱
+
+    Returns
+    -------
+    Template
+    """
+    placeholders = frozenset(placeholders) if placeholders is not None else None
+    try:
+        return _compile(source, placeholders)
+    except TemplateError as e:
+        if fallback is None:
+            raise TemplateError(f"{name} 無效：{e.message}")
+        logger.error(f"{name} 無效，將使用預設訊息：{e.message}")
+        return _compile(fallback, placeholders)
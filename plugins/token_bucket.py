@@ -0,0 +1,95 @@
+# 權杖桶限流模組
+
+import time
+from array import array
+
+class TokenBuckets:
+    """
+    依鍵值（規則、頻道、使用者等）分開計算的權杖桶。
+
+    每個鍵值只佔用字典中的一個項目與兩個 array 中的 double（權杖數、上次更新時間），
+    字典依最後使用時間排序：閒置到權杖已經補滿的鍵值與新的鍵值沒有差別，會被直接移除；
+    鍵值數超過 max_keys 時也會從最久沒有使用的開始移除。
+
+    Attributes
+    ----------
+    capacity : float
+        桶的容量，也就是短時間內最多可以連續通過幾次
+    rate : float
+        每秒補充的權杖數
+    max_keys : int
+        最多保留的鍵值數
+    """
+    def __init__(self, capacity: float, per: float, max_keys: int = 10000):
+        """
+        Parameters
+        ----------
+        capacity : float
+            每 per 秒最多通過的次數
+        per : float
+            補滿整個桶需要的秒數
+        """
+        self.capacity = float(capacity)
+        self.rate = self.capacity / per
+        self.max_keys = max_keys
+        # 補滿整個桶需要的時間，閒置超過這個時間的鍵值可以移除
+        self._idle = per
+        # 鍵值 -> 在 array 中的位置，依最後使用時間排序
+        self._slots: dict = {}
+        self._tokens = array("d")
+        self._stamps = array("d")
+        self._free = []
+        self._operations = 0
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def _slot(self, key, now: float) -> int:
+        slot = self._slots.pop(key, None)
+        if slot is None:
+            if self._free:
+                slot = self._free.pop()
+                self._tokens[slot] = self.capacity
+                self._stamps[slot] = now
+            else:
+                slot = len(self._tokens)
+                self._tokens.append(self.capacity)
+                self._stamps.append(now)
+        else:
+            elapsed = now - self._stamps[slot]
+            if elapsed > 0:
+                self._tokens[slot] = min(self.capacity, self._tokens[slot] + elapsed * self.rate)
+                self._stamps[slot] = now
+        # 重新插入讓字典維持依最後使用時間排序
+        self._slots[key] = slot
+        return slot
+
+    def available(self, key, now: float = None) -> float:
+        """取得目前的權杖數，不會消耗權杖"""
+        now = time.monotonic() if now is None else now
+        slot = self._slots.get(key)
+        if slot is None:
+            return self.capacity
+        return min(self.capacity, self._tokens[slot] + max(0.0, now - self._stamps[slot]) * self.rate)
+
+    def take(self, key, cost: float = 1, now: float = None) -> bool:
+        """權杖足夠時消耗權杖並回傳 True，否則回傳 False"""
+        now = time.monotonic() if now is None else now
+        slot = self._slot(key, now)
+        allowed = self._tokens[slot] >= cost
+        if allowed:
+            self._tokens[slot] -= cost
+        self._operations += 1
+        if len(self._slots) > self.max_keys or self._operations >= 1024:
+            self._evict(now)
+        return allowed
+
+    def _evict(self, now: float):
+        self._operations = 0
+        expired = []
+        for key, slot in self._slots.items():
+            if now - self._stamps[slot] < self._idle and len(self._slots) - len(expired) <= self.max_keys:
+                break
+            expired.append(key)
+        for key in expired:
+            self._free.append(self._slots.pop(key))